@@ -1,14 +1,27 @@
-from flask import Flask
+from flask import Flask, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from app.config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, JWT_REFRESH_TOKEN_EXPIRES
-
-blacklisted_tokens = set()
+from app.config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, JWT_REFRESH_TOKEN_EXPIRES, CONSULTAS_CABECALHO
+from app.compressao import registrar_compressao
+from app.database import encerrar_db, verificar_replica
+from app.revogacao import tokens_revogados
 
 def create_app():
+    # Com réplica de leitura, a janela read-your-writes precisa de um cache compartilhado
+    verificar_replica()
+
     app = Flask(__name__)
     CORS(app)
 
+    # orjson quando disponível; datetime é serializado em ISO 8601 pelo provedor
+    from app.serializacao import criar_provedor_json
+    app.json = criar_provedor_json(app)
+
+    # Métricas Prometheus em /metrics; registradas primeiro para que o
+    # after_request delas rode por último e meça a resposta já comprimida
+    from app.metricas import registrar_metricas
+    registrar_metricas(app)
+
     # Importa e registra blueprints
     from app.routes.auth_routes import auth_bp
     from app.routes.dashboard_routes import dashboard_bp
@@ -22,7 +35,7 @@ def create_app():
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        return jwt_payload['jti'] in blacklisted_tokens
+        return tokens_revogados.esta_revogado(jwt_payload['jti'])
     
     @jwt.expired_token_loader
     def expired_token_loader(jwt_header, jwt_payload):
@@ -49,4 +62,29 @@ def create_app():
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
     app.register_blueprint(resource_bp, url_prefix="/api/recurso")
 
+    # Uma sessão por requisição, compartilhada pelos serviços e fechada ao final
+    app.teardown_appcontext(encerrar_db)
+
+    if CONSULTAS_CABECALHO:
+        @app.after_request
+        def adicionar_contagem_consultas(response):
+            response.headers["X-Consultas"] = str(g.get("consultas", 0))
+            return response
+
+    # Compressão gzip/br das respostas grandes, negociada pelo Accept-Encoding
+    registrar_compressao(app)
+
+    # Registra a manutenção incremental dos contadores do dashboard
+    from app.services import contadores_service  # noqa: F401
+
+    # Registra o livro de movimentações de estoque e seus agregados por hora e por dia
+    from app.services import estoque_service  # noqa: F401
+
+    # Regras de alerta compiladas uma única vez na inicialização
+    from app.services.regras_alerta import carregar_regras
+    carregar_regras()
+
+    # As tarefas periódicas não começam aqui: só os pontos de entrada do servidor
+    # (wsgi.py, asgi.py) as iniciam, e não scripts, testes e benchmarks
+
     return app
\ No newline at end of file
@@ -0,0 +1,426 @@
+"""
+Modo de implantação ASGI.
+
+As rotas de leitura mais frequentes (dashboard, listagem e busca), o login e
+o stream SSE rodam como corrotinas sobre a AsyncSession (drivers aiosqlite /
+asyncpg): enquanto esperam o banco, o hash da senha ou um evento, não ocupam
+nenhuma thread. As demais rotas são repassadas ao app Flask (WSGI) em um pool
+de ASGI_THREADS_WSGI threads.
+
+Os handlers assíncronos rodam dentro do contexto de requisição do Flask, então
+reaproveitam a verificação do JWT, os error handlers, o provedor JSON e os
+after_request (compressão, X-Consultas, CORS). A leitura dos parâmetros e a
+montagem das respostas vêm dos módulos de rotas, então o contrato JSON é
+definido uma só vez para os dois modos.
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from flask import make_response
+from flask_jwt_extended import verify_jwt_in_request
+
+from app.condicional import avaliar_condicional, marcar_validadores
+from app.config import ASGI_THREADS_WSGI, SSE_DURACAO_MAXIMA, SSE_HEARTBEAT
+from app.database import AsyncSessionLocal, engines_async
+from app.eventos import HEARTBEAT_SSE, abrir_stream, barramento, mensagens_do_usuario
+from app.routes import auth_routes, dashboard_routes, recurso_routes
+from app.services.auth_service import authenticate_user_async, get_user_by_id_async
+from app.services.contadores_service import chave_versao, ler_contadores_async
+from app.services.dashboard_service import (
+    get_dashboard_data_async,
+    get_recursos_summary_async,
+    get_alertas_by_user_async
+)
+from app.services.jwt_service import get_current_user_from_token
+from app.services.recurso_service import buscar_recursos_async, listar_recursos_async
+from app.utils import HashSobrecarregado
+
+# (método, caminho) -> (handler, somente_leitura)
+ROTAS = {}
+
+def rota(metodo, caminho, somente_leitura=True):
+    def decorador(handler):
+        ROTAS[(metodo, caminho)] = (handler, somente_leitura)
+        return handler
+    return decorador
+
+def autenticado(locations=None):
+    """Equivalente a @jwt_required(); os erros vão para os handlers do JWTManager"""
+    def decorador(handler):
+        @wraps(handler)
+        async def envolvido(db):
+            verify_jwt_in_request(locations=locations)
+            return await handler(db)
+        return envolvido
+    return decorador
+
+def condicional(*conjuntos, por_usuario=False):
+    """Equivalente a @get_condicional, lendo as versões pela AsyncSession"""
+    chaves = [chave_versao(conjunto) for conjunto in conjuntos]
+
+    def decorador(handler):
+        @wraps(handler)
+        async def envolvido(db):
+            versoes = await ler_contadores_async(db, chaves)
+            etag, modificado_em, atual = avaliar_condicional(versoes, chaves, por_usuario)
+
+            if atual:
+                resposta = make_response("", 304)
+            else:
+                resposta = make_response(await handler(db))
+                if resposta.status_code != 200:
+                    return resposta
+
+            return marcar_validadores(resposta, etag, modificado_em)
+        return envolvido
+    return decorador
+
+
+class StreamASGI:
+    """Resposta produzida por um gerador assíncrono de str (ex.: SSE)"""
+
+    def __init__(self, gerador, mimetype, headers=None):
+        self.gerador = gerador
+        self.mimetype = mimetype
+        self.headers = headers or {}
+
+
+@rota("GET", "/api/dashboard/")
+@autenticado()
+@condicional("recursos", "alertas", "usuarios", por_usuario=True)
+async def get_dashboard(db):
+    try:
+        user_data = get_current_user_from_token()
+        if not user_data:
+            return dashboard_routes.usuario_nao_encontrado()
+
+        dashboard_data = await get_dashboard_data_async(db, user_data['id'], user_data['cargo'])
+        return dashboard_routes.resposta_dashboard(user_data, dashboard_data)
+    except Exception as e:
+        return dashboard_routes.erro_interno(e)
+
+
+@rota("GET", "/api/dashboard/stats")
+@autenticado()
+@condicional("recursos", "alertas", "usuarios", por_usuario=True)
+async def get_dashboard_stats(db):
+    try:
+        user_data = get_current_user_from_token()
+        if not user_data:
+            return dashboard_routes.usuario_nao_encontrado()
+
+        stats_data = await get_dashboard_data_async(db, user_data['id'], user_data['cargo'])
+        return dashboard_routes.resposta_stats(user_data, stats_data)
+    except Exception as e:
+        return dashboard_routes.erro_interno(e)
+
+
+@rota("GET", "/api/dashboard/recursos")
+@autenticado()
+@condicional("recursos")
+async def get_dashboard_recursos(db):
+    try:
+        user_data = get_current_user_from_token()
+        if not user_data:
+            return dashboard_routes.usuario_nao_encontrado()
+
+        recursos_summary = await get_recursos_summary_async(db)
+        return dashboard_routes.resposta_recursos(recursos_summary)
+    except Exception as e:
+        return dashboard_routes.erro_interno(e)
+
+
+@rota("GET", "/api/dashboard/alertas")
+@autenticado()
+@condicional("alertas", "recursos", por_usuario=True)
+async def get_dashboard_alertas(db):
+    try:
+        user_data = get_current_user_from_token()
+        if not user_data:
+            return dashboard_routes.usuario_nao_encontrado()
+
+        alertas, next_cursor = await get_alertas_by_user_async(
+            db, user_data['id'], user_data['cargo'], **dashboard_routes.parametros_alertas()
+        )
+        return dashboard_routes.resposta_alertas(alertas, next_cursor)
+    except ValueError as e:
+        return dashboard_routes.erro_parametros(e)
+    except Exception as e:
+        return dashboard_routes.erro_interno(e)
+
+
+async def _eventos_do_usuario(usuario_id, cargo, posicao, mensagens):
+    for mensagem in mensagens:
+        yield mensagem
+
+    fim = time.monotonic() + SSE_DURACAO_MAXIMA
+    while time.monotonic() < fim:
+        eventos, perdeu = await barramento.aguardar_async(posicao, min(SSE_HEARTBEAT, max(0, fim - time.monotonic())))
+        if not eventos:
+            yield HEARTBEAT_SSE
+            continue
+
+        mensagens, posicao = mensagens_do_usuario(eventos, perdeu, posicao, usuario_id, cargo)
+        for mensagem in mensagens:
+            yield mensagem
+
+
+@rota("GET", "/api/dashboard/stream")
+@autenticado(locations=["headers", "query_string"])
+async def stream_dashboard(db):
+    try:
+        user_data = get_current_user_from_token()
+        if not user_data:
+            return dashboard_routes.usuario_nao_encontrado()
+    except Exception as e:
+        return dashboard_routes.erro_interno(e)
+
+    posicao, mensagens = abrir_stream(dashboard_routes.ultimo_evento_recebido())
+    return StreamASGI(
+        _eventos_do_usuario(user_data["id"], user_data["cargo"], posicao, mensagens),
+        "text/event-stream",
+        dashboard_routes.CABECALHOS_SSE
+    )
+
+
+@rota("GET", "/api/recurso/")
+@autenticado()
+@condicional("recursos")
+async def get_resources(db):
+    try:
+        itens, next_cursor = await listar_recursos_async(db, **recurso_routes.parametros_listagem())
+        return recurso_routes.resposta_listagem(itens, next_cursor)
+    except ValueError as e:
+        return recurso_routes.erro_parametros(e)
+    except Exception as e:
+        return recurso_routes.erro_listagem(e)
+
+
+@rota("GET", "/api/recurso/search")
+@autenticado()
+@condicional("recursos")
+async def search_resources(db):
+    try:
+        itens, next_cursor, ordenacao = await buscar_recursos_async(db, **recurso_routes.parametros_busca())
+        return recurso_routes.resposta_busca(itens, next_cursor, ordenacao)
+    except ValueError as e:
+        return recurso_routes.erro_parametros(e)
+    except Exception:
+        return recurso_routes.erro_busca()
+
+
+@rota("POST", "/api/auth/login", somente_leitura=False)
+async def login_route(db):
+    try:
+        data, erro = auth_routes.validar_login()
+        if erro:
+            return erro
+
+        result = await authenticate_user_async(db, data['email'], data['senha'])
+        return auth_routes.resposta_login(data['email'], result)
+    except HashSobrecarregado as e:
+        return auth_routes.hash_sobrecarregado(e)
+    except Exception as e:
+        return auth_routes.erro_interno(e)
+
+
+@rota("GET", "/api/auth/me")
+@autenticado()
+async def get_current_user(db):
+    try:
+        current_user = get_current_user_from_token()
+        if not current_user:
+            return auth_routes.token_sem_usuario()
+
+        user_data = await get_user_by_id_async(db, current_user['id'])
+        return auth_routes.resposta_me(user_data)
+    except Exception as e:
+        return auth_routes.erro_me(e)
+
+
+class _CorpoASGI(io.RawIOBase):
+    """wsgi.input que lê o corpo da requisição ASGI aos poucos, a partir de uma thread do pool"""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._pendente = b""
+        self._fim = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while not self._pendente and not self._fim:
+            mensagem = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if mensagem["type"] == "http.disconnect":
+                self._fim = True
+                break
+            self._pendente = mensagem.get("body", b"")
+            self._fim = not mensagem.get("more_body", False)
+
+        tamanho = min(len(destino), len(self._pendente))
+        destino[:tamanho] = self._pendente[:tamanho]
+        self._pendente = self._pendente[tamanho:]
+        return tamanho
+
+
+def _environ(scope, corpo):
+    servidor = scope.get("server") or ("localhost", 80)
+    cliente = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": cliente[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": corpo,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for nome, valor in scope.get("headers", []):
+        nome = nome.decode("latin-1")
+        valor = valor.decode("latin-1")
+        if nome == "content-type":
+            environ["CONTENT_TYPE"] = valor
+        elif nome == "content-length":
+            environ["CONTENT_LENGTH"] = valor
+        else:
+            chave = "HTTP_" + nome.upper().replace("-", "_")
+            environ[chave] = f"{environ[chave]},{valor}" if chave in environ else valor
+    return environ
+
+def _cabecalhos(headers):
+    return [(nome.lower().encode("latin-1"), valor.encode("latin-1")) for nome, valor in headers]
+
+async def _ler_corpo(receive):
+    partes = []
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            break
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body", False):
+            break
+    return b"".join(partes)
+
+async def _aguardar_desconexao(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class AplicacaoASGI:
+    def __init__(self, flask_app):
+        self.flask = flask_app
+        self._threads = ThreadPoolExecutor(max_workers=ASGI_THREADS_WSGI, thread_name_prefix="asgi-wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._ciclo_de_vida(receive, send)
+        elif scope["type"] == "http":
+            encontrada = ROTAS.get((scope["method"], scope["path"]))
+            if encontrada:
+                await self._executar(encontrada, scope, receive, send)
+            else:
+                await self._encaminhar_wsgi(scope, receive, send)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                for engine_async in set(engines_async()):
+                    await engine_async.dispose()
+                self._threads.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _executar(self, encontrada, scope, receive, send):
+        handler, somente_leitura = encontrada
+        corpo = await _ler_corpo(receive)
+        environ = _environ(scope, io.BytesIO(corpo))
+        environ["CONTENT_LENGTH"] = str(len(corpo))
+
+        with self.flask.request_context(environ):
+            try:
+                resposta = self.flask.preprocess_request()
+                if resposta is None:
+                    async with AsyncSessionLocal(somente_leitura=somente_leitura) as db:
+                        resposta = await handler(db)
+                if not isinstance(resposta, StreamASGI):
+                    resposta = self.flask.make_response(resposta)
+            except Exception as e:
+                try:
+                    resposta = self.flask.make_response(self.flask.handle_user_exception(e))
+                except Exception as nao_tratada:
+                    resposta = self.flask.make_response(self.flask.handle_exception(nao_tratada))
+
+            if isinstance(resposta, StreamASGI):
+                await self._enviar_stream(resposta, receive, send)
+                return
+
+            resposta = self.flask.process_response(resposta)
+
+        await send({"type": "http.response.start", "status": resposta.status_code, "headers": _cabecalhos(resposta.headers.items())})
+        await send({"type": "http.response.body", "body": resposta.get_data()})
+
+    async def _enviar_stream(self, stream, receive, send):
+        headers = [("Content-Type", stream.mimetype), *stream.headers.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": _cabecalhos(headers)})
+
+        desconectado = asyncio.ensure_future(_aguardar_desconexao(receive))
+        try:
+            async for bloco in stream.gerador:
+                if desconectado.done():
+                    return
+                await send({"type": "http.response.body", "body": bloco.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            desconectado.cancel()
+            await stream.gerador.aclose()
+
+    async def _encaminhar_wsgi(self, scope, receive, send):
+        """Executa o app Flask em uma thread do pool, repassando corpo e resposta em blocos"""
+        loop = asyncio.get_running_loop()
+        environ = _environ(scope, _CorpoASGI(receive, loop))
+        inicio = {}
+
+        def start_response(status, headers, exc_info=None):
+            inicio["status"] = int(status.split(" ", 1)[0])
+            inicio["headers"] = headers
+
+        fim = object()
+        resultado = await loop.run_in_executor(self._threads, self.flask.wsgi_app, environ, start_response)
+        blocos = iter(resultado)
+        try:
+            await send({"type": "http.response.start", "status": inicio["status"], "headers": _cabecalhos(inicio["headers"])})
+            while True:
+                bloco = await loop.run_in_executor(self._threads, next, blocos, fim)
+                if bloco is fim:
+                    break
+                if bloco:
+                    await send({"type": "http.response.body", "body": bloco, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(resultado, "close"):
+                await loop.run_in_executor(self._threads, resultado.close)
+
+
+def create_asgi_app(flask_app=None):
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    return AplicacaoASGI(flask_app)
@@ -0,0 +1,292 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+from app.config import CACHE_URL, CACHE_TTL, CACHE_MAX_ITENS, USUARIO_CACHE_TTL
+
+# Versões começam no instante atual (ms) para continuarem crescendo mesmo se
+# o contador for perdido (reinício do processo ou descarte pelo Redis)
+def _versao_inicial():
+    return int(time.time() * 1000)
+
+
+class BackendMemoria:
+    """Dicionário do próprio processo com descarte LRU e expiração por TTL"""
+
+    compartilhado = False
+
+    def __init__(self, max_itens=CACHE_MAX_ITENS):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def versao(self, nome):
+        with self._lock:
+            return self._versoes.setdefault(nome, _versao_inicial())
+
+    def incrementar_versao(self, nome):
+        with self._lock:
+            self._versoes[nome] = self._versoes.get(nome, _versao_inicial()) + 1
+            return self._versoes[nome]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+class BackendSQLite:
+    """Arquivo SQLite compartilhado entre workers, com índice por expiração"""
+
+    compartilhado = True
+
+    def __init__(self, caminho, max_itens=CACHE_MAX_ITENS):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self._local = threading.local()
+        self._escritas = 0
+        self._criar_tabelas()
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _criar_tabelas(self):
+        conexao = self._conexao()
+        conexao.execute("CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL NOT NULL)")
+        conexao.execute("CREATE INDEX IF NOT EXISTS ix_cache_expira ON cache (expira)")
+        conexao.execute("CREATE TABLE IF NOT EXISTS cache_versoes (nome TEXT PRIMARY KEY, versao INTEGER NOT NULL)")
+
+    def get(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND expira > ?", (chave, time.time())
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def set(self, chave, valor, ttl):
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)",
+            (chave, json.dumps(valor), time.time() + ttl)
+        )
+        self._escritas += 1
+        if self._escritas % 100 == 0:
+            self._descartar(conexao)
+
+    def _descartar(self, conexao):
+        """Remove expirados e, acima do limite, os que expiram primeiro"""
+        conexao.execute("DELETE FROM cache WHERE expira <= ?", (time.time(),))
+        conexao.execute(
+            "DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY expira "
+            "LIMIT max(0, (SELECT count(*) FROM cache) - ?))",
+            (self.max_itens,)
+        )
+
+    def delete(self, chave):
+        self._conexao().execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def versao(self, nome):
+        # Caminho de leitura: só um SELECT; a trava de escrita fica para a primeira vez
+        conexao = self._conexao()
+        linha = conexao.execute("SELECT versao FROM cache_versoes WHERE nome = ?", (nome,)).fetchone()
+        if linha is not None:
+            return linha[0]
+        conexao.execute("INSERT OR IGNORE INTO cache_versoes (nome, versao) VALUES (?, ?)", (nome, _versao_inicial()))
+        return conexao.execute("SELECT versao FROM cache_versoes WHERE nome = ?", (nome,)).fetchone()[0]
+
+    def incrementar_versao(self, nome):
+        self.versao(nome)
+        conexao = self._conexao()
+        conexao.execute("UPDATE cache_versoes SET versao = versao + 1 WHERE nome = ?", (nome,))
+        return conexao.execute("SELECT versao FROM cache_versoes WHERE nome = ?", (nome,)).fetchone()[0]
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM cache")
+
+
+class BackendRedis:
+    """Redis (ou compatível) local; o descarte LRU fica a cargo do maxmemory-policy do servidor"""
+
+    compartilhado = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("O backend redis:// requer o pacote 'redis' instalado")
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, chave):
+        valor = self._redis.get(chave)
+        return json.loads(valor) if valor is not None else None
+
+    def set(self, chave, valor, ttl):
+        self._redis.set(chave, json.dumps(valor), ex=max(1, int(ttl)))
+
+    def delete(self, chave):
+        self._redis.delete(chave)
+
+    def versao(self, nome):
+        chave = f"versao:{nome}"
+        valor = self._redis.get(chave)
+        if valor is None:
+            self._redis.set(chave, _versao_inicial(), nx=True)
+            valor = self._redis.get(chave)
+        return int(valor)
+
+    def incrementar_versao(self, nome):
+        chave = f"versao:{nome}"
+        self._redis.set(chave, _versao_inicial(), nx=True)
+        return int(self._redis.incr(chave))
+
+    def limpar(self):
+        self._redis.flushdb()
+
+
+def criar_backend(url):
+    """
+    Cria o backend a partir de uma URL:
+    memoria://?max_itens=1024, sqlite:///caminho/cache.db ou redis://localhost:6379/0
+    """
+    partes = urlparse(url)
+    parametros = parse_qs(partes.query)
+    max_itens = int(parametros.get("max_itens", [CACHE_MAX_ITENS])[0])
+
+    if partes.scheme == "memoria":
+        return BackendMemoria(max_itens)
+    if partes.scheme == "sqlite":
+        caminho = partes.path[1:] if partes.path.startswith("/") else partes.path
+        return BackendSQLite(os.path.abspath(caminho or "cache.db"), max_itens)
+    if partes.scheme in ("redis", "rediss"):
+        return BackendRedis(url)
+    raise ValueError(f"Backend de cache desconhecido: {url}")
+
+
+class Cache:
+    """
+    Cache read-through com chaves versionadas e contadores de acerto/falha.
+    Os contadores são do processo; a soma entre workers sai em /metrics.
+    """
+
+    def __init__(self, backend, namespace, ttl=CACHE_TTL):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._lock_contadores = threading.Lock()
+
+    def _contar(self, acertos=0, falhas=0):
+        with self._lock_contadores:
+            self.acertos += acertos
+            self.falhas += falhas
+
+    def _chave(self, endpoint, parametros, versao=None):
+        if versao is None:
+            versao = self.backend.versao(self.namespace)
+        return f"{self.namespace}:v{versao}:{endpoint}:{json.dumps(parametros, sort_keys=True)}"
+
+    def obter(self, endpoint, carregar, parametros=None, ttl=None):
+        """Retorna o valor em cache ou executa carregar() e guarda o resultado"""
+        chave = self._chave(endpoint, parametros)
+        item = self.backend.get(chave)
+
+        if item is not None:
+            self._contar(acertos=1)
+            return item["v"]
+
+        self._contar(falhas=1)
+        valor = carregar()
+        # O valor é embrulhado para que None também possa ser guardado
+        self.backend.set(chave, {"v": valor}, ttl or self.ttl)
+        return valor
+
+    def obter_varios(self, endpoint, parametros, carregar, ttl=None):
+        """
+        Versão em lote de obter(). parametros é {identificador: parametros};
+        carregar(faltantes) recebe os identificadores ausentes do cache e retorna
+        {identificador: valor} (ausentes são guardados como None). Retorna {identificador: valor}.
+        """
+        versao = self.backend.versao(self.namespace)
+        chaves = {identificador: self._chave(endpoint, params, versao) for identificador, params in parametros.items()}
+
+        valores = {}
+        faltantes = []
+        for identificador, chave in chaves.items():
+            item = self.backend.get(chave)
+            if item is None:
+                faltantes.append(identificador)
+            else:
+                valores[identificador] = item["v"]
+        self._contar(acertos=len(valores), falhas=len(faltantes))
+
+        if faltantes:
+            carregados = carregar(faltantes)
+            for identificador in faltantes:
+                valores[identificador] = carregados.get(identificador)
+                self.backend.set(chaves[identificador], {"v": valores[identificador]}, ttl or self.ttl)
+        return valores
+
+    def remover(self, endpoint, parametros=None):
+        """Remove uma única entrada (invalidação explícita)"""
+        self.backend.delete(self._chave(endpoint, parametros))
+
+    def invalidar(self):
+        """Invalida todas as entradas do namespace incrementando sua versão"""
+        return self.backend.incrementar_versao(self.namespace)
+
+    def estatisticas(self):
+        """Estatísticas deste processo"""
+        with self._lock_contadores:
+            acertos, falhas = self.acertos, self.falhas
+        total = acertos + falhas
+        return {
+            "namespace": self.namespace,
+            "escopo": "processo",
+            "acertos": acertos,
+            "falhas": falhas,
+            "taxa_acerto": round(acertos / total, 4) if total else 0.0,
+            "versao": self.backend.versao(self.namespace)
+        }
+
+
+backend_padrao = criar_backend(CACHE_URL)
+
+cache_recursos = Cache(backend_padrao, "recursos")
+cache_usuarios = Cache(backend_padrao, "usuarios", ttl=USUARIO_CACHE_TTL)
+
+def invalidar_inventario():
+    """Chamado pelas rotas de escrita de recursos após o commit"""
+    return cache_recursos.invalidar()
@@ -0,0 +1,70 @@
+import gzip
+
+from flask import request
+
+from app.config import (
+    COMPRESSAO_ATIVA,
+    COMPRESSAO_MINIMO,
+    COMPRESSAO_NIVEL_GZIP,
+    COMPRESSAO_QUALIDADE_BROTLI
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRESSIVEIS = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+}
+
+def _gzip(dados):
+    return gzip.compress(dados, compresslevel=COMPRESSAO_NIVEL_GZIP, mtime=0)
+
+def _brotli(dados):
+    return brotli.compress(dados, quality=COMPRESSAO_QUALIDADE_BROTLI)
+
+CODIFICACOES = {"gzip": _gzip}
+if brotli is not None:
+    CODIFICACOES = {"br": _brotli, "gzip": _gzip}
+
+# Cada codificação tem sua própria ETag forte (sufixo), como recomenda a RFC 9110
+def variantes_etag(etag):
+    return [etag] + [f"{etag}-{codificacao}" for codificacao in CODIFICACOES]
+
+
+def comprimir_resposta(response):
+    """after_request: comprime respostas acima de COMPRESSAO_MINIMO bytes conforme o Accept-Encoding"""
+    if (
+        response.mimetype not in TIPOS_COMPRESSIVEIS
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    if response.status_code != 200 or response.content_length is None or response.content_length < COMPRESSAO_MINIMO:
+        return response
+
+    codificacao = request.accept_encodings.best_match(list(CODIFICACOES))
+    if not codificacao:
+        return response
+
+    response.set_data(CODIFICACOES[codificacao](response.get_data()))
+    response.headers["Content-Encoding"] = codificacao
+
+    etag, fraca = response.get_etag()
+    if etag and not fraca:
+        response.set_etag(f"{etag}-{codificacao}")
+    return response
+
+
+def registrar_compressao(app):
+    if COMPRESSAO_ATIVA:
+        app.after_request(comprimir_resposta)
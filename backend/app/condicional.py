@@ -0,0 +1,86 @@
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from app.compressao import variantes_etag
+from app.database import get_db
+from app.services.contadores_service import chave_versao, ler_contadores
+
+
+def _etag(versoes, por_usuario):
+    partes = [str(int(valor)) for valor in versoes]
+    if por_usuario:
+        # A mesma URL muda de conteúdo conforme o usuário e o cargo do token
+        partes.insert(0, f"{get_jwt_identity()}.{get_jwt().get('cargo')}")
+    return "-".join(partes)
+
+def avaliar_condicional(versoes, chaves, por_usuario=False):
+    """
+    Compara as versões lidas com If-None-Match / If-Modified-Since da requisição.
+    Retorna (etag, modificado_em, atual); atual indica que cabe um 304.
+    """
+    etag = _etag([versoes[chave] for chave in chaves], por_usuario)
+
+    # As versões são o instante da última alteração em ms. O Last-Modified tem
+    # resolução de segundos: a versão é arredondada para cima, e o cabeçalho só
+    # é enviado depois que esse segundo passou (nunca no futuro). Assim uma
+    # escrita posterior à resposta cai em um segundo maior e invalida o IMS
+    ultima = max(versoes.values())
+    agora = time.time()
+    segundo = datetime.fromtimestamp(-(-ultima // 1000), tz=timezone.utc) if ultima else None
+    modificado_em = segundo if segundo and segundo.timestamp() < agora else None
+
+    if request.if_none_match:
+        # A ETag da resposta comprimida leva o sufixo da codificação
+        recebida = next((v for v in variantes_etag(etag) if request.if_none_match.contains(v)), None)
+        if recebida is not None:
+            return recebida, modificado_em, True
+        return etag, modificado_em, False
+
+    # Uma data posterior ao relógio do servidor é inválida e é ignorada
+    desde = request.if_modified_since
+    atual = bool(segundo and desde and segundo <= desde and desde.timestamp() <= agora)
+    return etag, modificado_em, atual
+
+def marcar_validadores(resposta, etag, modificado_em):
+    resposta.set_etag(etag)
+    if modificado_em:
+        resposta.last_modified = modificado_em
+    # Autenticado: o navegador pode guardar, mas deve revalidar sempre
+    resposta.headers["Cache-Control"] = "private, no-cache"
+    return resposta
+
+def get_condicional(*conjuntos, por_usuario=False, quando=None):
+    """
+    GET condicional com ETag forte e Last-Modified derivados das versões dos
+    conjuntos de dados (uma leitura na tabela de contadores, sem tocar no corpo).
+    Quando o cliente já tem a versão atual responde 304 sem executar a rota.
+    quando(): se retornar falso, a requisição é atendida sem validadores (ex.:
+    a resposta depende do relógio, que não muda a versão).
+    Deve ficar abaixo de @jwt_required().
+    """
+    chaves = [chave_versao(conjunto) for conjunto in conjuntos]
+
+    def decorador(rota):
+        @wraps(rota)
+        def envolvida(*args, **kwargs):
+            if quando is not None and not quando():
+                return rota(*args, **kwargs)
+
+            versoes = ler_contadores(get_db(somente_leitura=True), chaves)
+            etag, modificado_em, atual = avaliar_condicional(versoes, chaves, por_usuario)
+
+            if atual:
+                resposta = make_response("", 304)
+            else:
+                resposta = make_response(rota(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            return marcar_validadores(resposta, etag, modificado_em)
+
+        return envolvida
+    return decorador
@@ -2,8 +2,112 @@ import os
 from datetime import timedelta
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///app.db")
+# Réplica opcional para endpoints somente leitura (dashboard, estatísticas, listagens)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+# Após uma escrita, o usuário lê do primário por este número de segundos (read-your-writes).
+# A marca fica no cache: com réplica, CACHE_URL precisa ser compartilhado (sqlite:// ou redis://)
+LEITURA_JANELA_ESCRITA = int(os.getenv("LEITURA_JANELA_ESCRITA", "5"))
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "batgestor-super-secret-key-change-in-production")
 JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
 JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
- 
+
+# Paginação por cursor (keyset) das listagens
+PAGINACAO_LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "50"))
+PAGINACAO_LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "500"))
+
+# Busca textual (GET /api/recurso/search). Acima de BUSCA_LIMITE_RELEVANCIA resultados
+# a ordenação por relevância exigiria pontuar todos; a busca passa a ordenar por id
+BUSCA_MIN_CARACTERES = int(os.getenv("BUSCA_MIN_CARACTERES", "2"))
+BUSCA_LIMITE_RELEVANCIA = int(os.getenv("BUSCA_LIMITE_RELEVANCIA", "2000"))
+
+# Histórico de estoque (GET /api/recurso/<id>/historico), servido pelos agregados por hora e por dia
+HISTORICO_PERIODO_PADRAO = int(os.getenv("HISTORICO_PERIODO_PADRAO", "30"))  # dias
+HISTORICO_MAX_HORAS = int(os.getenv("HISTORICO_MAX_HORAS", "744"))  # pontos da série por hora (31 dias)
+
+# Importação e exportação em massa de recursos (CSV / NDJSON)
+IMPORTACAO_LOTE = int(os.getenv("IMPORTACAO_LOTE", "500"))
+IMPORTACAO_MAX_ERROS = int(os.getenv("IMPORTACAO_MAX_ERROS", "1000"))
+EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "1000"))
+# Máximo de operações aceitas por chamada de POST /api/recurso/batch
+LOTE_MAX_OPERACOES = int(os.getenv("LOTE_MAX_OPERACOES", "1000"))
+
+# Tarefas periódicas executadas em segundo plano (intervalo em segundos, 0 desativa)
+TAREFAS_ATIVAS = os.getenv("TAREFAS_ATIVAS", "true").lower() == "true"
+ALERTAS_AUTOMATICOS_INTERVALO = int(os.getenv("ALERTAS_AUTOMATICOS_INTERVALO", "60"))
+CONTADORES_RECONCILIACAO_INTERVALO = int(os.getenv("CONTADORES_RECONCILIACAO_INTERVALO", "3600"))
+# Com vários workers só o processo que detém esta trava executa as tarefas; vazio: um arquivo
+# por banco no diretório temporário (vale para os processos do mesmo host)
+TAREFAS_TRAVA = os.getenv("TAREFAS_TRAVA", "")
+TAREFAS_LIDER_ESPERA = int(os.getenv("TAREFAS_LIDER_ESPERA", "30"))  # segundos entre tentativas de assumir a trava
+
+# Arquivo JSON opcional com as regras de alerta (padrão: regras_alerta.REGRAS_PADRAO)
+ALERTA_REGRAS_ARQUIVO = os.getenv("ALERTA_REGRAS_ARQUIVO")
+
+# Cache das leituras de recursos: memoria://, sqlite:///cache.db ou redis://localhost:6379/0
+CACHE_URL = os.getenv("CACHE_URL", "memoria://")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "1024"))
+USUARIO_CACHE_TTL = int(os.getenv("USUARIO_CACHE_TTL", "300"))
+
+# Armazenamento dos JTIs revogados (logout): memoria://, sqlite:///revogados.db ou redis://...
+REVOGACAO_URL = os.getenv("REVOGACAO_URL", "memoria://")
+REVOGACAO_MAX_ITENS = int(os.getenv("REVOGACAO_MAX_ITENS", "100000"))  # memoria://: cheio, o logout responde 503
+
+# Hash de senhas: método do werkzeug (ex.: scrypt:32768:8:1, pbkdf2:sha256:600000)
+# e pool dedicado com limite de fila. O pool usa no máximo metade dos núcleos: o
+# hashlib libera o GIL, e com um worker por núcleo uma rajada de logins ocuparia a CPU inteira
+SENHA_HASH_METODO = os.getenv("SENHA_HASH_METODO", "scrypt:32768:8:1")
+SENHA_HASH_WORKERS = int(os.getenv("SENHA_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+SENHA_HASH_FILA_MAX = int(os.getenv("SENHA_HASH_FILA_MAX", "64"))
+
+# Limitação de tentativas de login (token bucket por IP e por conta + bloqueio progressivo)
+LIMITADOR_URL = os.getenv("LIMITADOR_URL", "memoria://?max_itens=100000")
+LOGIN_IP_CAPACIDADE = int(os.getenv("LOGIN_IP_CAPACIDADE", "20"))
+LOGIN_IP_POR_MINUTO = float(os.getenv("LOGIN_IP_POR_MINUTO", "30"))
+LOGIN_CONTA_CAPACIDADE = int(os.getenv("LOGIN_CONTA_CAPACIDADE", "5"))
+LOGIN_CONTA_POR_MINUTO = float(os.getenv("LOGIN_CONTA_POR_MINUTO", "5"))
+LOGIN_FALHAS_ANTES_BLOQUEIO = int(os.getenv("LOGIN_FALHAS_ANTES_BLOQUEIO", "3"))
+LOGIN_BLOQUEIO_BASE = int(os.getenv("LOGIN_BLOQUEIO_BASE", "2"))
+LOGIN_BLOQUEIO_MAXIMO = int(os.getenv("LOGIN_BLOQUEIO_MAXIMO", "900"))
+
+# Perfil do engine SQLite aplicado em cada nova conexão
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB (64 MiB)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+# Pool de conexões
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Expõe o número de consultas SQL de cada requisição no cabeçalho X-Consultas
+CONSULTAS_CABECALHO = os.getenv("CONSULTAS_CABECALHO", "false").lower() == "true"
+
+# Serialização JSON das respostas: auto (orjson se instalado), orjson ou padrao (stdlib)
+JSON_PROVEDOR = os.getenv("JSON_PROVEDOR", "auto")
+
+# Compressão negociada por Accept-Encoding (br se o pacote brotli estiver instalado, senão gzip)
+COMPRESSAO_ATIVA = os.getenv("COMPRESSAO_ATIVA", "true").lower() == "true"
+COMPRESSAO_MINIMO = int(os.getenv("COMPRESSAO_MINIMO", "1024"))  # bytes
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", "6"))
+COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv("COMPRESSAO_QUALIDADE_BROTLI", "4"))
+
+# Stream de eventos do dashboard (Server-Sent Events)
+SSE_HISTORICO = int(os.getenv("SSE_HISTORICO", "1000"))  # eventos guardados para retomada com Last-Event-ID
+SSE_HEARTBEAT = int(os.getenv("SSE_HEARTBEAT", "15"))  # segundos
+SSE_DURACAO_MAXIMA = int(os.getenv("SSE_DURACAO_MAXIMA", "300"))  # segundos; o cliente reconecta sozinho
+SSE_RECONEXAO = int(os.getenv("SSE_RECONEXAO", "3000"))  # ms sugeridos ao EventSource
+
+# Modo ASGI (asgi.py): threads que atendem as rotas ainda síncronas, repassadas ao app WSGI
+ASGI_THREADS_WSGI = int(os.getenv("ASGI_THREADS_WSGI", "32"))
+
+# Métricas Prometheus em GET /metrics
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "true").lower() == "true"
+METRICAS_DIR = os.getenv("METRICAS_DIR", "")  # com vários workers: diretório compartilhado para somar os processos
+METRICAS_INTERVALO = int(os.getenv("METRICAS_INTERVALO", "5"))  # segundos entre gravações do instantâneo
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")  # se definido, exigido como Bearer; vazio: só loopback
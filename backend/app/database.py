@@ -1,23 +1,311 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql import Select
+from app.config import (
+    DATABASE_URL,
+    READ_DATABASE_URL,
+    LEITURA_JANELA_ESCRITA,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_TEMP_STORE,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_PRE_PING
+)
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {} 
-    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _sqlite_em_memoria(url):
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
 
-Base = declarative_base()
+def criar_engine(url):
+    """Cria o engine com o perfil de pool e, no SQLite, os PRAGMAs de produção"""
+    opcoes = {"pool_pre_ping": DB_POOL_PRE_PING}
 
-def get_db():
-    db = SessionLocal()
+    if url.startswith("sqlite"):
+        opcoes["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT / 1000}
+    if not _sqlite_em_memoria(url):
+        opcoes.update(
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+
+    novo_engine = create_engine(url, **opcoes)
+
+    if url.startswith("sqlite"):
+        event.listen(novo_engine, "connect", _aplicar_pragmas_sqlite)
+
+    return novo_engine
+
+def _aplicar_pragmas_sqlite(conexao_dbapi, registro_conexao):
+    # WAL permite leituras concorrentes com um escritor; os demais PRAGMAs
+    # valem por conexão e por isso são aplicados a cada nova conexão do pool
+    cursor = conexao_dbapi.cursor()
     try:
-        yield db
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA temp_store={SQLITE_TEMP_STORE}")
     finally:
-        db.close()
\ No newline at end of file
+        cursor.close()
+
+
+engine = criar_engine(DATABASE_URL)
+engine_leitura = criar_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+
+
+class SessaoRoteada(Session):
+    """
+    Sessões marcadas como somente leitura enviam SELECTs para a réplica;
+    flush e qualquer outra instrução vão sempre para o primário.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            engine_leitura is not engine
+            and self.info.get("somente_leitura")
+            and not self._flushing
+            and isinstance(clause, Select)
+        ):
+            return engine_leitura
+        return engine
+
+
+SessionLocal = sessionmaker(class_=SessaoRoteada, autocommit=False, autoflush=False, bind=engine)
+
+
+def usuario_atual():
+    """Id (int) do usuário do JWT da requisição corrente, ou None fora de requisição autenticada"""
+    from flask import has_request_context
+    if not has_request_context():
+        return None
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        identidade = get_jwt_identity()
+    except Exception:
+        return None
+    try:
+        return int(identidade)
+    except (TypeError, ValueError):
+        return None
+
+def _chave_escrita(usuario_id):
+    return f"escrita_recente:{usuario_id}"
+
+def _ler_da_replica():
+    """Falso para o usuário que escreveu há menos de LEITURA_JANELA_ESCRITA segundos"""
+    from app.cache import backend_padrao
+    usuario_id = usuario_atual()
+    return usuario_id is None or backend_padrao.get(_chave_escrita(usuario_id)) is None
+
+def verificar_replica():
+    """
+    A janela de leitura do primário após uma escrita fica em backend_padrao e
+    precisa valer para todos os workers: com réplica, exige CACHE_URL compartilhado.
+    """
+    if engine_leitura is engine:
+        return
+    from app.cache import backend_padrao
+    if not backend_padrao.compartilhado:
+        raise RuntimeError(
+            "READ_DATABASE_URL requer CACHE_URL compartilhado entre os workers "
+            "(sqlite:///caminho/cache.db ou redis://...), não memoria://"
+        )
+
+def SessionLeitura():
+    """
+    Sessão para endpoints somente leitura. Usa a réplica, exceto para o
+    usuário que escreveu há menos de LEITURA_JANELA_ESCRITA segundos.
+    """
+    db = SessionLocal()
+    if engine_leitura is engine:
+        return db
+
+    db.info["somente_leitura"] = _ler_da_replica()
+    return db
+
+
+def ler_do_primario(db):
+    """
+    Usado ao preencher caches compartilhados: uma leitura atrasada da réplica
+    guardada sob a versão nova do cache seria servida a todos até o TTL.
+    """
+    db.info["somente_leitura"] = False
+    return db
+
+
+def _marcar_escrita(session, flush_context):
+    session.info["escreveu"] = True
+
+def _marcar_escrita_em_lote(estado):
+    """INSERT/UPDATE/DELETE via db.execute (importação, operações em lote, regras) não passam pelo flush"""
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info["escreveu"] = True
+
+def _registrar_escrita(session):
+    if not session.info.pop("escreveu", False) or engine_leitura is engine:
+        return
+    usuario_id = usuario_atual()
+    if usuario_id is not None:
+        from app.cache import backend_padrao
+        backend_padrao.set(_chave_escrita(usuario_id), 1, LEITURA_JANELA_ESCRITA)
+
+def _descartar_escrita(session):
+    session.info.pop("escreveu", None)
+
+event.listen(SessionLocal, "after_flush", _marcar_escrita)
+event.listen(SessionLocal, "do_orm_execute", _marcar_escrita_em_lote)
+event.listen(SessionLocal, "after_commit", _registrar_escrita)
+event.listen(SessionLocal, "after_rollback", _descartar_escrita)
+
+Base = declarative_base()
+
+def get_db(somente_leitura=False):
+    """
+    Sessão da requisição (ou do contexto da aplicação) corrente, criada no
+    primeiro uso e compartilhada por rotas e serviços. É fechada em encerrar_db.
+    """
+    from flask import g
+
+    db = g.get("db")
+    if db is None:
+        db = SessionLeitura() if somente_leitura else SessionLocal()
+        g.db = db
+    elif not somente_leitura:
+        # Uma escrita na mesma requisição passa a usar somente o primário
+        db.info["somente_leitura"] = False
+    return db
+
+def encerrar_db(exc=None):
+    """Registrado em teardown_appcontext: desfaz o que ficou pendente e devolve a conexão"""
+    from flask import g
+
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
+
+
+def _contar_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    from flask import g, has_app_context
+    if has_app_context():
+        g.consultas = g.get("consultas", 0) + 1
+
+for _engine in {engine, engine_leitura}:
+    event.listen(_engine, "before_cursor_execute", _contar_consulta)
+
+
+# Modo ASGI: mesmo banco acessado por drivers assíncronos (aiosqlite / asyncpg).
+# Os engines só são criados no primeiro uso, para o modo WSGI não depender dos drivers.
+DRIVERS_ASYNC = (
+    ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+    ("sqlite://", "sqlite+aiosqlite://"),
+    ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ("postgresql://", "postgresql+asyncpg://"),
+)
+
+def url_async(url):
+    for sincrono, assincrono in DRIVERS_ASYNC:
+        if url.startswith(sincrono):
+            return assincrono + url[len(sincrono):]
+    return url
+
+def criar_engine_async(url):
+    """Equivalente assíncrono de criar_engine, com o mesmo perfil de pool e PRAGMAs"""
+    from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+    opcoes = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        opcoes["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT / 1000}
+    if _sqlite_em_memoria(url):
+        opcoes["poolclass"] = StaticPool
+    else:
+        opcoes.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        novo_engine = create_async_engine(url_async(url), **opcoes)
+    except ImportError as e:
+        raise RuntimeError(
+            f"O modo ASGI requer 'greenlet' e o driver assíncrono do banco (aiosqlite ou asyncpg) instalados: {e}"
+        )
+
+    if url.startswith("sqlite"):
+        event.listen(novo_engine.sync_engine, "connect", _aplicar_pragmas_sqlite)
+    event.listen(novo_engine.sync_engine, "before_cursor_execute", _contar_consulta)
+    return novo_engine
+
+
+class SessaoAssincrona(SessionLocal.class_):
+    """
+    Sessão síncrona por trás da AsyncSession. Herda de SessionLocal.class_ para
+    receber os mesmos listeners (contadores, versões, eventos, cache de perfis)
+    e roteia para os engines assíncronos como SessaoRoteada faz com os síncronos.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primario, leitura = engines_async()
+        if (
+            leitura is not primario
+            and self.info.get("somente_leitura")
+            and not self._flushing
+            and isinstance(clause, Select)
+        ):
+            return leitura.sync_engine
+        return primario.sync_engine
+
+
+_engines_async = None
+_fabrica_async = None
+
+def engines_async():
+    global _engines_async
+    if _engines_async is None:
+        primario = criar_engine_async(DATABASE_URL)
+        leitura = criar_engine_async(READ_DATABASE_URL) if READ_DATABASE_URL else primario
+        _engines_async = (primario, leitura)
+    return _engines_async
+
+def engines_ativos():
+    """Engines já criados neste processo, por nome (usado pelas métricas de pool e SQL)"""
+    ativos = {"primario": engine}
+    if engine_leitura is not engine:
+        ativos["leitura"] = engine_leitura
+    if _engines_async is not None:
+        primario, leitura = _engines_async
+        ativos["primario_async"] = primario.sync_engine
+        if leitura is not primario:
+            ativos["leitura_async"] = leitura.sync_engine
+    return ativos
+
+def AsyncSessionLocal(somente_leitura=False):
+    """
+    AsyncSession para os handlers ASGI. Os serviços síncronos rodam nela com
+    db.run_sync(servico, ...), recebendo a sessão como primeiro parâmetro.
+    """
+    global _fabrica_async
+    if _fabrica_async is None:
+        primario = engines_async()[0]
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _fabrica_async = async_sessionmaker(sync_session_class=SessaoAssincrona, autoflush=False, bind=primario)
+
+    db = _fabrica_async()
+    if somente_leitura and engine_leitura is not engine:
+        db.info["somente_leitura"] = _ler_da_replica()
+    return db
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from app.config import SSE_HISTORICO, SSE_RECONEXAO
+from app.database import SessionLocal
+from app.models import Alerta
+
+Evento = namedtuple("Evento", "numero tipo dados usuario_id")
+
+# Campos do alerta enviados no stream (os mesmos de get_alertas_by_user, com ids no lugar das relações)
+CAMPOS_ALERTA = ("id", "titulo", "descricao", "status", "prioridade", "usuario_id", "recurso_id", "criado_em", "atualizado_em")
+
+
+class Barramento:
+    """
+    Pub/sub em memória do processo. Guarda os últimos SSE_HISTORICO eventos
+    para que um cliente reconectado com Last-Event-ID receba o que perdeu.
+    Cada processo tem o seu: só vê as escritas feitas nele mesmo.
+    """
+
+    def __init__(self, historico):
+        self._condicao = threading.Condition()
+        self._eventos = deque(maxlen=historico)
+        self._ultimo = 0
+        # Streams do modo ASGI: (loop, asyncio.Event) acordados a cada publicação
+        self._assinantes_async = set()
+        # Distingue os ids desta execução dos de uma execução anterior do servidor
+        self.instancia = str(int(time.time() * 1000))
+
+    def publicar(self, tipo, dados, usuario_id=None):
+        with self._condicao:
+            self._ultimo += 1
+            self._eventos.append(Evento(self._ultimo, tipo, dados, usuario_id))
+            self._condicao.notify_all()
+            assinantes = list(self._assinantes_async)
+
+        for loop, sinal in assinantes:
+            try:
+                loop.call_soon_threadsafe(sinal.set)
+            except RuntimeError:
+                # Loop já encerrado; o assinante some quando a espera terminar
+                pass
+
+    def posicao_atual(self):
+        with self._condicao:
+            return self._ultimo
+
+    def id_evento(self, numero):
+        return f"{self.instancia}-{numero}"
+
+    def posicao(self, ultimo_id):
+        """Converte um Last-Event-ID em posição; None se for de outra execução ou inválido"""
+        instancia, _, numero = (ultimo_id or "").partition("-")
+        if instancia != self.instancia or not numero.isdigit():
+            return None
+        return min(int(numero), self.posicao_atual())
+
+    def aguardar(self, posicao, timeout):
+        """
+        Eventos posteriores a posicao, esperando até timeout segundos por algum.
+        Retorna (eventos, perdeu); perdeu indica que parte deles já saiu do histórico.
+        """
+        with self._condicao:
+            if self._ultimo <= posicao:
+                self._condicao.wait(timeout)
+            return self._coletar(posicao)
+
+    async def aguardar_async(self, posicao, timeout):
+        """Como aguardar, mas suspende só a corrotina, sem ocupar uma thread"""
+        assinante = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condicao:
+            esperar = self._ultimo <= posicao
+            if esperar:
+                self._assinantes_async.add(assinante)
+
+        if esperar:
+            try:
+                await asyncio.wait_for(assinante[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condicao:
+                    self._assinantes_async.discard(assinante)
+
+        with self._condicao:
+            return self._coletar(posicao)
+
+    def _coletar(self, posicao):
+        if not self._eventos or self._ultimo <= posicao:
+            return [], False
+        perdeu = self._eventos[0].numero > posicao + 1
+        return [evento for evento in self._eventos if evento.numero > posicao], perdeu
+
+
+barramento = Barramento(SSE_HISTORICO)
+
+
+def registrar(db, tipo, dados=None, usuario_id=None):
+    """Enfileira um evento na sessão; ele só é publicado se a transação for confirmada"""
+    db.info.setdefault("eventos", []).append((tipo, dados or {}, usuario_id))
+
+def acumular_contadores(db, deltas):
+    """Soma deltas de contadores da transação; viram um único evento 'contadores' no commit"""
+    acumulados = db.info.setdefault("deltas_contadores", defaultdict(float))
+    for chave, valor in deltas.items():
+        if valor:
+            acumulados[chave] += valor
+
+
+def _dados_alerta(alerta):
+    return {campo: getattr(alerta, campo) for campo in CAMPOS_ALERTA}
+
+def _coletar_alertas(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Alerta):
+            registrar(session, "alerta_criado", _dados_alerta(obj), obj.usuario_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Alerta) and session.is_modified(obj, include_collections=False):
+            lido = obj.status == "lido" and inspect(obj).attrs.status.history.has_changes()
+            registrar(session, "alerta_lido" if lido else "alerta_atualizado", _dados_alerta(obj), obj.usuario_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Alerta):
+            registrar(session, "alerta_removido", {"id": obj.id}, obj.usuario_id)
+
+def _publicar(session):
+    eventos = session.info.pop("eventos", [])
+    deltas = session.info.pop("deltas_contadores", None)
+    for tipo, dados, usuario_id in eventos:
+        barramento.publicar(tipo, dados, usuario_id)
+    deltas = {chave: valor for chave, valor in (deltas or {}).items() if valor}
+    if deltas:
+        barramento.publicar("contadores", deltas)
+
+def _descartar(session):
+    session.info.pop("eventos", None)
+    session.info.pop("deltas_contadores", None)
+
+if not event.contains(SessionLocal, "after_commit", _publicar):
+    event.listen(SessionLocal, "after_flush", _coletar_alertas)
+    event.listen(SessionLocal, "after_commit", _publicar)
+    event.listen(SessionLocal, "after_rollback", _descartar)
+
+
+def visivel(evento, usuario_id, cargo):
+    """
+    Dados do evento que o usuário pode ver, ou None. Alertas seguem as regras de
+    get_alertas_by_user; contadores seguem os totais que get_dashboard_data expõe por cargo.
+    """
+    if evento.tipo != "contadores":
+        if cargo == "admin" or evento.usuario_id is None or evento.usuario_id == usuario_id:
+            return evento.dados
+        return None
+
+    # Só as chaves exatas que o dashboard do cargo mostra (ex.: valor_total é de admin)
+    from app.services.contadores_service import chaves_dashboard
+    chaves, prefixos = chaves_dashboard(usuario_id, cargo)
+    permitidas = set(chaves)
+    dados = {
+        chave: valor for chave, valor in evento.dados.items()
+        if chave in permitidas or chave.startswith(tuple(prefixos))
+    }
+    return dados or None
+
+
+def mensagem_sse(tipo, dados, id_evento=None):
+    linhas = []
+    if id_evento:
+        linhas.append(f"id: {id_evento}")
+    linhas.append(f"event: {tipo}")
+    linhas.append(f"data: {current_app.json.dumps(dados)}")
+    return "\n".join(linhas) + "\n\n"
+
+HEARTBEAT_SSE = ": heartbeat\n\n"
+
+def abrir_stream(ultimo_id):
+    """
+    Posição inicial a partir do Last-Event-ID e as primeiras mensagens do stream.
+    Um id de outra execução do servidor manda o cliente recarregar ('sincronizar').
+    """
+    posicao = barramento.posicao(ultimo_id) if ultimo_id else None
+    mensagens = [f"retry: {SSE_RECONEXAO}\n\n"]
+    if posicao is None:
+        posicao = barramento.posicao_atual()
+        if ultimo_id:
+            mensagens.append(mensagem_sse("sincronizar", {}, barramento.id_evento(posicao)))
+    return posicao, mensagens
+
+def mensagens_do_usuario(eventos, perdeu, posicao, usuario_id, cargo):
+    """Converte eventos em mensagens SSE visíveis ao usuário; retorna (mensagens, nova_posicao)"""
+    if perdeu:
+        # Parte do que o cliente não viu já saiu do histórico: ele recarrega o dashboard
+        posicao = eventos[-1].numero
+        return [mensagem_sse("sincronizar", {}, barramento.id_evento(posicao))], posicao
+
+    mensagens = []
+    for evento in eventos:
+        posicao = evento.numero
+        dados = visivel(evento, usuario_id, cargo)
+        if dados is not None:
+            mensagens.append(mensagem_sse(evento.tipo, dados, barramento.id_evento(posicao)))
+    return mensagens, posicao
@@ -0,0 +1,121 @@
+import math
+import threading
+import time
+
+from app.cache import criar_backend
+from app.config import (
+    LIMITADOR_URL,
+    LOGIN_IP_CAPACIDADE,
+    LOGIN_IP_POR_MINUTO,
+    LOGIN_CONTA_CAPACIDADE,
+    LOGIN_CONTA_POR_MINUTO,
+    LOGIN_FALHAS_ANTES_BLOQUEIO,
+    LOGIN_BLOQUEIO_BASE,
+    LOGIN_BLOQUEIO_MAXIMO
+)
+
+
+class LimitadorLogin:
+    """
+    Token bucket por IP e por conta, com bloqueio progressivo após falhas seguidas.
+    A decisão é tomada antes de qualquer consulta ao banco ou cálculo de hash.
+
+    O estado fica em um backend de app.cache: memória (padrão) ou sqlite/redis
+    para compartilhar entre workers. No backend compartilhado a leitura e a
+    escrita não são atômicas; sob concorrência o limite pode ser excedido em
+    poucas tentativas, o que é aceitável para contenção de carga.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.metricas = {
+            "permitidos": 0,
+            "bloqueados_ip": 0,
+            "bloqueados_conta": 0,
+            "falhas_registradas": 0
+        }
+
+    def _consumir(self, chave, capacidade, por_minuto, agora, extra=None):
+        """Retorna (estado, segundos até haver ficha); consome uma ficha se houver"""
+        estado = self.backend.get(chave) or {"fichas": capacidade, "ts": agora}
+        if extra:
+            for campo, valor in extra.items():
+                estado.setdefault(campo, valor)
+
+        taxa = por_minuto / 60.0
+        estado["fichas"] = min(capacidade, estado["fichas"] + (agora - estado["ts"]) * taxa)
+        estado["ts"] = agora
+
+        if estado["fichas"] >= 1:
+            estado["fichas"] -= 1
+            return estado, 0
+        return estado, math.ceil((1 - estado["fichas"]) / taxa) if taxa else LOGIN_BLOQUEIO_MAXIMO
+
+    def _ttl(self, capacidade, por_minuto):
+        # Tempo para um balde vazio encher de novo, mais o bloqueio máximo
+        return int(capacidade / (por_minuto / 60.0)) + LOGIN_BLOQUEIO_MAXIMO if por_minuto else LOGIN_BLOQUEIO_MAXIMO
+
+    def verificar(self, ip, email):
+        """Retorna (permitido, retry_after_segundos, motivo)"""
+        agora = time.time()
+        conta = f"login:conta:{email.strip().lower()}"
+
+        with self._lock:
+            estado_ip, espera = self._consumir(f"login:ip:{ip}", LOGIN_IP_CAPACIDADE, LOGIN_IP_POR_MINUTO, agora)
+            self.backend.set(f"login:ip:{ip}", estado_ip, self._ttl(LOGIN_IP_CAPACIDADE, LOGIN_IP_POR_MINUTO))
+            if espera:
+                self.metricas["bloqueados_ip"] += 1
+                return False, espera, "ip"
+
+            estado_conta, espera = self._consumir(
+                conta, LOGIN_CONTA_CAPACIDADE, LOGIN_CONTA_POR_MINUTO, agora,
+                extra={"falhas": 0, "bloqueado_ate": 0}
+            )
+            if not espera and estado_conta["bloqueado_ate"] > agora:
+                # Devolve a ficha: o bloqueio por falhas é que está valendo
+                estado_conta["fichas"] += 1
+                espera = math.ceil(estado_conta["bloqueado_ate"] - agora)
+            self.backend.set(conta, estado_conta, self._ttl(LOGIN_CONTA_CAPACIDADE, LOGIN_CONTA_POR_MINUTO))
+
+            if espera:
+                self.metricas["bloqueados_conta"] += 1
+                return False, espera, "conta"
+
+            self.metricas["permitidos"] += 1
+            return True, 0, None
+
+    def registrar_falha(self, email):
+        """Conta falhas seguidas; a partir do limite bloqueia por base * 2^n segundos"""
+        agora = time.time()
+        conta = f"login:conta:{email.strip().lower()}"
+
+        with self._lock:
+            estado = self.backend.get(conta) or {"fichas": LOGIN_CONTA_CAPACIDADE, "ts": agora}
+            estado["falhas"] = estado.get("falhas", 0) + 1
+
+            excedentes = estado["falhas"] - LOGIN_FALHAS_ANTES_BLOQUEIO
+            if excedentes >= 0:
+                bloqueio = min(LOGIN_BLOQUEIO_BASE * (2 ** excedentes), LOGIN_BLOQUEIO_MAXIMO)
+                estado["bloqueado_ate"] = agora + bloqueio
+
+            self.backend.set(conta, estado, self._ttl(LOGIN_CONTA_CAPACIDADE, LOGIN_CONTA_POR_MINUTO))
+            self.metricas["falhas_registradas"] += 1
+
+    def registrar_sucesso(self, email):
+        conta = f"login:conta:{email.strip().lower()}"
+
+        with self._lock:
+            estado = self.backend.get(conta)
+            if estado and (estado.get("falhas") or estado.get("bloqueado_ate")):
+                estado["falhas"] = 0
+                estado["bloqueado_ate"] = 0
+                self.backend.set(conta, estado, self._ttl(LOGIN_CONTA_CAPACIDADE, LOGIN_CONTA_POR_MINUTO))
+
+    def estatisticas(self):
+        """Decisões deste processo desde o início; exportadas em /metrics"""
+        with self._lock:
+            return dict(self.metricas)
+
+
+limitador_login = LimitadorLogin(criar_backend(LIMITADOR_URL))
@@ -0,0 +1,498 @@
+import atexit
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import METRICAS_ATIVAS, METRICAS_DIR, METRICAS_INTERVALO, METRICAS_TOKEN
+
+try:
+    import fcntl
+except ImportError:  # Windows: os arquivos de processos encerrados não são consolidados
+    fcntl = None
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_STREAMING = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+BUCKETS_HASH = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BUCKETS_SQL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+OPERACOES_SQL = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+ENDERECOS_LOCAIS = ("127.0.0.1", "::1")
+
+
+class Registro:
+    """
+    Métricas do processo em memória: contadores e histogramas atualizados sob
+    uma trava, com custo de algumas operações de dicionário por amostra.
+    Medidores (pool, cache) são lidos só na coleta, pelos coletores registrados.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._definicoes = {}
+        self._coletores = []
+        self.pid = os.getpid()
+        self._contadores = defaultdict(float)
+        self._histogramas = {}
+
+    def definir(self, nome, tipo, ajuda, buckets=None):
+        self._definicoes[nome] = (tipo, ajuda, buckets)
+
+    def coletor(self, funcao):
+        """Registra funcao() -> [(nome, rotulos, valor)], chamada a cada coleta"""
+        self._coletores.append(funcao)
+        return funcao
+
+    def incrementar(self, nome, rotulos, valor=1):
+        with self._trava:
+            self._contadores[(nome, rotulos)] += valor
+
+    def observar(self, nome, rotulos, valor):
+        buckets = self._definicoes[nome][2]
+        indice = bisect_left(buckets, valor)
+        with self._trava:
+            # Contagem por faixa (não acumulada), soma e total
+            amostras = self._histogramas.get((nome, rotulos))
+            if amostras is None:
+                amostras = self._histogramas[(nome, rotulos)] = [0] * (len(buckets) + 1) + [0.0, 0]
+            amostras[indice] += 1
+            amostras[-2] += valor
+            amostras[-1] += 1
+
+    def reiniciar_no_processo(self):
+        """Após um fork, descarta o que foi herdado do processo pai"""
+        with self._trava:
+            self.pid = os.getpid()
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    def instantaneo(self):
+        """Estado do processo em forma serializável (JSON)"""
+        with self._trava:
+            contadores = [[nome, list(rotulos), valor] for (nome, rotulos), valor in self._contadores.items()]
+            histogramas = [[nome, list(rotulos), list(amostras)] for (nome, rotulos), amostras in self._histogramas.items()]
+
+        # Medidores e contadores mantidos fora do registro (pool, cache) são lidos agora
+        for coleta in self._coletores:
+            contadores += [[nome, list(rotulos), valor] for nome, rotulos, valor in coleta()]
+        return {"pid": self.pid, "contadores": contadores, "histogramas": histogramas}
+
+    def somar(self, instantaneos):
+        """Um único instantâneo com a soma dos contadores e histogramas (medidores são descartados)"""
+        contadores = defaultdict(float)
+        histogramas = {}
+        for instantaneo in instantaneos:
+            for nome, rotulos, valor in instantaneo["contadores"]:
+                if self._definicoes.get(nome, (None,))[0] == "counter":
+                    contadores[(nome, tuple(map(tuple, rotulos)))] += valor
+            for nome, rotulos, amostras in instantaneo["histogramas"]:
+                chave = (nome, tuple(map(tuple, rotulos)))
+                if chave in histogramas:
+                    histogramas[chave] = [a + b for a, b in zip(histogramas[chave], amostras)]
+                else:
+                    histogramas[chave] = list(amostras)
+        return {
+            "pid": None,
+            "contadores": [[nome, list(rotulos), valor] for (nome, rotulos), valor in contadores.items()],
+            "histogramas": [[nome, list(rotulos), amostras] for (nome, rotulos), amostras in histogramas.items()]
+        }
+
+    def renderizar(self, instantaneos):
+        """Soma os instantâneos dos processos e escreve o formato texto do Prometheus"""
+        valores = defaultdict(float)
+        histogramas = {}
+        for instantaneo in instantaneos:
+            vivo = instantaneo.get("vivo", True)
+            for nome, rotulos, valor in instantaneo["contadores"]:
+                # Medidores de processos encerrados não valem mais; contadores continuam somando
+                if nome in self._definicoes and (vivo or self._definicoes[nome][0] == "counter"):
+                    valores[(nome, tuple(map(tuple, rotulos)))] += valor
+            for nome, rotulos, amostras in instantaneo["histogramas"]:
+                chave = (nome, tuple(map(tuple, rotulos)))
+                if chave in histogramas:
+                    histogramas[chave] = [a + b for a, b in zip(histogramas[chave], amostras)]
+                else:
+                    histogramas[chave] = list(amostras)
+
+        for funcao in _DERIVADAS:
+            valores.update(funcao(valores))
+
+        linhas = []
+        for nome, (tipo, ajuda, buckets) in self._definicoes.items():
+            if tipo == "histogram":
+                series = sorted((rotulos, amostras) for (n, rotulos), amostras in histogramas.items() if n == nome)
+            else:
+                series = sorted((rotulos, valor) for (n, rotulos), valor in valores.items() if n == nome)
+            if not series:
+                continue
+
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, dado in series:
+                if tipo != "histogram":
+                    linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(dado)}")
+                    continue
+                acumulado = 0
+                for limite, contagem in zip(buckets + (float("inf"),), dado):
+                    acumulado += contagem
+                    linhas.append(f"{nome}_bucket{_rotulos(rotulos + (('le', _numero(limite)),))} {acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos(rotulos)} {_numero(dado[-2])}")
+                linhas.append(f"{nome}_count{_rotulos(rotulos)} {dado[-1]}")
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos) + "}"
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+registro = Registro()
+
+registro.definir("wayne_http_requisicoes_total", "counter", "Requisições HTTP atendidas, por rota e status")
+registro.definir("wayne_http_duracao_segundos", "histogram", "Tempo até a resposta ficar pronta; em streaming (exportação, SSE) só até os cabeçalhos", BUCKETS_HTTP)
+registro.definir("wayne_http_streaming_duracao_segundos", "histogram", "Duração completa das respostas em streaming, medida no fechamento", BUCKETS_STREAMING)
+registro.definir("wayne_sql_duracao_segundos", "histogram", "Duração das instruções SQL por engine e operação", BUCKETS_SQL)
+registro.definir("wayne_sql_erros_total", "counter", "Instruções SQL que falharam")
+registro.definir("wayne_db_pool_conexoes_em_uso", "gauge", "Conexões emprestadas do pool (checkout)")
+registro.definir("wayne_db_pool_conexoes_ociosas", "gauge", "Conexões paradas no pool")
+registro.definir("wayne_db_pool_overflow", "gauge", "Conexões além de pool_size (negativo: vagas ainda não abertas)")
+registro.definir("wayne_db_pool_tamanho", "gauge", "pool_size configurado")
+registro.definir("wayne_cache_acertos_total", "counter", "Leituras atendidas pelo cache")
+registro.definir("wayne_cache_falhas_total", "counter", "Leituras que foram ao banco")
+registro.definir("wayne_cache_taxa_acerto", "gauge", "acertos / (acertos + falhas) somando todos os processos")
+registro.definir("wayne_login_decisoes_total", "counter", "Tentativas de login liberadas ou barradas pelo limitador, por decisão")
+registro.definir("wayne_login_falhas_total", "counter", "Falhas de senha registradas pelo limitador")
+registro.definir("wayne_hash_senha_concluidos_total", "counter", "Hashes e verificações de senha concluídos no pool")
+registro.definir("wayne_hash_senha_rejeitados_total", "counter", "Operações de senha recusadas com o pool cheio (503)")
+registro.definir("wayne_hash_senha_espera_segundos", "histogram", "Tempo de cada operação de senha na fila do pool de hash", BUCKETS_HASH)
+registro.definir("wayne_hash_senha_execucao_segundos", "histogram", "Tempo de cada operação de senha calculando o hash", BUCKETS_HASH)
+registro.definir("wayne_hash_senha_workers", "gauge", "Threads do pool de hash (SENHA_HASH_WORKERS)")
+registro.definir("wayne_erros_servico_total", "counter", "Falhas tratadas nos serviços (resposta degradada), por operação")
+registro.definir("wayne_processos", "gauge", "Processos da aplicação com métricas vivas")
+
+
+# --- HTTP ---
+
+def _inicio_requisicao():
+    if registro.pid != os.getpid():
+        registro.reiniciar_no_processo()
+    _gravador.garantir()
+    g.inicio_metricas = time.perf_counter()
+
+def _registrar_requisicao(inicio, status):
+    # A regra (/api/recurso/<int:resource_id>) e não o caminho, para manter poucas séries
+    regra = request.url_rule.rule if request.url_rule is not None else "desconhecida"
+    rotulos = (("blueprint", request.blueprint or ""), ("rota", regra), ("metodo", request.method))
+    registro.observar("wayne_http_duracao_segundos", rotulos, time.perf_counter() - inicio)
+    registro.incrementar("wayne_http_requisicoes_total", rotulos + (("status", str(status)),))
+    return rotulos
+
+def _fim_requisicao(response):
+    inicio = g.pop("inicio_metricas", None)
+    if inicio is None:
+        return response
+
+    rotulos = _registrar_requisicao(inicio, response.status_code)
+
+    # O corpo em streaming (gerador) ainda vai ser produzido: a duração total só
+    # é conhecida quando o servidor fecha a resposta. Fica em outro histograma
+    # para que conexões SSE longas não distorçam as faixas das requisições comuns
+    if inspect.isgenerator(response.response):
+        response.call_on_close(lambda: registro.observar(
+            "wayne_http_streaming_duracao_segundos", rotulos, time.perf_counter() - inicio
+        ))
+    return response
+
+def _requisicao_interrompida(excecao=None):
+    """
+    Uma exceção que escapa sem passar pelo after_request (PROPAGATE_EXCEPTIONS,
+    ou falha em outro after_request) ainda vira 500 para o cliente e é contada aqui
+    """
+    inicio = g.pop("inicio_metricas", None)
+    if inicio is not None:
+        _registrar_requisicao(inicio, 500)
+
+
+# --- serviços ---
+
+def contar_erro(operacao):
+    """Falha capturada por um serviço que segue com uma resposta degradada"""
+    registro.incrementar("wayne_erros_servico_total", (("operacao", operacao),))
+
+
+# --- SQL ---
+
+_nomes_engine = {}
+
+def _nome_engine(engine):
+    nome = _nomes_engine.get(engine)
+    if nome is None:
+        from app.database import engines_ativos
+        _nomes_engine.update({criado: nome for nome, criado in engines_ativos().items()})
+        nome = _nomes_engine.setdefault(engine, "outro")
+    return nome
+
+def _operacao(instrucao):
+    operacao = instrucao.lstrip()[:6].upper()
+    return operacao if operacao in OPERACOES_SQL else "OUTRA"
+
+def _antes_da_instrucao(conexao, cursor, instrucao, parametros, contexto, executemany):
+    if contexto is not None:
+        contexto._inicio_metricas = time.perf_counter()
+
+def _depois_da_instrucao(conexao, cursor, instrucao, parametros, contexto, executemany):
+    inicio = getattr(contexto, "_inicio_metricas", None)
+    if inicio is not None:
+        rotulos = (("engine", _nome_engine(conexao.engine)), ("operacao", _operacao(instrucao)))
+        registro.observar("wayne_sql_duracao_segundos", rotulos, time.perf_counter() - inicio)
+
+def _erro_sql(contexto_excecao):
+    engine = contexto_excecao.engine
+    registro.incrementar("wayne_sql_erros_total", (("engine", _nome_engine(engine) if engine is not None else "outro"),))
+
+
+# --- medidores lidos na coleta ---
+
+@registro.coletor
+def _pool():
+    from app.database import engines_ativos
+
+    medidas = []
+    for nome, engine in engines_ativos().items():
+        pool = engine.pool
+        # StaticPool (SQLite em memória) não tem essas contagens
+        if not hasattr(pool, "checkedout"):
+            continue
+        rotulos = (("engine", nome),)
+        medidas += [
+            ("wayne_db_pool_conexoes_em_uso", rotulos, pool.checkedout()),
+            ("wayne_db_pool_conexoes_ociosas", rotulos, pool.checkedin()),
+            ("wayne_db_pool_overflow", rotulos, pool.overflow()),
+            ("wayne_db_pool_tamanho", rotulos, pool.size()),
+        ]
+    return medidas
+
+@registro.coletor
+def _cache():
+    from app.cache import cache_recursos, cache_usuarios
+
+    medidas = [("wayne_processos", (), 1)]
+    for cache in (cache_recursos, cache_usuarios):
+        rotulos = (("namespace", cache.namespace),)
+        medidas += [
+            ("wayne_cache_acertos_total", rotulos, cache.acertos),
+            ("wayne_cache_falhas_total", rotulos, cache.falhas),
+        ]
+    return medidas
+
+@registro.coletor
+def _limitador():
+    from app.limitador import limitador_login
+
+    estatisticas = limitador_login.estatisticas()
+    return [
+        ("wayne_login_decisoes_total", (("decisao", "permitido"),), estatisticas["permitidos"]),
+        ("wayne_login_decisoes_total", (("decisao", "bloqueado_ip"),), estatisticas["bloqueados_ip"]),
+        ("wayne_login_decisoes_total", (("decisao", "bloqueado_conta"),), estatisticas["bloqueados_conta"]),
+        ("wayne_login_falhas_total", (), estatisticas["falhas_registradas"]),
+    ]
+
+@registro.coletor
+def _hash_senha():
+    from app.utils import estatisticas_hash
+
+    # Os tempos de fila e de execução são observados por operação em app.utils
+    estatisticas = estatisticas_hash()
+    return [
+        ("wayne_hash_senha_concluidos_total", (), estatisticas["concluidos"]),
+        ("wayne_hash_senha_rejeitados_total", (), estatisticas["rejeitados"]),
+        ("wayne_hash_senha_workers", (), estatisticas["workers"]),
+    ]
+
+def _taxa_acerto(valores):
+    """Calculada depois da soma dos processos: razões por processo não se somam"""
+    taxas = {}
+    for (nome, rotulos), acertos in list(valores.items()):
+        if nome == "wayne_cache_acertos_total":
+            total = acertos + valores.get(("wayne_cache_falhas_total", rotulos), 0)
+            taxas[("wayne_cache_taxa_acerto", rotulos)] = acertos / total if total else 0.0
+    return taxas
+
+_DERIVADAS = (_taxa_acerto,)
+
+
+# --- agregação entre processos ---
+
+ARQUIVO_ENCERRADOS = "encerrados.json"
+
+class Gravador:
+    """
+    Com METRICAS_DIR, cada processo grava seu instantâneo em <dir>/<pid>.json
+    a cada METRICAS_INTERVALO segundos e ao encerrar; /metrics soma os arquivos.
+    Contadores e histogramas de processos encerrados são somados em
+    encerrados.json e o arquivo do pid é removido, para os totais não caírem
+    nem os arquivos se acumularem. Sem diretório, cada processo expõe só as
+    próprias métricas.
+    """
+
+    def __init__(self, diretorio, intervalo):
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self._pid_thread = None
+
+    def garantir(self):
+        """Inicia a gravação periódica neste processo (uma thread por processo, inclusive após fork)"""
+        if not self.diretorio or self._pid_thread == os.getpid():
+            return
+        self._pid_thread = os.getpid()
+        os.makedirs(self.diretorio, exist_ok=True)
+        # Um arquivo com o pid deste processo é de um processo anterior que teve o mesmo pid
+        self.consolidar_encerrados(reaproveitado=os.getpid())
+        threading.Thread(target=self._executar, name="metricas-gravador", daemon=True).start()
+
+    def _executar(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.gravar()
+
+    def gravar(self):
+        if not self.diretorio or self._pid_thread != os.getpid():
+            return
+        caminho = os.path.join(self.diretorio, f"{os.getpid()}.json")
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w") as arquivo:
+            json.dump(registro.instantaneo(), arquivo)
+        os.replace(temporario, caminho)
+
+    def _ler(self):
+        """[(caminho, instantâneo)] dos arquivos de processos do diretório"""
+        lidos = []
+        for caminho in glob.glob(os.path.join(self.diretorio, "*.json")):
+            if os.path.basename(caminho) == ARQUIVO_ENCERRADOS:
+                continue
+            try:
+                with open(caminho) as arquivo:
+                    lidos.append((caminho, json.load(arquivo)))
+            except (OSError, ValueError):
+                continue
+        return lidos
+
+    def consolidar_encerrados(self, reaproveitado=None):
+        """Soma os arquivos de processos encerrados em encerrados.json e os remove"""
+        if not self.diretorio or fcntl is None:
+            return
+        with open(os.path.join(self.diretorio, ".trava"), "a") as trava:
+            # Vários workers podem coletar ao mesmo tempo: um consolida por vez
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                encerrados = [
+                    (caminho, instantaneo) for caminho, instantaneo in self._ler()
+                    if instantaneo.get("pid") == reaproveitado or not _processo_vivo(instantaneo.get("pid"))
+                ]
+                if not encerrados:
+                    return
+
+                caminho_total = os.path.join(self.diretorio, ARQUIVO_ENCERRADOS)
+                try:
+                    with open(caminho_total) as arquivo:
+                        total = json.load(arquivo)
+                except (OSError, ValueError):
+                    total = {"pid": None, "contadores": [], "histogramas": []}
+
+                total = registro.somar([total] + [instantaneo for _, instantaneo in encerrados])
+                temporario = f"{caminho_total}.tmp"
+                with open(temporario, "w") as arquivo:
+                    json.dump(total, arquivo)
+                os.replace(temporario, caminho_total)
+
+                for caminho, _ in encerrados:
+                    os.remove(caminho)
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def instantaneos(self):
+        """Instantâneo atual deste processo mais os gravados pelos demais"""
+        atual = registro.instantaneo()
+        if not self.diretorio:
+            return [atual]
+
+        self.consolidar_encerrados()
+        todos = [atual]
+        for _, instantaneo in self._ler():
+            if instantaneo.get("pid") == atual["pid"]:
+                continue
+            instantaneo["vivo"] = _processo_vivo(instantaneo.get("pid"))
+            todos.append(instantaneo)
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_ENCERRADOS)) as arquivo:
+                encerrados = json.load(arquivo)
+        except (OSError, ValueError):
+            return todos
+        encerrados["vivo"] = False
+        todos.append(encerrados)
+        return todos
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        return pid is not None
+    return True
+
+_gravador = Gravador(METRICAS_DIR, METRICAS_INTERVALO)
+atexit.register(_gravador.gravar)
+
+
+def metricas():
+    if METRICAS_TOKEN:
+        if request.headers.get("Authorization") != f"Bearer {METRICAS_TOKEN}":
+            return Response("Token de métricas inválido\n", status=401, mimetype="text/plain")
+    elif request.remote_addr not in ENDERECOS_LOCAIS:
+        # Sem token, as métricas (rotas, volumes, falhas de login) ficam restritas à própria máquina
+        return Response("Defina METRICAS_TOKEN para coletar fora do host\n", status=403, mimetype="text/plain")
+    return Response(registro.renderizar(_gravador.instantaneos()), content_type=TIPO_CONTEUDO)
+
+
+def registrar_metricas(app):
+    """
+    Instrumenta requisições e SQL e expõe GET /metrics. Deve ser chamado antes
+    dos demais after_request, que rodam em ordem inversa: a medição inclui todos.
+    Sem METRICAS_TOKEN, /metrics só responde a conexões de loopback.
+    """
+    if not METRICAS_ATIVAS:
+        return
+
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+    app.teardown_request(_requisicao_interrompida)
+    app.add_url_rule("/metrics", "metricas", metricas)
+
+    # No nível da classe: vale também para os engines assíncronos criados depois
+    if not event.contains(Engine, "before_cursor_execute", _antes_da_instrucao):
+        event.listen(Engine, "before_cursor_execute", _antes_da_instrucao)
+        event.listen(Engine, "after_cursor_execute", _depois_da_instrucao)
+        event.listen(Engine, "handle_error", _erro_sql)
@@ -0,0 +1,72 @@
+"""
+Migrações versionadas do esquema.
+
+Cada módulo vNNNN_descricao.py deste pacote define aplicar(conexao) e é
+executado uma única vez, em ordem, dentro de uma transação. A versão atual
+fica na tabela versao_esquema. As migrações devem ser idempotentes
+(checkfirst / IF NOT EXISTS), pois bancos criados antes delas já podem ter
+parte do esquema.
+"""
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+versao_esquema = Table(
+    "versao_esquema", _metadata,
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String(200), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False)
+)
+
+
+def listar_migracoes():
+    """Retorna [(versao, nome, modulo)] ordenado pela versão"""
+    migracoes = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("v"):
+            continue
+        prefixo = info.name[1:].split("_", 1)[0]
+        if not prefixo.isdigit():
+            continue
+        modulo = importlib.import_module(f"{__name__}.{info.name}")
+        migracoes.append((int(prefixo), info.name, modulo))
+    return sorted(migracoes, key=lambda migracao: migracao[0])
+
+
+def versoes_aplicadas(conexao):
+    versao_esquema.create(conexao, checkfirst=True)
+    return {linha[0] for linha in conexao.execute(select(versao_esquema.c.versao))}
+
+
+def pendentes(engine):
+    with engine.begin() as conexao:
+        aplicadas = versoes_aplicadas(conexao)
+    return [migracao for migracao in listar_migracoes() if migracao[0] not in aplicadas]
+
+
+def aplicar_migracoes(engine, ate=None):
+    """Aplica as migrações pendentes (até a versão 'ate', se informada). Retorna as aplicadas."""
+    aplicadas_agora = []
+
+    for versao, nome, modulo in pendentes(engine):
+        if ate is not None and versao > ate:
+            break
+
+        descricao = (modulo.__doc__ or nome).strip().splitlines()[0]
+        with engine.begin() as conexao:
+            modulo.aplicar(conexao)
+            conexao.execute(versao_esquema.insert().values(
+                versao=versao, descricao=descricao, aplicada_em=datetime.utcnow()
+            ))
+
+        logger.info("Migração %s aplicada: %s", nome, descricao)
+        aplicadas_agora.append(nome)
+
+    return aplicadas_agora
@@ -0,0 +1,58 @@
+"""Cria as tabelas do esquema inicial (usuarios, recursos, dashboards e alerta)"""
+from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+
+# Esquema congelado como estava antes das migrações: não usa os modelos atuais,
+# para que um banco novo chegue ao esquema final passando por todas as versões.
+# Colunas, índices e tabelas posteriores são criados pelas migrações seguintes.
+_metadata = MetaData()
+
+Table(
+    "usuarios", _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("email", String, unique=True, nullable=False),
+    Column("cpf", String, unique=True, nullable=False),
+    Column("senha_hash", String, nullable=False),
+    Column("cargo", String, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True))
+)
+
+Table(
+    "recursos", _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nome", String, nullable=False),
+    Column("tipo", String, nullable=False),
+    Column("quantidade", Integer, nullable=False),
+    Column("valor_unit", Float, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True))
+)
+
+Table(
+    "dashboards", _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("dadosSeguranca", String),
+    Column("dadosRecursos", String),
+    Column("user_id", Integer, ForeignKey("usuarios.id")),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True))
+)
+
+Table(
+    "alerta", _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("titulo", String(100), nullable=False),
+    Column("descricao", String(255), nullable=True),
+    Column("status", Enum("pendente", "resolvido", "nao_lido", "lido", name="status_alerta")),
+    Column("usuario_id", Integer, ForeignKey("usuarios.id"), nullable=True),
+    Column("criado_em", DateTime),
+    Column("atualizado_em", DateTime),
+    Column("prioridade", Enum("baixa", "media", "alta", "critica", name="prioridade_alerta")),
+    Column("recurso_id", Integer, ForeignKey("recursos.id"), nullable=True)
+)
+
+
+def aplicar(conexao):
+    _metadata.create_all(conexao, checkfirst=True)
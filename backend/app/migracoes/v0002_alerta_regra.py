@@ -0,0 +1,21 @@
+"""Adiciona alerta.regra em bancos criados antes do motor de regras"""
+from sqlalchemy import inspect, text
+
+
+def preencher_regra_legada(conexao):
+    """
+    Alertas automáticos anteriores ao motor de regras vinham da verificação fixa
+    de estoque baixo (título "Estoque baixo: <nome>"), hoje a regra estoque_baixo.
+    Sem a regra preenchida a varredura não os reconheceria e criaria duplicatas.
+    """
+    conexao.execute(text(
+        "UPDATE alerta SET regra = 'estoque_baixo' "
+        "WHERE regra IS NULL AND recurso_id IS NOT NULL AND titulo LIKE 'Estoque baixo: %'"
+    ))
+
+
+def aplicar(conexao):
+    colunas = {coluna["name"] for coluna in inspect(conexao).get_columns("alerta")}
+    if "regra" not in colunas:
+        conexao.execute(text("ALTER TABLE alerta ADD COLUMN regra VARCHAR(50)"))
+    preencher_regra_legada(conexao)
@@ -0,0 +1,21 @@
+"""Índices dos caminhos quentes de recursos, alertas e usuários"""
+from sqlalchemy import text
+
+# Definições congeladas como estavam nesta versão: não dependem dos modelos atuais.
+# ix_alerta_status e ix_alerta_usuario_status são substituídos na v0006.
+INDICES = {
+    "ix_usuarios_created_at": ("usuarios", ("created_at",)),
+    "ix_recursos_nome": ("recursos", ("nome",)),
+    "ix_recursos_tipo_estoque": ("recursos", ("tipo", "quantidade", "valor_unit")),
+    "ix_recursos_quantidade": ("recursos", ("quantidade",)),
+    "ix_recursos_created_at": ("recursos", ("created_at",)),
+    "ix_alerta_status": ("alerta", ("status",)),
+    "ix_alerta_usuario_status": ("alerta", ("usuario_id", "status")),
+    "ix_alerta_recurso_status": ("alerta", ("recurso_id", "status")),
+    "ix_alerta_criado_em": ("alerta", ("criado_em",)),
+}
+
+
+def aplicar(conexao):
+    for nome, (tabela, colunas) in INDICES.items():
+        conexao.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({', '.join(colunas)})"))
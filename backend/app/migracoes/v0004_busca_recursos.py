@@ -0,0 +1,44 @@
+"""Busca textual (FTS5) sobre nome e tipo dos recursos, mantida por triggers"""
+from sqlalchemy import text
+
+# Tabela de conteúdo externo: o índice guarda só os termos e aponta para recursos.id.
+# Os triggers cobrem também os INSERT/UPDATE em lote da importação e das operações em lote.
+INSTRUCOES = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recursos_busca USING fts5(
+        nome, tipo,
+        content='recursos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4',
+        detail=column
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recursos_busca_inserir AFTER INSERT ON recursos BEGIN
+        INSERT INTO recursos_busca(rowid, nome, tipo) VALUES (new.id, new.nome, new.tipo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recursos_busca_remover AFTER DELETE ON recursos BEGIN
+        INSERT INTO recursos_busca(recursos_busca, rowid, nome, tipo) VALUES ('delete', old.id, old.nome, old.tipo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recursos_busca_atualizar AFTER UPDATE OF nome, tipo ON recursos BEGIN
+        INSERT INTO recursos_busca(recursos_busca, rowid, nome, tipo) VALUES ('delete', old.id, old.nome, old.tipo);
+        INSERT INTO recursos_busca(rowid, nome, tipo) VALUES (new.id, new.nome, new.tipo);
+    END
+    """,
+    # ORDER BY rank usa bm25 com acerto no nome valendo mais que no tipo
+    "INSERT INTO recursos_busca(recursos_busca, rank) VALUES ('rank', 'bm25(10.0, 2.0)')",
+    # Indexa os recursos que já existiam
+    "INSERT INTO recursos_busca(recursos_busca) VALUES ('rebuild')",
+)
+
+
+def aplicar(conexao):
+    # Só o SQLite tem FTS5; nos demais bancos a busca usa o índice de nome (prefixo)
+    if conexao.dialect.name != "sqlite":
+        return
+    for instrucao in INSTRUCOES:
+        conexao.execute(text(instrucao))
@@ -0,0 +1,38 @@
+"""Livro de movimentações de estoque e agregados por hora e por dia"""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, exists, literal, select
+
+
+def aplicar(conexao):
+    from app.models import MovimentoEstoque, MovimentoPorDia, MovimentoPorHora, Recurso
+
+    for modelo in (MovimentoEstoque, MovimentoPorHora, MovimentoPorDia):
+        modelo.__table__.create(conexao, checkfirst=True)
+
+    # O saldo atual de cada recurso ainda sem histórico vira a movimentação de abertura
+    agora = datetime.utcnow()
+
+    def sem_historico(modelo):
+        return (Recurso.quantidade != 0) & ~exists().where(modelo.recurso_id == Recurso.id)
+
+    conexao.execute(MovimentoEstoque.__table__.insert().from_select(
+        ["recurso_id", "delta", "quantidade", "motivo", "criado_em"],
+        select(
+            Recurso.id, Recurso.quantidade, Recurso.quantidade,
+            literal("saldo_inicial", String), literal(agora, DateTime)
+        ).where(sem_historico(MovimentoEstoque))
+    ))
+
+    for modelo, periodo in (
+        (MovimentoPorHora, agora.replace(minute=0, second=0, microsecond=0)),
+        (MovimentoPorDia, agora.replace(hour=0, minute=0, second=0, microsecond=0)),
+    ):
+        conexao.execute(modelo.__table__.insert().from_select(
+            ["recurso_id", "periodo", "entradas", "saidas", "movimentos", "saldo_final"],
+            select(
+                Recurso.id, literal(periodo, DateTime),
+                # Saldos negativos não existem; a abertura é sempre uma entrada
+                Recurso.quantidade, literal(0, Integer), literal(1, Integer), Recurso.quantidade
+            ).where(sem_historico(modelo))
+        ))
@@ -0,0 +1,21 @@
+"""Índices compostos do feed de alertas com paginação keyset sobre (criado_em, id)"""
+from sqlalchemy import text
+
+# Definições congeladas como estavam nesta versão: não dependem dos modelos atuais
+INDICES = {
+    "ix_alerta_usuario_criado_em": ("alerta", ("usuario_id", "criado_em", "id")),
+    "ix_alerta_usuario_status_criado_em": ("alerta", ("usuario_id", "status", "criado_em", "id")),
+    "ix_alerta_status_criado_em": ("alerta", ("status", "criado_em", "id")),
+    "ix_alerta_recurso_criado_em": ("alerta", ("recurso_id", "criado_em", "id")),
+}
+
+# Prefixos dos novos índices: mantê-los só custaria escrita
+SUBSTITUIDOS = ("ix_alerta_status", "ix_alerta_usuario_status")
+
+
+def aplicar(conexao):
+    for nome, (tabela, colunas) in INDICES.items():
+        conexao.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({', '.join(colunas)})"))
+
+    for nome in SUBSTITUIDOS:
+        conexao.execute(text(f"DROP INDEX IF EXISTS {nome}"))
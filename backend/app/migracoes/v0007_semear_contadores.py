@@ -0,0 +1,13 @@
+"""Preenche os contadores do dashboard a partir das tabelas (bancos anteriores aos contadores)"""
+from sqlalchemy.orm import Session
+
+
+def aplicar(conexao):
+    from app.models import Contador
+    from app.services.contadores_service import calcular_contadores, corrigir_contadores
+
+    Contador.__table__.create(conexao, checkfirst=True)
+
+    # Sessão sobre a conexão da migração: tudo na mesma transação, sem os listeners do SessionLocal
+    with Session(bind=conexao) as db:
+        corrigir_contadores(db, calcular_contadores(db))
@@ -0,0 +1,6 @@
+"""Preenche alerta.regra dos alertas automáticos legados em bancos que já passaram pela v0002"""
+from app.migracoes.v0002_alerta_regra import preencher_regra_legada
+
+
+def aplicar(conexao):
+    preencher_regra_legada(conexao)
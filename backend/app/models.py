@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -18,6 +18,10 @@ class Usuario(Base):
 
     alertas = relationship("Alerta", back_populates="usuario")
 
+    __table_args__ = (
+        Index("ix_usuarios_created_at", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Usuario(id={self.id}, email={self.email}, Cpf={self.cpf}, cargo={self.cargo}>)"
 
@@ -35,6 +39,17 @@ class Recurso(Base):
 
     alertas = relationship("Alerta", back_populates="recurso")
 
+    __table_args__ = (
+        # Verificação de nome duplicado em cada criação/edição e filtro por prefixo
+        Index("ix_recursos_nome", "nome"),
+        # Cobre DISTINCT tipo, o filtro por tipo e o GROUP BY das estatísticas
+        Index("ix_recursos_tipo_estoque", "tipo", "quantidade", "valor_unit"),
+        # Listas de críticos, regras de estoque e ordenação por quantidade
+        Index("ix_recursos_quantidade", "quantidade"),
+        # Ordenação padrão da listagem paginada e atividades recentes
+        Index("ix_recursos_created_at", "created_at"),
+    )
+
 
 
 
@@ -52,6 +67,54 @@ class Dashboard(Base):
 
 
 
+class Contador(Base):
+    """Contadores materializados do dashboard, mantidos incrementalmente"""
+    __tablename__ = "contadores"
+
+    chave = Column(String(100), primary_key=True)
+    valor = Column(Float, nullable=False, default=0)
+
+
+
+class MovimentoEstoque(Base):
+    """
+    Livro de movimentações de estoque: só recebe inserções. recurso_id não é
+    chave estrangeira para que o histórico sobreviva à remoção do recurso.
+    """
+    __tablename__ = "movimentos_estoque"
+
+    id = Column(Integer, primary_key=True)
+    recurso_id = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+    quantidade = Column(Integer, nullable=False)  # saldo após a movimentação
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    motivo = Column(String(100), nullable=False)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_movimentos_estoque_recurso_criado_em", "recurso_id", "criado_em"),
+    )
+
+
+class _AgregadoMovimentos:
+    """Colunas comuns dos agregados por período, mantidos a cada movimentação"""
+    recurso_id = Column(Integer, primary_key=True)
+    periodo = Column(DateTime, primary_key=True)  # início do período (UTC)
+    entradas = Column(Integer, nullable=False, default=0)
+    saidas = Column(Integer, nullable=False, default=0)
+    movimentos = Column(Integer, nullable=False, default=0)
+    saldo_final = Column(Integer, nullable=False)
+
+
+class MovimentoPorHora(_AgregadoMovimentos, Base):
+    __tablename__ = "movimentos_por_hora"
+
+
+class MovimentoPorDia(_AgregadoMovimentos, Base):
+    __tablename__ = "movimentos_por_dia"
+
+
+
 class Alerta(Base):
     __tablename__ = "alerta"
 
@@ -70,4 +133,17 @@ class Alerta(Base):
 
     # Exemplo: se for relacionado a um recurso específico
     recurso_id = Column(Integer, ForeignKey("recursos.id"), nullable=True)
-    recurso = relationship("Recurso", back_populates="alertas")
\ No newline at end of file
+    recurso = relationship("Recurso", back_populates="alertas")
+
+    # Nome da regra automática que gerou o alerta (None para alertas manuais)
+    regra = Column(String(50), nullable=True)
+
+    __table_args__ = (
+        Index("ix_alerta_recurso_status", "recurso_id", "status"),
+        Index("ix_alerta_criado_em", "criado_em"),
+        # Feed de alertas: cada filtro seguido da chave keyset (criado_em, id)
+        Index("ix_alerta_usuario_criado_em", "usuario_id", "criado_em", "id"),
+        Index("ix_alerta_usuario_status_criado_em", "usuario_id", "status", "criado_em", "id"),
+        Index("ix_alerta_status_criado_em", "status", "criado_em", "id"),
+        Index("ix_alerta_recurso_criado_em", "recurso_id", "criado_em", "id"),
+    )
\ No newline at end of file
@@ -0,0 +1,130 @@
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+from app.config import REVOGACAO_URL, REVOGACAO_MAX_ITENS
+
+logger = logging.getLogger(__name__)
+
+
+class RevogacaoCheia(RuntimeError):
+    """O backend em memória atingiu max_itens só com tokens ainda válidos"""
+
+
+class RevogacaoMemoria:
+    """
+    JTIs revogados no próprio processo. Cada entrada some quando o token expira,
+    então o tamanho fica limitado pelas revogações dentro da validade dos tokens.
+    Nenhuma entrada sai antes do exp: cheio, o backend recusa novas revogações
+    (RevogacaoCheia) em vez de reabilitar tokens já revogados.
+    """
+
+    def __init__(self, max_itens=REVOGACAO_MAX_ITENS):
+        self.max_itens = max_itens
+        self._expiracoes = {}
+        self._fila = []  # heap (exp, jti) para descartar expirados em ordem
+        self._lock = threading.Lock()
+
+    def revogar(self, jti, exp):
+        with self._lock:
+            agora = time.time()
+            self._descartar_expirados(agora)
+            if exp <= agora:
+                # Já expirado: o JWT é recusado de qualquer forma
+                return
+            if jti not in self._expiracoes and len(self._expiracoes) >= self.max_itens:
+                logger.error(
+                    "Limite de %s tokens revogados atingido; use um backend compartilhado (REVOGACAO_URL)",
+                    self.max_itens
+                )
+                raise RevogacaoCheia("Limite de tokens revogados atingido")
+            self._expiracoes[jti] = exp
+            heapq.heappush(self._fila, (exp, jti))
+
+    def esta_revogado(self, jti):
+        exp = self._expiracoes.get(jti)
+        return exp is not None and exp > time.time()
+
+    def _descartar_expirados(self, agora):
+        while self._fila and self._fila[0][0] <= agora:
+            exp, jti = heapq.heappop(self._fila)
+            if self._expiracoes.get(jti) == exp:
+                del self._expiracoes[jti]
+
+    def __len__(self):
+        return len(self._expiracoes)
+
+
+class RevogacaoSQLite:
+    """Arquivo SQLite compartilhado entre workers, com índice pela expiração"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._escritas = 0
+        conexao = self._conexao()
+        conexao.execute("CREATE TABLE IF NOT EXISTS tokens_revogados (jti TEXT PRIMARY KEY, expira REAL NOT NULL)")
+        conexao.execute("CREATE INDEX IF NOT EXISTS ix_tokens_revogados_expira ON tokens_revogados (expira)")
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def revogar(self, jti, exp):
+        conexao = self._conexao()
+        conexao.execute("INSERT OR REPLACE INTO tokens_revogados (jti, expira) VALUES (?, ?)", (jti, exp))
+        self._escritas += 1
+        if self._escritas % 100 == 0:
+            conexao.execute("DELETE FROM tokens_revogados WHERE expira <= ?", (time.time(),))
+
+    def esta_revogado(self, jti):
+        linha = self._conexao().execute(
+            "SELECT 1 FROM tokens_revogados WHERE jti = ? AND expira > ?", (jti, time.time())
+        ).fetchone()
+        return linha is not None
+
+
+class RevogacaoRedis:
+    """Redis (ou compatível): cada JTI vira uma chave com TTL até a expiração do token"""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("O backend redis:// requer o pacote 'redis' instalado")
+        self._redis = redis.Redis.from_url(url)
+
+    def revogar(self, jti, exp):
+        ttl = int(exp - time.time()) + 1
+        if ttl > 0:
+            self._redis.set(f"revogado:{jti}", 1, ex=ttl)
+
+    def esta_revogado(self, jti):
+        return bool(self._redis.exists(f"revogado:{jti}"))
+
+
+def criar_revogacao(url):
+    """memoria://, sqlite:///caminho/revogados.db ou redis://localhost:6379/0"""
+    partes = urlparse(url)
+
+    if partes.scheme == "memoria":
+        parametros = parse_qs(partes.query)
+        return RevogacaoMemoria(int(parametros.get("max_itens", [REVOGACAO_MAX_ITENS])[0]))
+    if partes.scheme == "sqlite":
+        caminho = partes.path[1:] if partes.path.startswith("/") else partes.path
+        return RevogacaoSQLite(os.path.abspath(caminho or "revogados.db"))
+    if partes.scheme in ("redis", "rediss"):
+        return RevogacaoRedis(url)
+    raise ValueError(f"Backend de revogação desconhecido: {url}")
+
+
+tokens_revogados = criar_revogacao(REVOGACAO_URL)
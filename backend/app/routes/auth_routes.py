@@ -2,30 +2,95 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
 from app.services.auth_service import create_user, authenticate_user, get_user_by_id
 from app.services.jwt_service import revoke_token, get_current_user_from_token  
+from app.utils import HashSobrecarregado
+from app.limitador import limitador_login
+from app.revogacao import RevogacaoCheia
+from app.database import get_db
 
 auth_bp = Blueprint("auth", __name__)
 
+# Validação e respostas do login e de /me, usadas pelas views abaixo e pelos
+# handlers assíncronos de app.asgi: o contrato JSON fica em um só lugar
+
+def validar_login():
+    """
+    Valida o corpo do login e consulta o limitador, antes de qualquer consulta
+    ou hash. Retorna (dados, None) ou (None, resposta de erro).
+    """
+    data = request.json
+    if not data or 'email' not in data or 'senha' not in data:
+        return None, (jsonify({"message": "Email a senha. (Obrigatorios)"}), 400)
+
+    if not data['email'].strip() or not data['senha'].strip():
+        return None, (jsonify({
+            "message": "Email e senha devem estar preenchidos"
+        }), 400)
+
+    # Rejeição barata antes de qualquer consulta ou hash
+    permitido, retry_after, motivo = limitador_login.verificar(request.remote_addr, data['email'])
+    if not permitido:
+        return None, (jsonify({
+            "message": "Muitas tentativas de login. Tente novamente mais tarde.",
+            "error": f"rate_limited_{motivo}"
+        }), 429, {"Retry-After": str(retry_after)})
+
+    return data, None
+
+def resposta_login(email, result):
+    """Registra o resultado no limitador e monta a resposta"""
+    if result.get('success'):
+        limitador_login.registrar_sucesso(email)
+        return jsonify(result), 200
+
+    limitador_login.registrar_falha(email)
+    return jsonify(result), 400
+
+def hash_sobrecarregado(e):
+    return jsonify({"message": str(e)}), 503, {"Retry-After": "1"}
+
+def erro_interno(e):
+    return jsonify({"message": f"Erro interno: {str(e)}"}), 500
+
+def token_sem_usuario():
+    return jsonify({
+        'message': 'Usuário não encontrado',
+        'error': 'user_not_found'
+    }), 404
+
+def resposta_me(user_data):
+    if not user_data:
+        return jsonify({
+            'message': 'Usuário não encontrado no banco de dados',
+            'error': 'user_not_found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'user': user_data
+    }), 200
+
+def erro_me(e):
+    return jsonify({
+        'message': f'Erro ao obter usuário atual: {str(e)}',
+        'error': 'internal_error'
+    }), 500
+
+
 @auth_bp.route("/login", methods=["POST"])
 def login_route():
     try:
-        data = request.json
-        if not data or 'email' not in data or 'senha' not in data:
-            return jsonify({"message": "Email a senha. (Obrigatorios)"}), 400
-        
-        if not data['email'].strip() or not data['senha'].strip():
-            return jsonify ({
-                "message": "Email e senha devem estar preenchidos"
-            }), 400
-
-        result = authenticate_user(data['email'], data['senha'])
+        data, erro = validar_login()
+        if erro:
+            return erro
 
-        if result.get('success'):
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
+        result = authenticate_user(get_db(), data['email'], data['senha'])
+        return resposta_login(data['email'], result)
         
+    except HashSobrecarregado as e:
+        return hash_sobrecarregado(e)
+
     except Exception as e:
-        return jsonify({"message": f"Erro interno: {str(e)}"}), 500
+        return erro_interno(e)
     
 
 @auth_bp.route("/register", methods=["POST"])
@@ -45,7 +110,7 @@ def register():
                     "message": f"Campo {field} deve estar preenchido."
                 }), 400
         
-        result = create_user(data)
+        result = create_user(get_db(), data)
 
         if result.get('success'):
             return jsonify(result), 201
@@ -53,8 +118,11 @@ def register():
             return jsonify(result), 400
         
 
+    except HashSobrecarregado as e:
+        return hash_sobrecarregado(e)
+
     except Exception as e:
-        return jsonify({"message": f"Erro interno: {str(e)}"}), 500
+        return erro_interno(e)
 
 
 @auth_bp.route('/refresh', methods=['POST'])
@@ -62,9 +130,9 @@ def register():
 def refresh():
 
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
 
-        user_data = get_user_by_id(user_id)
+        user_data = get_user_by_id(get_db(somente_leitura=True), user_id)
 
         if not user_data:
             return jsonify({
@@ -79,7 +147,7 @@ def refresh():
         }
 
         new_token = create_access_token(
-            identity = user_id,
+            identity = str(user_id),
             additional_claims = additional_claims
         )
         
@@ -103,6 +171,11 @@ def logout():
             "message": "Você se desconectou.",
         }), 200
     
+    except RevogacaoCheia:
+        # O token continua válido: o cliente precisa saber que o logout não valeu
+        return jsonify({
+            "message": "Não foi possível revogar o token agora. Tente novamente mais tarde."
+        }), 503
     except Exception as e:
         return jsonify({
             "message": f"Erro interno: {str(e)}"
@@ -116,30 +189,14 @@ def get_current_user():
         current_user = get_current_user_from_token()
         
         if not current_user:
-            return jsonify({
-                'message': 'Usuário não encontrado',
-                'error': 'user_not_found'
-            }), 404
+            return token_sem_usuario()
         
         # Buscar dados atualizados do usuário no banco
-        user_data = get_user_by_id(current_user['id'])
-        
-        if not user_data:
-            return jsonify({
-                'message': 'Usuário não encontrado no banco de dados',
-                'error': 'user_not_found'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'user': user_data
-        }), 200
+        user_data = get_user_by_id(get_db(somente_leitura=True), current_user['id'])
+        return resposta_me(user_data)
         
     except Exception as e:
-        return jsonify({
-            'message': f'Erro ao obter usuário atual: {str(e)}',
-            'error': 'internal_error'
-        }), 500
+        return erro_me(e)
     
 
 @auth_bp.route('/validate', methods=['GET'])
@@ -1,132 +1,167 @@
-from flask import Blueprint, jsonify
+import time
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required
+from app.config import SSE_DURACAO_MAXIMA, SSE_HEARTBEAT
+from app.database import encerrar_db, get_db
+from app.condicional import get_condicional
+from app.eventos import HEARTBEAT_SSE, abrir_stream, barramento, mensagens_do_usuario
 from app.services.jwt_service import get_current_user_from_token
 from app.services.dashboard_service import (
     get_dashboard_data, 
     get_recursos_summary, 
-    get_alertas_by_user,
-    create_automatic_alerts
+    get_alertas_by_user
 )
-from app.database import SessionLocal
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
+# Leitura da requisição e montagem das respostas, usadas pelas views abaixo e
+# pelos handlers assíncronos de app.asgi: o contrato JSON fica em um só lugar
+
+CABECALHOS_SSE = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def usuario_nao_encontrado():
+    return jsonify({
+        "message": "Usuário não encontrado",
+        "success": False
+    }), 404
+
+def erro_interno(e):
+    return jsonify({
+        "message": f"Erro interno: {str(e)}",
+        "success": False
+    }), 500
+
+def erro_parametros(e):
+    return jsonify({
+        "message": str(e),
+        "success": False
+    }), 400
+
+def resposta_dashboard(user_data, dashboard_data):
+    return jsonify({
+        "message": "Dados do dashboard carregados com sucesso",
+        "success": True,
+        "data": dashboard_data,
+        "user": user_data
+    }), 200
+
+def resposta_stats(user_data, stats_data):
+    return jsonify({
+        "stats": stats_data['stats'],
+        "user_role": user_data['cargo'],
+        "success": True
+    }), 200
+
+def resposta_recursos(recursos_summary):
+    return jsonify({
+        "message": "Recursos carregados com sucesso",
+        "success": True,
+        "data": recursos_summary
+    }), 200
+
+def parametros_alertas():
+    """Argumentos de get_alertas_by_user lidos da query string"""
+    return {
+        "filtros": {
+            "status": request.args.get('status'),
+            "prioridade": request.args.get('prioridade'),
+            # Texto: o serviço valida e responde 400 para valores inválidos
+            "recurso_id": request.args.get('recurso_id'),
+        },
+        "cursor": request.args.get('cursor'),
+        "limite": request.args.get('limite', type=int)
+    }
+
+def resposta_alertas(alertas, next_cursor):
+    return jsonify({
+        "message": "Alertas carregados com sucesso",
+        "success": True,
+        "data": alertas,
+        "next_cursor": next_cursor
+    }), 200
+
+def ultimo_evento_recebido():
+    """Posição de retomada do SSE: cabeçalho Last-Event-ID ou ?lastEventId="""
+    return request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+
+
 @dashboard_bp.route("/", methods=["GET"])
 @jwt_required()
+@get_condicional("recursos", "alertas", "usuarios", por_usuario=True)
 def get_dashboard():
     try:
         user_data = get_current_user_from_token()
         
         if not user_data:
-            return jsonify({
-                "message": "Usuário não encontrado",
-                "success": False
-            }), 404
-
-        # Criar alertas automáticos antes de buscar dados
-        db = SessionLocal()
-        create_automatic_alerts(db)
-        db.close()
+            return usuario_nao_encontrado()
 
         # Buscar dados do dashboard baseado no usuário e cargo
-        dashboard_data = get_dashboard_data(user_data['id'], user_data['cargo'])
-        
-        return jsonify({
-            "message": "Dados do dashboard carregados com sucesso",
-            "success": True,
-            "data": dashboard_data,
-            "user": user_data
-        }), 200
+        dashboard_data = get_dashboard_data(get_db(somente_leitura=True), user_data['id'], user_data['cargo'])
+        return resposta_dashboard(user_data, dashboard_data)
     
     except Exception as e:
-        return jsonify({
-            "message": f"Erro interno: {str(e)}",
-            "success": False
-        }), 500
+        return erro_interno(e)
 
 
 @dashboard_bp.route("/stats", methods=["GET"])
 @jwt_required()
+@get_condicional("recursos", "alertas", "usuarios", por_usuario=True)
 def get_dashboard_stats():
     try:
         user_data = get_current_user_from_token()
         
         if not user_data:
-            return jsonify({
-                "message": "Usuário não encontrado",
-                "success": False
-            }), 404
+            return usuario_nao_encontrado()
 
         # Buscar estatísticas baseado no cargo
-        stats_data = get_dashboard_data(user_data['id'], user_data['cargo'])
-        
-        return jsonify({
-            "stats": stats_data['stats'],
-            "user_role": user_data['cargo'],
-            "success": True
-        }), 200
+        stats_data = get_dashboard_data(get_db(somente_leitura=True), user_data['id'], user_data['cargo'])
+        return resposta_stats(user_data, stats_data)
     
     except Exception as e:
-        return jsonify({
-            "message": f"Erro interno: {str(e)}",
-            "success": False
-        }), 500
+        return erro_interno(e)
 
 
 @dashboard_bp.route("/recursos", methods=["GET"])
 @jwt_required()
+@get_condicional("recursos")
 def get_dashboard_recursos():
     try:
         user_data = get_current_user_from_token()
         
         if not user_data:
-            return jsonify({
-                "message": "Usuário não encontrado",
-                "success": False
-            }), 404
+            return usuario_nao_encontrado()
 
         # Buscar resumo dos recursos
-        recursos_summary = get_recursos_summary()
-        
-        return jsonify({
-            "message": "Recursos carregados com sucesso",
-            "success": True,
-            "data": recursos_summary
-        }), 200
+        recursos_summary = get_recursos_summary(get_db(somente_leitura=True))
+        return resposta_recursos(recursos_summary)
     
     except Exception as e:
-        return jsonify({
-            "message": f"Erro interno: {str(e)}",
-            "success": False
-        }), 500
+        return erro_interno(e)
 
 
 @dashboard_bp.route("/alertas", methods=["GET"])
 @jwt_required()
+@get_condicional("alertas", "recursos", por_usuario=True)
 def get_dashboard_alertas():
     try:
         user_data = get_current_user_from_token()
         
         if not user_data:
-            return jsonify({
-                "message": "Usuário não encontrado",
-                "success": False
-            }), 404
-
-        # Buscar alertas do usuário
-        alertas = get_alertas_by_user(user_data['id'], user_data['cargo'])
-        
-        return jsonify({
-            "message": "Alertas carregados com sucesso",
-            "success": True,
-            "data": alertas
-        }), 200
+            return usuario_nao_encontrado()
+
+        # Buscar alertas do usuário, paginados por cursor
+        alertas, next_cursor = get_alertas_by_user(
+            get_db(somente_leitura=True),
+            user_data['id'],
+            user_data['cargo'],
+            **parametros_alertas()
+        )
+        return resposta_alertas(alertas, next_cursor)
     
+    except ValueError as e:
+        return erro_parametros(e)
     except Exception as e:
-        return jsonify({
-            "message": f"Erro interno: {str(e)}",
-            "success": False
-        }), 500
+        return erro_interno(e)
 
 
 @dashboard_bp.route("/alertas/<int:alerta_id>/marcar-lido", methods=["POST"])
@@ -134,7 +169,6 @@ def get_dashboard_alertas():
 def marcar_alerta_lido(alerta_id):
     try:
         from app.models import Alerta
-        from app.database import SessionLocal
         
         user_data = get_current_user_from_token()
         
@@ -144,36 +178,77 @@ def marcar_alerta_lido(alerta_id):
                 "success": False
             }), 404
 
-        db = SessionLocal()
-        try:
-            alerta = db.query(Alerta).filter_by(id=alerta_id).first()
-            
-            if not alerta:
-                return jsonify({
-                    "message": "Alerta não encontrado",
-                    "success": False
-                }), 404
-            
-            # Verificar se o usuário pode marcar este alerta
-            if alerta.usuario_id and alerta.usuario_id != user_data['id'] and user_data['cargo'] != 'admin':
-                return jsonify({
-                    "message": "Sem permissão para marcar este alerta",
-                    "success": False
-                }), 403
-            
-            alerta.status = 'lido'
-            db.commit()
-            
+        db = get_db()
+        alerta = db.query(Alerta).filter_by(id=alerta_id).first()
+        
+        if not alerta:
             return jsonify({
-                "message": "Alerta marcado como lido",
-                "success": True
-            }), 200
+                "message": "Alerta não encontrado",
+                "success": False
+            }), 404
+        
+        # Verificar se o usuário pode marcar este alerta
+        if alerta.usuario_id and alerta.usuario_id != user_data['id'] and user_data['cargo'] != 'admin':
+            return jsonify({
+                "message": "Sem permissão para marcar este alerta",
+                "success": False
+            }), 403
+        
+        alerta.status = 'lido'
+        db.commit()
         
-        finally:
-            db.close()
+        return jsonify({
+            "message": "Alerta marcado como lido",
+            "success": True
+        }), 200
     
     except Exception as e:
         return jsonify({
             "message": f"Erro interno: {str(e)}",
             "success": False
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+def _eventos_do_usuario(usuario_id, cargo, posicao, mensagens):
+    """Gera as mensagens SSE do usuário até SSE_DURACAO_MAXIMA, com heartbeat em silêncio"""
+    yield from mensagens
+
+    fim = time.monotonic() + SSE_DURACAO_MAXIMA
+    while time.monotonic() < fim:
+        eventos, perdeu = barramento.aguardar(posicao, min(SSE_HEARTBEAT, max(0, fim - time.monotonic())))
+        if not eventos:
+            yield HEARTBEAT_SSE
+            continue
+
+        mensagens, posicao = mensagens_do_usuario(eventos, perdeu, posicao, usuario_id, cargo)
+        yield from mensagens
+
+
+@dashboard_bp.route("/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_dashboard():
+    """
+    Server-Sent Events com alertas criados, atualizados e lidos e deltas dos
+    contadores, filtrados pela visibilidade do usuário. Substitui o polling de
+    / e /alertas. O EventSource do navegador não envia cabeçalhos, por isso o
+    token também é aceito em ?jwt=. Retoma a partir do cabeçalho Last-Event-ID;
+    o evento 'sincronizar' pede ao cliente que recarregue os dados completos.
+    """
+    try:
+        user_data = get_current_user_from_token()
+
+        if not user_data:
+            return usuario_nao_encontrado()
+    except Exception as e:
+        return erro_interno(e)
+
+    # A conexão fica aberta por minutos: a sessão do banco é devolvida antes
+    encerrar_db()
+
+    posicao, mensagens = abrir_stream(ultimo_evento_recebido())
+
+    return Response(
+        stream_with_context(_eventos_do_usuario(user_data["id"], user_data["cargo"], posicao, mensagens)),
+        mimetype="text/event-stream",
+        headers=CABECALHOS_SSE
+    )
@@ -1,6 +1,13 @@
-from flask import Blueprint, jsonify, request
-from app.database import SessionLocal
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from app.database import get_db, ler_do_primario
 from app.models import Recurso
+from app.services.recurso_service import listar_recursos, agregar_recursos, buscar_recursos
+from app.services.importacao_service import FORMATOS, detectar_formato, importar_recursos, exportar_recursos
+from app.services.operacoes_service import OperacoesRejeitadas, aplicar_operacoes
+from app.services.estoque_service import definir_motivo, obter_historico
+from app.services.regras_alerta import avaliar_recursos, resolver_alertas_de_removidos
+from app.cache import cache_recursos, invalidar_inventario
+from app.condicional import get_condicional
 from flask_jwt_extended import jwt_required, get_jwt
 from sqlalchemy.exc import IntegrityError
 
@@ -14,32 +21,84 @@ def get_current_user_role():
     except:
         return 'usuario'
 
+# Leitura da requisição e montagem das respostas da listagem e da busca, usadas
+# pelas views abaixo e pelos handlers assíncronos de app.asgi
+
+def parametros_listagem():
+    """Argumentos de listar_recursos lidos da query string"""
+    return {
+        "filtros": {
+            "tipo": request.args.get('tipo'),
+            "quantidade_min": request.args.get('quantidade_min', type=int),
+            "quantidade_max": request.args.get('quantidade_max', type=int),
+            "nome_prefixo": request.args.get('nome'),
+        },
+        "ordenar_por": request.args.get('ordenar_por', 'created_at'),
+        "ordem": request.args.get('ordem', 'asc'),
+        "cursor": request.args.get('cursor'),
+        "limite": request.args.get('limite', type=int)
+    }
+
+def resposta_listagem(itens, next_cursor):
+    return jsonify({
+        "data": itens,
+        "next_cursor": next_cursor
+    }), 200
+
+def erro_listagem(e):
+    return jsonify({"message": f"Erro ao carregar recursos: {str(e)}"}), 500
+
+def parametros_busca():
+    """Argumentos de buscar_recursos lidos da query string"""
+    return {
+        "termo": request.args.get('q'),
+        "cursor": request.args.get('cursor'),
+        "limite": request.args.get('limite', type=int)
+    }
+
+def resposta_busca(itens, next_cursor, ordenacao):
+    return jsonify({
+        "data": itens,
+        "next_cursor": next_cursor,
+        "ordenacao": ordenacao
+    }), 200
+
+def erro_busca():
+    # A mensagem do banco traz o SQL da consulta: fica só no log
+    current_app.logger.exception("Erro ao buscar recursos")
+    return jsonify({"message": "Erro ao buscar recursos"}), 500
+
+def erro_parametros(e):
+    return jsonify({"message": str(e)}), 400
+
 @resource_bp.route('/', methods=['GET'])
 @jwt_required()
+@get_condicional("recursos")
 def get_resources():
-    """Buscar todos os recursos"""
-    db = SessionLocal()
+    """Listar recursos com paginação por cursor, filtros e ordenação"""
+    db = get_db(somente_leitura=True)
     try:
-        resources = db.query(Recurso).all()
-        result = []
-        
-        for r in resources:
-            result.append({
-                "id": r.id,
-                "nome": r.nome,
-                "tipo": r.tipo,
-                "quantidade": r.quantidade,
-                "valor_unit": r.valor_unit,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "updated_at": r.updated_at.isoformat() if r.updated_at else None
-            })
-        
-        return jsonify(result), 200
-        
+        itens, next_cursor = listar_recursos(db, **parametros_listagem())
+        return resposta_listagem(itens, next_cursor)
+
+    except ValueError as e:
+        return erro_parametros(e)
     except Exception as e:
-        return jsonify({"message": f"Erro ao carregar recursos: {str(e)}"}), 500
-    finally:
-        db.close()
+        return erro_listagem(e)
+
+@resource_bp.route('/search', methods=['GET'])
+@jwt_required()
+@get_condicional("recursos")
+def search_resources():
+    """Busca por nome e tipo (?q=), com prefixo por palavra e paginação por cursor"""
+    try:
+        itens, next_cursor, ordenacao = buscar_recursos(get_db(somente_leitura=True), **parametros_busca())
+        return resposta_busca(itens, next_cursor, ordenacao)
+
+    except ValueError as e:
+        return erro_parametros(e)
+    except Exception:
+        return erro_busca()
 
 @resource_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -50,7 +109,7 @@ def create_resource():
     if user_role not in ['admin', 'gerente']:
         return jsonify({"message": "Permissão negada. Apenas admin e gerente podem criar recursos."}), 403
     
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.json
         
@@ -91,7 +150,10 @@ def create_resource():
         )
         
         db.add(new_resource)
+        db.flush()
+        avaliar_recursos(db, [new_resource])
         db.commit()
+        invalidar_inventario()
         db.refresh(new_resource)
 
         return jsonify({
@@ -111,30 +173,35 @@ def create_resource():
     except Exception as e:
         db.rollback()
         return jsonify({"message": f"Erro interno: {str(e)}"}), 500
-    finally:
-        db.close()
+
+def _carregar_recurso(db, resource_id):
+    resource = db.query(Recurso).filter_by(id=resource_id).first()
+    if not resource:
+        return None
+    
+    return {
+        "id": resource.id,
+        "nome": resource.nome,
+        "tipo": resource.tipo,
+        "quantidade": resource.quantidade,
+        "valor_unit": resource.valor_unit,
+        "created_at": resource.created_at.isoformat() if resource.created_at else None,
+        "updated_at": resource.updated_at.isoformat() if resource.updated_at else None
+    }
 
 @resource_bp.route('/<int:resource_id>', methods=['GET'])
 @jwt_required()
+@get_condicional("recursos")
 def get_resource(resource_id):
     """Buscar recurso específico por ID"""
-    db = SessionLocal()
-    try:
-        resource = db.query(Recurso).filter_by(id=resource_id).first()
-        if not resource:
-            return jsonify({"message": "Recurso não encontrado"}), 404
-        
-        return jsonify({
-            "id": resource.id,
-            "nome": resource.nome,
-            "tipo": resource.tipo,
-            "quantidade": resource.quantidade,
-            "valor_unit": resource.valor_unit,
-            "created_at": resource.created_at.isoformat() if resource.created_at else None,
-            "updated_at": resource.updated_at.isoformat() if resource.updated_at else None
-        }), 200
-    finally:
-        db.close()
+    db = get_db(somente_leitura=True)
+    resource = cache_recursos.obter(
+        "recurso", lambda: _carregar_recurso(ler_do_primario(db), resource_id), parametros={"id": resource_id}
+    )
+    if not resource:
+        return jsonify({"message": "Recurso não encontrado"}), 404
+
+    return jsonify(resource), 200
 
 @resource_bp.route('/<int:resource_id>', methods=['PUT'])
 @jwt_required()
@@ -145,7 +212,7 @@ def update_resource(resource_id):
     if user_role not in ['admin', 'gerente']:
         return jsonify({"message": "Permissão negada. Apenas admin e gerente podem editar recursos."}), 403
     
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.json
         if not data:
@@ -178,6 +245,7 @@ def update_resource(resource_id):
             if quantidade < 0:
                 return jsonify({"message": "Quantidade não pode ser negativa"}), 400
             resource.quantidade = quantidade
+            definir_motivo(db, data.get('motivo'))
         
         if 'valor_unit' in data:
             valor_unit = float(data['valor_unit'])
@@ -185,7 +253,9 @@ def update_resource(resource_id):
                 return jsonify({"message": "Valor unitário deve ser maior que zero"}), 400
             resource.valor_unit = valor_unit
 
+        avaliar_recursos(db, [resource])
         db.commit()
+        invalidar_inventario()
         db.refresh(resource)
 
         return jsonify({
@@ -205,8 +275,31 @@ def update_resource(resource_id):
     except Exception as e:
         db.rollback()
         return jsonify({"message": f"Erro interno: {str(e)}"}), 500
-    finally:
-        db.close()
+
+@resource_bp.route('/<int:resource_id>/historico', methods=['GET'])
+@jwt_required()
+# Sem ?fim= a janela termina agora e anda com o relógio: a versão não muda, a resposta sim
+@get_condicional("recursos", quando=lambda: request.args.get('fim'))
+def get_resource_history(resource_id):
+    """Movimentação de estoque por hora ou por dia (?inicio=, ?fim=, ?granularidade=)"""
+    db = get_db(somente_leitura=True)
+    try:
+        if not db.query(Recurso.id).filter_by(id=resource_id).first():
+            return jsonify({"message": "Recurso não encontrado"}), 404
+
+        historico = obter_historico(
+            db,
+            resource_id,
+            inicio=request.args.get('inicio'),
+            fim=request.args.get('fim'),
+            granularidade=request.args.get('granularidade')
+        )
+        return jsonify(historico), 200
+
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": f"Erro ao carregar histórico: {str(e)}"}), 500
 
 @resource_bp.route("/<int:resource_id>", methods=["DELETE"])
 @jwt_required()
@@ -217,15 +310,17 @@ def delete_resource(resource_id):
     if user_role != 'admin':
         return jsonify({"message": "Permissão negada. Apenas admin pode deletar recursos."}), 403
     
-    db = SessionLocal()
+    db = get_db()
     try:
         resource = db.query(Recurso).filter_by(id=resource_id).first()
         if not resource:
             return jsonify({"message": "Recurso não encontrado"}), 404
 
         resource_name = resource.nome
+        resolver_alertas_de_removidos(db, [resource.id])
         db.delete(resource)
         db.commit()
+        invalidar_inventario()
         
         return jsonify({
             "message": f"Recurso '{resource_name}' deletado com sucesso"
@@ -234,92 +329,152 @@ def delete_resource(resource_id):
     except Exception as e:
         db.rollback()
         return jsonify({"message": f"Erro ao deletar recurso: {str(e)}"}), 500
-    finally:
-        db.close()
+
+def _carregar_estatisticas(db):
+    resumo = agregar_recursos(db)
+
+    return {
+        "total": resumo["total"],
+        "porTipo": resumo["por_tipo"],
+        "criticos": resumo["criticos"],
+        "valorTotal": resumo["valor_total"],
+        "esgotados": resumo["esgotados"],
+        "baixoEstoque": resumo["baixo_estoque"]
+    }
 
 @resource_bp.route('/estatisticas', methods=['GET'])
 @jwt_required()
+@get_condicional("recursos")
 def get_statistics():
     """Obter estatísticas dos recursos"""
-    db = SessionLocal()
     try:
-        recursos = db.query(Recurso).all()
-        
-        stats = {
-            "total": len(recursos),
-            "porTipo": {},
-            "criticos": 0,
-            "valorTotal": 0,
-            "esgotados": 0,
-            "baixoEstoque": 0
-        }
-        
-        for recurso in recursos:
-            # Contar por tipo
-            tipo = recurso.tipo
-            stats["porTipo"][tipo] = stats["porTipo"].get(tipo, 0) + 1
-            
-            # Contar críticos (< 5)
-            if recurso.quantidade < 5:
-                stats["criticos"] += 1
-            
-            # Contar esgotados
-            if recurso.quantidade == 0:
-                stats["esgotados"] += 1
-            
-            # Contar baixo estoque (5-9)
-            if 5 <= recurso.quantidade < 10:
-                stats["baixoEstoque"] += 1
-            
-            # Somar valor total
-            stats["valorTotal"] += recurso.quantidade * recurso.valor_unit
-        
+        db = get_db(somente_leitura=True)
+        stats = cache_recursos.obter("estatisticas", lambda: _carregar_estatisticas(ler_do_primario(db)))
         return jsonify(stats), 200
         
     except Exception as e:
         return jsonify({"message": f"Erro ao calcular estatísticas: {str(e)}"}), 500
-    finally:
-        db.close()
+
+def _carregar_tipos(db):
+    tipos = db.query(Recurso.tipo).distinct().all()
+    tipos_list = [tipo[0] for tipo in tipos if tipo[0]]
+    tipos_list.sort()
+    return tipos_list
 
 @resource_bp.route('/tipos', methods=['GET'])
 @jwt_required()
+@get_condicional("recursos")
 def get_tipos():
     """Obter todos os tipos únicos de recursos"""
-    db = SessionLocal()
     try:
-        tipos = db.query(Recurso.tipo).distinct().all()
-        tipos_list = [tipo[0] for tipo in tipos if tipo[0]]
-        tipos_list.sort()
-        
+        db = get_db(somente_leitura=True)
+        tipos_list = cache_recursos.obter("tipos", lambda: _carregar_tipos(ler_do_primario(db)))
         return jsonify(tipos_list), 200
         
     except Exception as e:
         return jsonify({"message": f"Erro ao buscar tipos: {str(e)}"}), 500
-    finally:
-        db.close()
+
+def _carregar_criticos(db, limite):
+    recursos = db.query(Recurso).filter(Recurso.quantidade < limite).all()
+    
+    result = []
+    for r in recursos:
+        result.append({
+            "id": r.id,
+            "nome": r.nome,
+            "tipo": r.tipo,
+            "quantidade": r.quantidade,
+            "valor_unit": r.valor_unit
+        })
+    return result
 
 @resource_bp.route('/criticos', methods=['GET'])
 @jwt_required()
+@get_condicional("recursos")
 def get_recursos_criticos():
     """Buscar recursos com estoque crítico"""
-    db = SessionLocal()
     try:
         limite = request.args.get('limite', default=5, type=int)
-        recursos = db.query(Recurso).filter(Recurso.quantidade < limite).all()
-        
-        result = []
-        for r in recursos:
-            result.append({
-                "id": r.id,
-                "nome": r.nome,
-                "tipo": r.tipo,
-                "quantidade": r.quantidade,
-                "valor_unit": r.valor_unit
-            })
-        
+        db = get_db(somente_leitura=True)
+        result = cache_recursos.obter(
+            "criticos", lambda: _carregar_criticos(ler_do_primario(db), limite), parametros={"limite": limite}
+        )
         return jsonify(result), 200
         
     except Exception as e:
         return jsonify({"message": f"Erro ao buscar recursos críticos: {str(e)}"}), 500
-    finally:
-        db.close()
\ No newline at end of file
+
+@resource_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_resources():
+    """Aplica várias operações (criar, atualizar, remover, ajustar) em uma única transação"""
+    user_role = get_current_user_role()
+
+    if user_role not in ['admin', 'gerente']:
+        return jsonify({"message": "Permissão negada. Apenas admin e gerente podem editar recursos."}), 403
+
+    data = request.get_json(silent=True)
+    operacoes = data.get('operacoes') if isinstance(data, dict) else data
+
+    db = get_db()
+    try:
+        if isinstance(data, dict):
+            definir_motivo(db, data.get('motivo'))
+        resultados = aplicar_operacoes(db, operacoes, user_role)
+        return jsonify({"success": True, "resultados": resultados}), 200
+
+    except OperacoesRejeitadas as e:
+        db.rollback()
+        return jsonify({"success": False, "message": str(e), "resultados": e.resultados}), e.status
+    except Exception as e:
+        db.rollback()
+        return jsonify({"success": False, "message": f"Erro interno: {str(e)}"}), 500
+
+@resource_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_resources():
+    """Importação em massa via CSV ou NDJSON com upsert pelo nome (admin/gerente apenas)"""
+    user_role = get_current_user_role()
+
+    if user_role not in ['admin', 'gerente']:
+        return jsonify({"message": "Permissão negada. Apenas admin e gerente podem importar recursos."}), 403
+
+    try:
+        formato = detectar_formato(request.args.get('formato'), request.mimetype)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 415
+
+    db = get_db()
+    try:
+        relatorio = importar_recursos(db, request.stream, formato)
+        return jsonify(relatorio), 200
+
+    except Exception as e:
+        db.rollback()
+        return jsonify({"message": f"Erro ao importar recursos: {str(e)}"}), 500
+
+@resource_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_resources():
+    """Exportação do inventário em CSV ou NDJSON, transmitida em blocos"""
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return jsonify({"message": f"Formato inválido. Use: {', '.join(FORMATOS)}"}), 400
+
+    db = get_db(somente_leitura=True)
+    blocos = exportar_recursos(db, formato, tipo=request.args.get('tipo'))
+
+    return Response(
+        stream_with_context(blocos),
+        mimetype=FORMATOS[formato],
+        headers={"Content-Disposition": f"attachment; filename=recursos.{formato}"}
+    )
+
+@resource_bp.route('/cache/estatisticas', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Acertos e falhas do cache de leitura de recursos (admin apenas)"""
+    if get_current_user_role() != 'admin':
+        return jsonify({"message": "Permissão negada. Apenas admin pode consultar o cache."}), 403
+
+    return jsonify(cache_recursos.estatisticas()), 200
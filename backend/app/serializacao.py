@@ -0,0 +1,62 @@
+import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.config import JSON_PROVEDOR
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ProvedorJSONPadrao(DefaultJSONProvider):
+    """Encoder da biblioteca padrão, com datas em ISO 8601 como no provedor rápido"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime.date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class ProvedorJSONRapido(ProvedorJSONPadrao):
+    """
+    orjson: serializa datetime, date e UUID nativamente e escreve bytes
+    direto na resposta, sem passar por str.
+    """
+
+    def _opcoes(self, sort_keys=None, indent=None):
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indent:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        opcoes = self._opcoes(kwargs.get("sort_keys"), kwargs.get("indent"))
+        return orjson.dumps(obj, default=self.default, option=opcoes).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Em debug mantém a saída indentada do provedor padrão
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        corpo = orjson.dumps(obj, default=self.default, option=self._opcoes())
+        return self._app.response_class(corpo + b"\n", mimetype=self.mimetype)
+
+
+def criar_provedor_json(app, nome=JSON_PROVEDOR):
+    """auto usa orjson quando instalado; orjson exige o pacote; padrao usa a stdlib"""
+    if nome == "padrao" or (nome == "auto" and orjson is None):
+        return ProvedorJSONPadrao(app)
+    if nome in ("auto", "orjson"):
+        if orjson is None:
+            raise RuntimeError("JSON_PROVEDOR=orjson requer o pacote 'orjson' instalado")
+        return ProvedorJSONRapido(app)
+    raise ValueError(f"Provedor JSON desconhecido: {nome}")
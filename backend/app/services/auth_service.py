@@ -1,11 +1,12 @@
 from app.models import Usuario
-from app.database import SessionLocal
-from app.utils import set_senha, verificar_senha
+from app.database import SessionLocal, ler_do_primario
+from app.utils import set_senha, set_senha_async, verificar_senha, verificar_senha_async, precisa_rehash, HashSobrecarregado
 from app.services.jwt_service import create_tokens
+from app.cache import cache_usuarios
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 
-def create_user(user_data):
-    db = SessionLocal()
+def create_user(db, user_data):
     try:
         existing_user = db.query(Usuario).filter_by(email=user_data['email']).first()
         if existing_user:
@@ -63,62 +64,134 @@ def create_user(user_data):
         db.rollback()
         return {"message": "E-mail já cadastrado", "success": False}
     
+    except HashSobrecarregado:
+        db.rollback()
+        raise
+    
     except Exception as e:
         db.rollback()
         return {"message": f"Erro ao criar usuario: {str(e)}", "success": False}
-    
-    finally:
-        db.close()
 
-def authenticate_user(email, senha):
-    db = SessionLocal()
-    try:
-        user = db.query(Usuario).filter_by(email=email).first()
-
-        if user and verificar_senha(user.senha_hash, senha):
-            user_info = {
-                "name": user.name,
-                "cpf": user.cpf,
-                "email": user.email,
-                "cargo": user.cargo
-            }
+def _buscar_por_email(db, email):
+    return db.query(Usuario).filter_by(email=email).first()
 
-            tokens = create_tokens(user.id, user_info)
+def _login_realizado(user):
+    user_info = {
+        "name": user.name,
+        "cpf": user.cpf,
+        "email": user.email,
+        "cargo": user.cargo
+    }
 
-            return {
-                "message": "Login realizado com sucesso",
-                "success": True,
-                "user": {
-                    "id": user.id,
-                    "name": user.name,
-                    "cpf": user.cpf,
-                    "email": user.email,
-                    "cargo": user.cargo
-                },
-                "token": tokens['access_token'],
-                "refreshtoken": tokens['refresh_token']
-            }
-    
-        return {"message": "Credenciais invalidas", "success": False}
-    
-    finally:
-        db.close()
+    tokens = create_tokens(user.id, user_info)
 
-def get_user_by_id(user_id):
-    db = SessionLocal()
-    try:
-        user = db.query(Usuario).filter_by(id=user_id).first()
+    return {
+        "message": "Login realizado com sucesso",
+        "success": True,
+        "user": {
+            "id": user.id,
+            "name": user.name,
+            "cpf": user.cpf,
+            "email": user.email,
+            "cargo": user.cargo
+        },
+        "token": tokens['access_token'],
+        "refreshtoken": tokens['refresh_token']
+    }
 
-        if user:
-            return {
-                "id": user.id,
-                "name": user.name,
-                "cpf": user.cpf,
-                "email": user.email,
-                "cargo": user.cargo
-            }
-        
-        return None
-    
-    finally:
-        db.close()
\ No newline at end of file
+def authenticate_user(db, email, senha):
+    user = _buscar_por_email(db, email)
+    # Devolve a conexão ao pool antes de entrar na fila do hash: numa rajada de
+    # logins, conexões presas à espera do hash esgotariam o pool das demais rotas.
+    # O usuário continua utilizável (desanexado, com os atributos já carregados)
+    db.close()
+
+    if user and verificar_senha(user.senha_hash, senha):
+        # Atualiza hashes antigos para os parâmetros configurados no login bem-sucedido.
+        # É opcional: com o pool de hash cheio fica para o próximo login
+        if precisa_rehash(user.senha_hash):
+            try:
+                novo_hash = set_senha(senha)
+                db.add(user)
+                user.senha_hash = novo_hash
+                db.commit()
+            except HashSobrecarregado:
+                pass
+
+        return _login_realizado(user)
+
+    return {"message": "Credenciais invalidas", "success": False}
+
+async def authenticate_user_async(db, email, senha):
+    """Versão para AsyncSession: o hash é aguardado sem bloquear o loop de eventos"""
+    user = await db.run_sync(_buscar_por_email, email)
+    await db.close()
+
+    if user and await verificar_senha_async(user.senha_hash, senha):
+        resultado = _login_realizado(user)
+        if precisa_rehash(user.senha_hash):
+            try:
+                novo_hash = await set_senha_async(senha)
+                db.add(user)
+                user.senha_hash = novo_hash
+                await db.commit()
+            except HashSobrecarregado:
+                pass
+        return resultado
+
+    return {"message": "Credenciais invalidas", "success": False}
+
+def _perfil(user):
+    return {
+        "id": user.id,
+        "name": user.name,
+        "cpf": user.cpf,
+        "email": user.email,
+        "cargo": user.cargo
+    }
+
+def _carregar_usuario(db, user_id):
+    user = db.query(Usuario).filter_by(id=user_id).first()
+    return _perfil(user) if user else None
+
+def get_user_by_id(db, user_id):
+    """Perfil do usuário, servido do cache quando possível"""
+    return cache_usuarios.obter(
+        "perfil", lambda: _carregar_usuario(ler_do_primario(db), user_id), parametros={"id": user_id}
+    )
+
+async def get_user_by_id_async(db, user_id):
+    return await db.run_sync(get_user_by_id, user_id)
+
+def get_users_by_ids(db, user_ids):
+    """
+    Perfis de vários usuários: acertos vêm do cache e as falhas são
+    buscadas com uma única consulta IN. Retorna {id: perfil} dos encontrados.
+    """
+    def carregar(faltantes):
+        return {user.id: _perfil(user) for user in ler_do_primario(db).query(Usuario).filter(Usuario.id.in_(faltantes))}
+
+    perfis = cache_usuarios.obter_varios(
+        "perfil", {int(user_id): {"id": int(user_id)} for user_id in user_ids}, carregar
+    )
+    return {user_id: perfil for user_id, perfil in perfis.items() if perfil is not None}
+
+
+def _marcar_usuarios_alterados(session, flush_context):
+    alterados = session.info.setdefault("usuarios_alterados", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Usuario) and obj.id is not None:
+            alterados.add(obj.id)
+
+def _invalidar_usuarios_alterados(session):
+    for user_id in session.info.pop("usuarios_alterados", ()):
+        cache_usuarios.remover("perfil", {"id": user_id})
+
+def _descartar_usuarios_alterados(session):
+    session.info.pop("usuarios_alterados", None)
+
+# Invalida o perfil em cache sempre que um usuário é criado, alterado ou removido
+if not event.contains(SessionLocal, "after_flush", _marcar_usuarios_alterados):
+    event.listen(SessionLocal, "after_flush", _marcar_usuarios_alterados)
+    event.listen(SessionLocal, "after_commit", _invalidar_usuarios_alterados)
+    event.listen(SessionLocal, "after_rollback", _descartar_usuarios_alterados)
@@ -0,0 +1,267 @@
+# backend/app/services/contadores_service.py
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import SessionLocal
+from app.eventos import acumular_contadores, registrar
+from app.models import Alerta, Contador, Recurso, Usuario
+from app.services.recurso_service import LIMITE_ESTOQUE_BAIXO, agregar_recursos
+
+# Chaves dos contadores. Alertas sem usuário (gerais) usam o escopo "geral".
+USUARIOS_TOTAL = "usuarios:total"
+RECURSOS_TOTAL = "recursos:total"
+RECURSOS_CRITICOS = "recursos:criticos"
+RECURSOS_VALOR_TOTAL = "recursos:valor_total"
+PREFIXO_RECURSOS_TIPO = "recursos:tipo:"
+PREFIXO_VERSAO = "versao:"
+
+# Conjuntos de dados versionados; a versão alimenta os ETags das leituras
+CONJUNTOS = {Recurso: "recursos", Alerta: "alertas", Usuario: "usuarios"}
+
+def _sucessor(prefixo):
+    """Menor texto maior que todos os que começam com o prefixo: prefixo <= chave < sucessor"""
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+def chave_versao(conjunto):
+    return PREFIXO_VERSAO + conjunto
+
+def chave_alertas_status(status):
+    return f"alertas:status:{status}"
+
+def chave_alertas_usuario(usuario_id, status=None):
+    escopo = "geral" if usuario_id is None else usuario_id
+    if status is None:
+        return f"alertas:usuario:{escopo}:total"
+    return f"alertas:usuario:{escopo}:status:{status}"
+
+
+def chaves_dashboard(usuario_id, cargo):
+    """
+    Contadores que get_dashboard_data lê para o cargo: (chaves, prefixos).
+    É também a lista do que o stream de eventos pode repassar a esse usuário.
+    """
+    if cargo == 'admin':
+        return [
+            USUARIOS_TOTAL,
+            RECURSOS_TOTAL,
+            RECURSOS_CRITICOS,
+            RECURSOS_VALOR_TOTAL,
+            chave_alertas_status('pendente'),
+            chave_alertas_status('nao_lido')
+        ], ()
+    if cargo == 'gerente':
+        # Alertas do próprio usuário + alertas gerais
+        return [
+            RECURSOS_TOTAL,
+            RECURSOS_CRITICOS,
+            chave_alertas_usuario(usuario_id, 'pendente'),
+            chave_alertas_usuario(None, 'pendente')
+        ], (PREFIXO_RECURSOS_TIPO,)
+    return [
+        RECURSOS_TOTAL,
+        RECURSOS_CRITICOS,
+        chave_alertas_usuario(usuario_id),
+        chave_alertas_usuario(usuario_id, 'nao_lido')
+    ], ()
+
+
+def contribuicao_recurso(tipo, quantidade, valor_unit):
+    return {
+        RECURSOS_TOTAL: 1,
+        RECURSOS_CRITICOS: 1 if quantidade < LIMITE_ESTOQUE_BAIXO else 0,
+        RECURSOS_VALOR_TOTAL: quantidade * valor_unit,
+        PREFIXO_RECURSOS_TIPO + tipo: 1
+    }
+
+def contribuicao_alerta(usuario_id, status):
+    return {
+        chave_alertas_status(status): 1,
+        chave_alertas_usuario(usuario_id): 1,
+        chave_alertas_usuario(usuario_id, status): 1
+    }
+
+def contribuicao_usuario():
+    return {USUARIOS_TOTAL: 1}
+
+
+def somar_contribuicao(deltas, contribuicao, fator):
+    for chave, valor in contribuicao.items():
+        deltas[chave] += fator * valor
+
+def _anterior(obj, atributo):
+    """Valor do atributo antes das alterações pendentes no flush"""
+    historico = inspect(obj).attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    return getattr(obj, atributo)
+
+def _contribuicao(obj, valor):
+    if isinstance(obj, Recurso):
+        return contribuicao_recurso(valor(obj, "tipo"), valor(obj, "quantidade"), valor(obj, "valor_unit"))
+    if isinstance(obj, Alerta):
+        return contribuicao_alerta(valor(obj, "usuario_id"), valor(obj, "status") or "pendente")
+    if isinstance(obj, Usuario):
+        return contribuicao_usuario()
+    return None
+
+
+def incrementar(db, deltas):
+    """
+    Aplica deltas aos contadores com um único upsert em lote (executemany).
+    Os mesmos deltas são enviados aos streams do dashboard após o commit.
+    """
+    linhas = [{"chave": chave, "valor": valor} for chave, valor in deltas.items() if valor]
+    if not linhas:
+        return
+
+    conexao = db.connection()
+    dialeto = postgresql if conexao.dialect.name == "postgresql" else sqlite
+    instrucao = dialeto.insert(Contador.__table__)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[Contador.chave],
+        set_={"valor": Contador.__table__.c.valor + instrucao.excluded.valor}
+    )
+    conexao.execute(instrucao, linhas)
+    acumular_contadores(db, deltas)
+
+def marcar_modificacao(conexao, conjuntos):
+    """
+    Avança a versão dos conjuntos alterados. A versão é o instante da alteração
+    em ms, forçada a crescer mesmo com alterações no mesmo milissegundo.
+    """
+    if not conjuntos:
+        return
+
+    agora = int(time.time() * 1000)
+    postgres = conexao.dialect.name == "postgresql"
+    dialeto = postgresql if postgres else sqlite
+    maior = func.greatest if postgres else func.max
+
+    instrucao = dialeto.insert(Contador.__table__)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[Contador.chave],
+        set_={"valor": maior(Contador.__table__.c.valor + 1, instrucao.excluded.valor)}
+    )
+    conexao.execute(instrucao, [{"chave": chave_versao(conjunto), "valor": agora} for conjunto in sorted(set(conjuntos))])
+
+
+def _atualizar_contadores_no_flush(session, flush_context):
+    """Calcula as diferenças de novos, alterados e removidos e as grava na mesma transação"""
+    deltas = defaultdict(float)
+    modificados = set()
+
+    for obj in session.new:
+        contribuicao = _contribuicao(obj, getattr)
+        if contribuicao:
+            somar_contribuicao(deltas, contribuicao, 1)
+            modificados.add(CONJUNTOS[type(obj)])
+
+    for obj in session.deleted:
+        contribuicao = _contribuicao(obj, _anterior)
+        if contribuicao:
+            somar_contribuicao(deltas, contribuicao, -1)
+            modificados.add(CONJUNTOS[type(obj)])
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        antes = _contribuicao(obj, _anterior)
+        if antes:
+            somar_contribuicao(deltas, antes, -1)
+            somar_contribuicao(deltas, _contribuicao(obj, getattr), 1)
+            modificados.add(CONJUNTOS[type(obj)])
+
+    incrementar(session, deltas)
+    marcar_modificacao(session.connection(), modificados)
+
+def _manter_valor_anterior(target, value, oldvalue, initiator):
+    return value
+
+if not event.contains(SessionLocal, "after_flush", _atualizar_contadores_no_flush):
+    event.listen(SessionLocal, "after_flush", _atualizar_contadores_no_flush)
+
+    # active_history garante que o valor anterior seja carregado mesmo se o
+    # atributo estiver expirado (ex.: alterado logo após um commit)
+    for atributo in (Recurso.tipo, Recurso.quantidade, Recurso.valor_unit, Alerta.status, Alerta.usuario_id):
+        event.listen(atributo, "set", _manter_valor_anterior, active_history=True, retval=True)
+
+
+def _consulta_contadores(chaves, prefixos):
+    # Cada prefixo vira um intervalo na chave primária (prefixo <= chave < sucessor),
+    # que usa o índice; um LIKE percorreria a tabela inteira
+    filtro = Contador.chave.in_(list(chaves))
+    for prefixo in prefixos:
+        filtro = filtro | ((Contador.chave >= prefixo) & (Contador.chave < _sucessor(prefixo)))
+    return select(Contador.chave, Contador.valor).where(filtro)
+
+def _valores_contadores(chaves, linhas):
+    valores = {chave: 0 for chave in chaves}
+    for chave, valor in linhas:
+        valores[chave] = valor
+    return valores
+
+def ler_contadores(db, chaves, prefixos=()):
+    """Lê os contadores pedidos em uma única consulta; ausentes valem 0"""
+    return _valores_contadores(chaves, db.execute(_consulta_contadores(chaves, prefixos)))
+
+async def ler_contadores_async(db, chaves, prefixos=()):
+    """ler_contadores sobre uma AsyncSession (modo ASGI)"""
+    return _valores_contadores(chaves, await db.execute(_consulta_contadores(chaves, prefixos)))
+
+
+def calcular_contadores(db):
+    """Valores esperados de todos os contadores (exceto versões), calculados do zero"""
+    valores = defaultdict(float)
+
+    valores[USUARIOS_TOTAL] = db.query(func.count(Usuario.id)).scalar() or 0
+
+    resumo = agregar_recursos(db)
+    valores[RECURSOS_TOTAL] = resumo["total"]
+    valores[RECURSOS_CRITICOS] = resumo["abaixo_do_minimo"]
+    valores[RECURSOS_VALOR_TOTAL] = resumo["valor_total"]
+    for tipo, total in resumo["por_tipo"].items():
+        valores[PREFIXO_RECURSOS_TIPO + tipo] = total
+
+    alertas = db.query(Alerta.usuario_id, Alerta.status, func.count(Alerta.id)).group_by(
+        Alerta.usuario_id, Alerta.status
+    )
+    for usuario_id, status, total in alertas:
+        somar_contribuicao(valores, contribuicao_alerta(usuario_id, status), total)
+
+    return valores
+
+
+def corrigir_contadores(db, valores):
+    """
+    Leva os contadores aos valores esperados somando (esperado - atual) só nas
+    chaves divergentes, com o mesmo upsert incremental das escritas: incrementos
+    de outras transações gravados entre a leitura e a correção não se perdem.
+    Retorna as chaves corrigidas.
+    """
+    # Tudo menos as versões: uma leitura por intervalo da chave primária
+    atuais = {}
+    for faixa in (Contador.chave < PREFIXO_VERSAO, Contador.chave >= _sucessor(PREFIXO_VERSAO)):
+        atuais.update(db.query(Contador.chave, Contador.valor).filter(faixa))
+    correcoes = {
+        chave: valores.get(chave, 0) - atuais.get(chave, 0)
+        for chave in set(atuais) | set(valores)
+        if abs(atuais.get(chave, 0) - valores.get(chave, 0)) > 1e-6
+    }
+    incrementar(db, correcoes)
+    return set(correcoes)
+
+
+def reconciliar_contadores(db):
+    """Recalcula todos os contadores do zero e corrige os que divergem"""
+    valores = calcular_contadores(db)
+
+    # As versões não são recalculáveis; só avançam se algum contador divergia
+    if corrigir_contadores(db, valores):
+        marcar_modificacao(db.connection(), CONJUNTOS.values())
+        # Os deltas já enviados não batem mais; os clientes recarregam os totais
+        registrar(db, "sincronizar")
+    db.commit()
+    return dict(valores)
@@ -1,285 +1,311 @@
 # backend/app/services/dashboard_service.py
 from app.models import Recurso, Usuario, Alerta, Dashboard
-from app.database import SessionLocal
+from app.services.recurso_service import agregar_recursos
+from app.services.regras_alerta import sincronizar_alertas
+from app.services.contadores_service import (
+    chaves_dashboard,
+    ler_contadores,
+    ler_contadores_async,
+    chave_alertas_status,
+    chave_alertas_usuario,
+    USUARIOS_TOTAL,
+    RECURSOS_TOTAL,
+    RECURSOS_CRITICOS,
+    RECURSOS_VALOR_TOTAL,
+    PREFIXO_RECURSOS_TIPO
+)
+from app.config import PAGINACAO_LIMITE_MAXIMO
+from app.metricas import contar_erro
+from app.utils import codificar_cursor, decodificar_cursor
 from datetime import datetime, timedelta
-from sqlalchemy import desc, func
+from sqlalchemy import String, desc, func, select, tuple_, type_coerce, union_all
+import logging
 
-def get_dashboard_data(user_id, user_cargo):
+logger = logging.getLogger(__name__)
+
+# Tamanho padrão da página do feed de alertas (?limite= aceita até PAGINACAO_LIMITE_MAXIMO)
+ALERTAS_LIMITE_ADMIN = 20
+ALERTAS_LIMITE_USUARIO = 10
+
+def get_dashboard_data(db, user_id, user_cargo):
     """
-    Obtém dados do dashboard baseado no usuário e cargo
+    Obtém dados do dashboard baseado no usuário e cargo.
+    Os totais vêm dos contadores materializados (uma única leitura).
     """
-    db = SessionLocal()
-    try:
-        # Dados base para todos os usuários
-        total_usuarios = db.query(Usuario).count()
-        total_recursos = db.query(Recurso).count()
-        recursos_criticos = db.query(Recurso).filter(Recurso.quantidade < 10).count()
-        alertas_pendentes = db.query(Alerta). filter(Alerta.status == 'pendente').count()
+    recent_activities = get_recent_activities(db, user_id, user_cargo)
+    contadores = ler_contadores(db, *chaves_dashboard(user_id, user_cargo))
+    return _montar_dashboard(user_id, user_cargo, contadores, recent_activities)
 
-        recent_activities = get_recent_activities(db, user_id, user_cargo)
-        # Dados específicos por cargo
-        if user_cargo == 'admin':
-            alertas_nao_lidos = db.query(Alerta).filter(Alerta.status == 'nao_lido').count()
-            recursos_valor_total = db.query(func.sum(Recurso.quantidade * Recurso.valor_unit)).scalar() or 0
+async def get_dashboard_data_async(db, user_id, user_cargo):
+    """get_dashboard_data sobre uma AsyncSession (modo ASGI): as consultas são aguardadas no driver assíncrono"""
+    recent_activities = await get_recent_activities_async(db, user_id, user_cargo)
+    contadores = await ler_contadores_async(db, *chaves_dashboard(user_id, user_cargo))
+    return _montar_dashboard(user_id, user_cargo, contadores, recent_activities)
 
-            return {
+def _montar_dashboard(user_id, user_cargo, contadores, recent_activities):
+    # Dados específicos por cargo
+    if user_cargo == 'admin':
+        return {
 
-                'stats': {
-                    'total_usuarios': total_usuarios,
-                    'total_recursos': total_recursos,
-                    'recursos_criticos': recursos_criticos,
-                    'alertas_pendentes': alertas_pendentes,
-                    'alertas_nao_lidos': alertas_nao_lidos,
-                    'valor_total_recursos': float(recursos_valor_total)
-                },
-                'recent_activity': recent_activities,
-                'permissions': ['create', 'read', 'update', 'delete']
-            }
-            
-        elif user_cargo == 'gerente':
-            alertas_usuario = db.query(Alerta).filter(
-                (Alerta.usuario_id == user_id) | (Alerta.usuario_id.is_(None))
-            ).filter(Alerta.status == 'pendente').count()
-            
-            recursos_tipos = db.query(Recurso.tipo, func.count(Recurso.id)).group_by(Recurso.tipo).all()
-            total_tipos = len(recursos_tipos)
+            'stats': {
+                'total_usuarios': int(contadores[USUARIOS_TOTAL]),
+                'total_recursos': int(contadores[RECURSOS_TOTAL]),
+                'recursos_criticos': int(contadores[RECURSOS_CRITICOS]),
+                'alertas_pendentes': int(contadores[chave_alertas_status('pendente')]),
+                'alertas_nao_lidos': int(contadores[chave_alertas_status('nao_lido')]),
+                'valor_total_recursos': float(contadores[RECURSOS_VALOR_TOTAL])
+            },
+            'recent_activity': recent_activities,
+            'permissions': ['create', 'read', 'update', 'delete']
+        }
+        
+    elif user_cargo == 'gerente':
+        # Alertas do próprio usuário + alertas gerais
+        pendentes_usuario = chave_alertas_usuario(user_id, 'pendente')
+        pendentes_gerais = chave_alertas_usuario(None, 'pendente')
+        total_tipos = sum(
+            1 for chave, valor in contadores.items()
+            if chave.startswith(PREFIXO_RECURSOS_TIPO) and valor > 0
+        )
 
-            return {
-                'stats': {
-                    'total_recursos': total_recursos,
-                    'recursos_criticos': recursos_criticos,
-                    'alertas_pendentes': alertas_usuario,
-                    'tipos_recursos': total_tipos 
-                },
-                'recent_activity': recent_activities,
-                'permissions': ['create', 'read', 'update']
-            }
-            
-        else:  # usuário comum
-            # Recursos específicos do usuário (simulado)
-            meus_alertas = db.query(Alerta).filter(Alerta.usuario_id == user_id).count()
-            alertas_nao_lidos = db.query(Alerta).filter(
-                Alerta.usuario_id == user_id,
-                Alerta.status == 'nao_lido'
-            ).count()
+        return {
+            'stats': {
+                'total_recursos': int(contadores[RECURSOS_TOTAL]),
+                'recursos_criticos': int(contadores[RECURSOS_CRITICOS]),
+                'alertas_pendentes': int(contadores[pendentes_usuario] + contadores[pendentes_gerais]),
+                'tipos_recursos': total_tipos 
+            },
+            'recent_activity': recent_activities,
+            'permissions': ['create', 'read', 'update']
+        }
+        
+    else:  # usuário comum
+        meus_alertas = chave_alertas_usuario(user_id)
+        nao_lidos = chave_alertas_usuario(user_id, 'nao_lido')
 
-            return {
-                'stats': {
-                    'recursos_disponiveis': total_recursos,
-                    'meus_alertas': meus_alertas,
-                    'alertas_nao_lidos': alertas_nao_lidos,
-                    'recursos_criticos_visiveis': recursos_criticos
-                },
-                'recent_activity': recent_activities,
-                'permissions': ['read']
-            }
-    
-    finally:
-        db.close()
+        return {
+            'stats': {
+                'recursos_disponiveis': int(contadores[RECURSOS_TOTAL]),
+                'meus_alertas': int(contadores[meus_alertas]),
+                'alertas_nao_lidos': int(contadores[nao_lidos]),
+                'recursos_criticos_visiveis': int(contadores[RECURSOS_CRITICOS])
+            },
+            'recent_activity': recent_activities,
+            'permissions': ['read']
+        }
 
-def get_recursos_summary(db, user_id, user_cargo):
+ATIVIDADES_PADRAO = ["Sistema inicializado", "Dados carregados com sucesso"]
+
+def _consultas_atividades(user_id, user_cargo):
     """
-    Obtém resumo dos recursos no sistema
+    (consulta, modelo da frase) das atividades recentes, na ordem em que aparecem,
+    e a consulta de reserva usada quando nenhuma delas encontra nada
     """
-    activities = []
-    
-    try:
-        # Últimos recursos criados (últimos 7 dias)
-        recent_date = datetime.utcnow() - timedelta(days=7)
-        recent_recursos = db.query(Recurso).filter(
-            Recurso.created_at >= recent_date
-        ).order_by(desc(Recurso.created_at)).limit(5).all()
-        
-        for recurso in recent_recursos:
-            activities.append(f"Recurso '{recurso.nome}' foi adicionado ao sistema")
-        
+    # Últimos 7 dias; só as colunas usadas nas frases são lidas
+    recent_date = datetime.utcnow() - timedelta(days=7)
+    consultas = [
+        # Últimos recursos criados
+        (select(Recurso.nome).where(Recurso.created_at >= recent_date)
+         .order_by(desc(Recurso.created_at)).limit(5), "Recurso '{}' foi adicionado ao sistema"),
         # Últimos alertas criados
-        recent_alertas = db.query(Alerta).filter(
-            Alerta.criado_em >= recent_date
-        ).order_by(desc(Alerta.criado_em)).limit(3).all()
-        
-        for alerta in recent_alertas:
-            activities.append(f"Alerta: {alerta.titulo}")
-        
-        # Últimos usuários cadastrados (só admin vê)
-        if user_cargo == 'admin':
-            recent_users = db.query(Usuario).filter(
-                Usuario.created_at >= recent_date
-            ).order_by(desc(Usuario.created_at)).limit(3).all()
-            
-            for user in recent_users:
-                activities.append(f"Novo usuário '{user.name}' cadastrado")
-        
-        # Se não há atividades recentes, adiciona atividade do próprio usuário
-        if not activities:
-            current_user = db.query(Usuario).filter(Usuario.id == user_id).first()
-            if current_user:
-                activities.append(f"Login realizado por {current_user.name}")
-        
-        return activities[:10]  # Máximo 10 atividades
-        
-    except Exception as e:
-        print(f"Erro ao buscar atividades: {e}")
-        return ["Sistema inicializado", "Dados carregados com sucesso"]
-    
+        (select(Alerta.titulo).where(Alerta.criado_em >= recent_date)
+         .order_by(desc(Alerta.criado_em)).limit(3), "Alerta: {}"),
+    ]
+    # Últimos usuários cadastrados (só admin vê)
+    if user_cargo == 'admin':
+        consultas.append((
+            select(Usuario.name).where(Usuario.created_at >= recent_date)
+            .order_by(desc(Usuario.created_at)).limit(3), "Novo usuário '{}' cadastrado"
+        ))
+    # Se não há atividades recentes, adiciona atividade do próprio usuário
+    reserva = (select(Usuario.name).where(Usuario.id == user_id), "Login realizado por {}")
+    return consultas, reserva
+
 def get_recent_activities(db, user_id, user_cargo):
     """
     Busca atividades recentes baseadas em dados reais do banco
     """
-    activities = []
-    
     try:
-        # Últimos recursos criados (últimos 7 dias)
-        recent_date = datetime.utcnow() - timedelta(days=7)
-        recent_recursos = db.query(Recurso).filter(
-            Recurso.created_at >= recent_date
-        ).order_by(desc(Recurso.created_at)).limit(5).all()
-        
-        for recurso in recent_recursos:
-            activities.append(f"Recurso '{recurso.nome}' foi adicionado ao sistema")
-        
-        # Últimos alertas criados
-        recent_alertas = db.query(Alerta).filter(
-            Alerta.criado_em >= recent_date
-        ).order_by(desc(Alerta.criado_em)).limit(3).all()
-        
-        for alerta in recent_alertas:
-            activities.append(f"Alerta: {alerta.titulo}")
-        
-        # Últimos usuários cadastrados (só admin vê)
-        if user_cargo == 'admin':
-            recent_users = db.query(Usuario).filter(
-                Usuario.created_at >= recent_date
-            ).order_by(desc(Usuario.created_at)).limit(3).all()
-            
-            for user in recent_users:
-                activities.append(f"Novo usuário '{user.name}' cadastrado")
-        
-        # Se não há atividades recentes, adiciona atividade do próprio usuário
+        consultas, (reserva, modelo_reserva) = _consultas_atividades(user_id, user_cargo)
+        activities = []
+        for consulta, modelo in consultas:
+            activities += [modelo.format(valor) for valor in db.execute(consulta).scalars()]
         if not activities:
-            current_user = db.query(Usuario).filter(Usuario.id == user_id).first()
-            if current_user:
-                activities.append(f"Login realizado por {current_user.name}")
-        
+            activities += [modelo_reserva.format(valor) for valor in db.execute(reserva).scalars()]
         return activities[:10]  # Máximo 10 atividades
         
-    except Exception as e:
-        print(f"Erro ao buscar atividades: {e}")
-        return ["Sistema inicializado", "Dados carregados com sucesso"]
+    except Exception:
+        logger.exception("Erro ao buscar atividades do usuário %s", user_id)
+        contar_erro("atividades_recentes")
+        return list(ATIVIDADES_PADRAO)
 
+async def get_recent_activities_async(db, user_id, user_cargo):
+    try:
+        consultas, (reserva, modelo_reserva) = _consultas_atividades(user_id, user_cargo)
+        activities = []
+        for consulta, modelo in consultas:
+            activities += [modelo.format(valor) for valor in (await db.execute(consulta)).scalars()]
+        if not activities:
+            activities += [modelo_reserva.format(valor) for valor in (await db.execute(reserva)).scalars()]
+        return activities[:10]
 
-def get_recursos_summary():
+    except Exception:
+        logger.exception("Erro ao buscar atividades do usuário %s", user_id)
+        contar_erro("atividades_recentes")
+        return list(ATIVIDADES_PADRAO)
+
+
+def get_recursos_summary(db):
     """
     Obtém resumo dos recursos no sistema - DADOS REAIS
     """
-    db = SessionLocal()
-    try:
-        recursos = db.query(Recurso).all()
-        
-        summary = {
-            'total': len(recursos),
-            'por_tipo': {},
-            'criticos': 0,
-            'valor_total': 0,
-            'recursos_recentes': []
-        }
-        
-        for recurso in recursos:
-            # Contar por tipo
-            if recurso.tipo in summary['por_tipo']:
-                summary['por_tipo'][recurso.tipo] += 1
-            else:
-                summary['por_tipo'][recurso.tipo] = 1
-            
-            # Contar críticos (quantidade baixa)
-            if recurso.quantidade < 10:
-                summary['criticos'] += 1
-            
-            # Somar valor total
-            summary['valor_total'] += recurso.quantidade * recurso.valor_unit
-        
-        # Recursos mais recentes
-        recursos_recentes = db.query(Recurso).order_by(
-            desc(Recurso.created_at)
-        ).limit(5).all()
-        
-        for recurso in recursos_recentes:
-            summary['recursos_recentes'].append({
-                'id': recurso.id,
-                'nome': recurso.nome,
-                'tipo': recurso.tipo,
-                'quantidade': recurso.quantidade,
-                'created_at': recurso.created_at.isoformat() if recurso.created_at else None
-            })
-        
-        return summary
+    resumo = agregar_recursos(db)
+    
+    summary = {
+        'total': resumo['total'],
+        'por_tipo': resumo['por_tipo'],
+        'criticos': resumo['abaixo_do_minimo'],
+        'valor_total': resumo['valor_total'],
+        'recursos_recentes': []
+    }
+    
+    # Recursos mais recentes
+    recursos_recentes = db.query(Recurso).order_by(
+        desc(Recurso.created_at)
+    ).limit(5).all()
+    
+    for recurso in recursos_recentes:
+        summary['recursos_recentes'].append({
+            'id': recurso.id,
+            'nome': recurso.nome,
+            'tipo': recurso.tipo,
+            'quantidade': recurso.quantidade,
+            'created_at': recurso.created_at
+        })
     
-    finally:
-        db.close()
+    return summary
+
+def _filtrar_alertas(filtros):
+    """Condições de ?status=, ?prioridade= e ?recurso_id=; lança ValueError para valores inválidos"""
+    condicoes = []
+    for campo in ('status', 'prioridade'):
+        valor = filtros.get(campo)
+        if not valor:
+            continue
+        coluna = getattr(Alerta, campo)
+        if valor not in coluna.type.enums:
+            raise ValueError(f"{campo.capitalize()} inválido. Use: {', '.join(coluna.type.enums)}")
+        condicoes.append(coluna == valor)
+    recurso_id = filtros.get('recurso_id')
+    if recurso_id not in (None, ''):
+        try:
+            recurso_id = int(recurso_id)
+        except (TypeError, ValueError):
+            raise ValueError("recurso_id deve ser um número inteiro") from None
+        condicoes.append(Alerta.recurso_id == recurso_id)
+    return condicoes
+
+def _consulta_alertas(user_id, user_cargo, filtros, cursor, limite):
+    """SELECT de uma página do feed (com uma linha a mais para saber se há próxima) e o limite validado"""
+    condicoes = _filtrar_alertas(filtros or {})
+
+    if limite is None:
+        limite = ALERTAS_LIMITE_ADMIN if user_cargo == 'admin' else ALERTAS_LIMITE_USUARIO
+    limite = int(limite)
+    if limite < 1:
+        raise ValueError("Limite deve ser maior que zero")
+    limite = min(limite, PAGINACAO_LIMITE_MAXIMO)
+
+    # Comparada como texto para que o valor guardado no cursor seja exatamente o do banco
+    criado_em_texto = type_coerce(Alerta.criado_em, String)
+    if cursor:
+        estado = decodificar_cursor(cursor)
+        if "v" not in estado or "id" not in estado:
+            raise ValueError("Cursor inválido")
+        condicoes.append(tuple_(criado_em_texto, Alerta.id) < tuple_(estado["v"], estado["id"]))
 
-def get_alertas_by_user(user_id, user_cargo):
+    if user_cargo == 'admin':
+        escopos = [None]
+    else:
+        escopos = [Alerta.usuario_id == user_id, Alerta.usuario_id.is_(None)]
+
+    ramos = []
+    for escopo in escopos:
+        ramo = select(
+            Alerta.id, Alerta.titulo, Alerta.descricao, Alerta.status, Alerta.prioridade,
+            Alerta.criado_em, criado_em_texto.label('chave_cursor'), Alerta.recurso_id
+        ).where(*condicoes)
+        if escopo is not None:
+            ramo = ramo.where(escopo)
+        ramos.append(select(
+            ramo.order_by(Alerta.criado_em.desc(), Alerta.id.desc()).limit(limite + 1).subquery()
+        ))
+
+    pagina = (union_all(*ramos) if len(ramos) > 1 else ramos[0]).subquery()
+    consulta = (
+        select(pagina, Recurso.nome.label('recurso_nome'))
+        .outerjoin(Recurso, Recurso.id == pagina.c.recurso_id)
+        .order_by(pagina.c.criado_em.desc(), pagina.c.id.desc())
+        .limit(limite + 1)
+    )
+    return consulta, limite
+
+def _pagina_alertas(linhas, limite):
+    next_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        next_cursor = codificar_cursor({"v": linhas[-1].chave_cursor, "id": linhas[-1].id})
+
+    alertas_list = [{
+        'id': linha.id,
+        'titulo': linha.titulo,
+        'descricao': linha.descricao,
+        'status': linha.status,
+        'prioridade': linha.prioridade,
+        'criado_em': linha.criado_em,
+        'recurso_relacionado': linha.recurso_nome
+    } for linha in linhas]
+
+    return alertas_list, next_cursor
+
+def get_alertas_by_user(db, user_id, user_cargo, filtros=None, cursor=None, limite=None):
     """
-    Obtém alertas específicos do usuário baseado em dados reais
+    Alertas visíveis ao usuário, do mais recente ao mais antigo, com paginação
+    keyset sobre (criado_em, id) e filtros por status, prioridade e recurso_id.
+
+    Uma única consulta por página: o nome do recurso vem de um LEFT JOIN feito
+    depois do LIMIT. Para quem não é admin, os alertas do usuário e os gerais
+    são dois ramos UNION ALL, cada um ordenado e limitado pelo seu índice, no
+    lugar de um OR que obrigaria a ordenar todos os alertas visíveis.
+    Retorna (itens, next_cursor). Lança ValueError para parâmetros ou cursor inválidos.
     """
-    db = SessionLocal()
-    try:
-        if user_cargo == 'admin':
-            # Admin vê todos os alertas
-            alertas = db.query(Alerta).order_by(
-                desc(Alerta.criado_em)
-            ).limit(20).all()
-        else:
-            # Outros usuários veem seus alertas + alertas gerais
-            alertas = db.query(Alerta).filter(
-                (Alerta.usuario_id == user_id) | (Alerta.usuario_id.is_(None))
-            ).order_by(desc(Alerta.criado_em)).limit(10).all()
-        
-        alertas_list = []
-        for alerta in alertas:
-            alertas_list.append({
-                'id': alerta.id,
-                'titulo': alerta.titulo,
-                'descricao': alerta.descricao,
-                'status': alerta.status,
-                'prioridade': alerta.prioridade,
-                'criado_em': alerta.criado_em.isoformat() if alerta.criado_em else None,
-                'recurso_relacionado': alerta.recurso.nome if alerta.recurso else None
-            })
-        
-        return alertas_list
-    
-    finally:
-        db.close()
+    consulta, limite = _consulta_alertas(user_id, user_cargo, filtros, cursor, limite)
+    return _pagina_alertas(db.execute(consulta).all(), limite)
+
+async def get_alertas_by_user_async(db, user_id, user_cargo, filtros=None, cursor=None, limite=None):
+    """get_alertas_by_user sobre uma AsyncSession (modo ASGI)"""
+    consulta, limite = _consulta_alertas(user_id, user_cargo, filtros, cursor, limite)
+    return _pagina_alertas((await db.execute(consulta)).all(), limite)
+
+async def get_recursos_summary_async(db):
+    # Adaptador: o resumo roda inteiro em db.run_sync (ver "Modo ASGI" no README)
+    return await db.run_sync(get_recursos_summary)
 
 def create_automatic_alerts(db):
     """
-    Cria alertas automáticos baseados em condições dos recursos
+    Cria alertas automáticos baseados em condições dos recursos.
+
+    Delegado ao motor de regras: um INSERT ... SELECT com anti-join por regra
+    cria os alertas pendentes que faltam, sem laço por recurso.
+    Retorna o número de alertas criados ou None em caso de erro.
     """
     try:
-        # Verifica recursos com estoque baixo
-        recursos_baixo_estoque = db.query(Recurso).filter(Recurso.quantidade < 10).all()
-        
-        for recurso in recursos_baixo_estoque:
-            # Verifica se já existe alerta para este recurso
-            alerta_existente = db.query(Alerta).filter(
-                Alerta.recurso_id == recurso.id,
-                Alerta.status == 'pendente'
-            ).first()
-            
-            if not alerta_existente:
-                novo_alerta = Alerta(
-                    titulo=f"Estoque baixo: {recurso.nome}",
-                    descricao=f"O recurso '{recurso.nome}' está com apenas {recurso.quantidade} unidades em estoque.",
-                    prioridade='alta' if recurso.quantidade < 5 else 'media',
-                    recurso_id=recurso.id,
-                    status='pendente'
-                )
-                db.add(novo_alerta)
-        
+        criados = sincronizar_alertas(db)
         db.commit()
-        return True
+        return criados
         
-    except Exception as e:
+    except Exception:
         db.rollback()
-        print(f"Erro ao criar alertas automáticos: {e}")
-        return False
+        logger.exception("Erro ao criar alertas automáticos")
+        contar_erro("alertas_automaticos")
+        return None
@@ -0,0 +1,212 @@
+# backend/app/services/estoque_service.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, inspect, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.config import HISTORICO_MAX_HORAS, HISTORICO_PERIODO_PADRAO
+from app.database import SessionLocal, usuario_atual
+from app.models import MovimentoEstoque, MovimentoPorDia, MovimentoPorHora, Recurso
+
+GRANULARIDADES = ("hora", "dia")
+
+# Até este intervalo o histórico é devolvido por hora quando a granularidade não é informada
+_HISTORICO_POR_HORA_ATE = timedelta(days=2)
+
+
+def _inicio_hora(momento):
+    return momento.replace(minute=0, second=0, microsecond=0)
+
+def _inicio_dia(momento):
+    return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def definir_motivo(db, motivo):
+    """Motivo das movimentações gravadas por esta sessão (ex.: informado pelo usuário na edição)"""
+    if motivo:
+        db.info["motivo_movimento"] = str(motivo).strip()[:100]
+
+def motivo_movimento(db, padrao):
+    return db.info.get("motivo_movimento") or padrao
+
+
+def registrar_movimentos(db, movimentos):
+    """
+    Grava movimentações [(recurso_id, delta, quantidade_resultante, motivo)] no
+    livro e soma cada uma aos agregados da hora e do dia corrente, tudo na
+    transação da sessão. Cada tabela recebe uma única instrução em lote.
+    """
+    movimentos = [movimento for movimento in movimentos if movimento[1]]
+    if not movimentos:
+        return
+
+    agora = datetime.utcnow()
+    usuario_id = usuario_atual()
+    conexao = db.connection()
+
+    conexao.execute(insert(MovimentoEstoque.__table__), [
+        {
+            "recurso_id": recurso_id,
+            "delta": delta,
+            "quantidade": quantidade,
+            "usuario_id": usuario_id,
+            "motivo": motivo,
+            "criado_em": agora
+        }
+        for recurso_id, delta, quantidade, motivo in movimentos
+    ])
+
+    dialeto = postgresql if conexao.dialect.name == "postgresql" else sqlite
+    for modelo, periodo in ((MovimentoPorHora, _inicio_hora(agora)), (MovimentoPorDia, _inicio_dia(agora))):
+        agregados = {}
+        for recurso_id, delta, quantidade, _ in movimentos:
+            linha = agregados.setdefault(recurso_id, {
+                "recurso_id": recurso_id, "periodo": periodo, "entradas": 0, "saidas": 0, "movimentos": 0
+            })
+            linha["entradas"] += max(delta, 0)
+            linha["saidas"] += max(-delta, 0)
+            linha["movimentos"] += 1
+            linha["saldo_final"] = quantidade
+
+        tabela = modelo.__table__
+        instrucao = dialeto.insert(tabela)
+        instrucao = instrucao.on_conflict_do_update(
+            index_elements=[tabela.c.recurso_id, tabela.c.periodo],
+            set_={
+                "entradas": tabela.c.entradas + instrucao.excluded.entradas,
+                "saidas": tabela.c.saidas + instrucao.excluded.saidas,
+                "movimentos": tabela.c.movimentos + instrucao.excluded.movimentos,
+                # A linha do recurso fica travada até o commit: a última escrita tem o saldo mais recente
+                "saldo_final": instrucao.excluded.saldo_final
+            }
+        )
+        conexao.execute(instrucao, list(agregados.values()))
+
+
+def _quantidade_anterior(obj):
+    historico = inspect(obj).attrs.quantidade.history
+    if historico.deleted:
+        return historico.deleted[0]
+    return obj.quantidade
+
+def _registrar_movimentos_no_flush(session, flush_context):
+    """Movimentações dos recursos criados, editados e removidos pelo ORM"""
+    movimentos = []
+
+    for obj in session.new:
+        if isinstance(obj, Recurso):
+            movimentos.append((obj.id, obj.quantidade, obj.quantidade, motivo_movimento(session, "criacao")))
+
+    for obj in session.dirty:
+        if isinstance(obj, Recurso) and inspect(obj).attrs.quantidade.history.has_changes():
+            delta = obj.quantidade - _quantidade_anterior(obj)
+            movimentos.append((obj.id, delta, obj.quantidade, motivo_movimento(session, "edicao")))
+
+    for obj in session.deleted:
+        if isinstance(obj, Recurso):
+            movimentos.append((obj.id, -_quantidade_anterior(obj), 0, motivo_movimento(session, "remocao")))
+
+    registrar_movimentos(session, movimentos)
+
+if not event.contains(SessionLocal, "after_flush", _registrar_movimentos_no_flush):
+    event.listen(SessionLocal, "after_flush", _registrar_movimentos_no_flush)
+
+
+def _ler_data(valor, nome):
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    try:
+        data = datetime.fromisoformat(str(valor))
+    except ValueError:
+        raise ValueError(f"'{nome}' deve ser uma data ISO 8601")
+    # Os agregados guardam UTC sem fuso
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+def _agregados(db, modelo, recurso_id, inicio, fim):
+    if inicio >= fim:
+        return []
+    return db.execute(
+        select(modelo.periodo, modelo.entradas, modelo.saidas, modelo.movimentos, modelo.saldo_final)
+        .where(modelo.recurso_id == recurso_id, modelo.periodo >= inicio, modelo.periodo < fim)
+        .order_by(modelo.periodo)
+    ).all()
+
+def obter_historico(db, recurso_id, inicio=None, fim=None, granularidade=None):
+    """
+    Entradas, saídas e saldo de um recurso no intervalo [inicio, fim), lidos só
+    dos agregados: os dias inteiros vêm do agregado diário e as bordas do
+    agregado por hora, então a resolução mínima é a hora. Períodos sem
+    movimentação não aparecem na série. Lança ValueError para parâmetros inválidos.
+    """
+    fim = _ler_data(fim, "fim") or datetime.utcnow()
+    inicio = _ler_data(inicio, "inicio") or fim - timedelta(days=HISTORICO_PERIODO_PADRAO)
+
+    inicio = _inicio_hora(inicio)
+    if fim != _inicio_hora(fim):
+        fim = _inicio_hora(fim) + timedelta(hours=1)
+    if inicio >= fim:
+        raise ValueError("'inicio' deve ser anterior a 'fim'")
+
+    if granularidade is None:
+        granularidade = "hora" if fim - inicio <= _HISTORICO_POR_HORA_ATE else "dia"
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida. Use: {', '.join(GRANULARIDADES)}")
+    if granularidade == "hora" and fim - inicio > timedelta(hours=HISTORICO_MAX_HORAS):
+        raise ValueError(f"Histórico por hora limitado a {HISTORICO_MAX_HORAS} horas; use granularidade=dia")
+
+    primeiro_dia = _inicio_dia(inicio)
+    if primeiro_dia < inicio:
+        primeiro_dia += timedelta(days=1)
+    ultimo_dia = max(_inicio_dia(fim), primeiro_dia)
+
+    if granularidade == "hora" or primeiro_dia >= ultimo_dia:
+        linhas = _agregados(db, MovimentoPorHora, recurso_id, inicio, fim)
+    else:
+        linhas = (
+            _agregados(db, MovimentoPorHora, recurso_id, inicio, primeiro_dia)
+            + _agregados(db, MovimentoPorDia, recurso_id, primeiro_dia, ultimo_dia)
+            + _agregados(db, MovimentoPorHora, recurso_id, ultimo_dia, fim)
+        )
+
+    anterior = db.execute(
+        select(MovimentoPorHora.saldo_final)
+        .where(MovimentoPorHora.recurso_id == recurso_id, MovimentoPorHora.periodo < inicio)
+        .order_by(MovimentoPorHora.periodo.desc())
+        .limit(1)
+    ).scalar()
+    saldo_inicial = anterior or 0
+
+    serie = []
+    for periodo, entradas, saidas, movimentos, saldo_final in linhas:
+        if granularidade == "dia":
+            # Horas das bordas entram no ponto do seu dia
+            periodo = _inicio_dia(periodo)
+        if serie and serie[-1]["periodo"] == periodo:
+            ponto = serie[-1]
+            ponto["entradas"] += entradas
+            ponto["saidas"] += saidas
+            ponto["movimentos"] += movimentos
+            ponto["saldo_final"] = saldo_final
+        else:
+            serie.append({
+                "periodo": periodo,
+                "entradas": entradas,
+                "saidas": saidas,
+                "movimentos": movimentos,
+                "saldo_final": saldo_final
+            })
+
+    return {
+        "recurso_id": recurso_id,
+        "granularidade": granularidade,
+        "inicio": inicio,
+        "fim": fim,
+        "saldo_inicial": saldo_inicial,
+        "saldo_final": serie[-1]["saldo_final"] if serie else saldo_inicial,
+        "entradas": sum(ponto["entradas"] for ponto in serie),
+        "saidas": sum(ponto["saidas"] for ponto in serie),
+        "movimentos": sum(ponto["movimentos"] for ponto in serie),
+        "serie": serie
+    }
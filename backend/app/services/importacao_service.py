@@ -0,0 +1,241 @@
+# backend/app/services/importacao_service.py
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+
+from sqlalchemy import insert, select, update
+
+from app.cache import invalidar_inventario
+from app.config import IMPORTACAO_LOTE, IMPORTACAO_MAX_ERROS, EXPORTACAO_LOTE
+from app.metricas import contar_erro
+from app.models import Recurso
+from app.services.contadores_service import contribuicao_recurso, incrementar, marcar_modificacao, somar_contribuicao
+from app.services.estoque_service import motivo_movimento, registrar_movimentos
+from app.services.regras_alerta import sincronizar_alertas
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CAMPOS_EXPORTACAO = ("id", "nome", "tipo", "quantidade", "valor_unit", "created_at", "updated_at")
+
+
+def detectar_formato(formato=None, content_type=None):
+    """Formato pelo parâmetro ?formato= ou pelo Content-Type; ValueError se não suportado"""
+    if formato:
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido. Use: {', '.join(FORMATOS)}")
+        return formato
+
+    for nome, tipo in FORMATOS.items():
+        if content_type == tipo:
+            return nome
+    if content_type == "application/json-lines":
+        return "ndjson"
+    raise ValueError("Envie o corpo como text/csv ou application/x-ndjson")
+
+
+def ler_linhas(fluxo, formato):
+    """
+    Lê o corpo aos poucos, sem carregá-lo inteiro na memória.
+    Gera (numero_da_linha, dados, erro); dados é None quando a linha não pôde ser lida.
+    """
+    if not isinstance(fluxo, io.BufferedIOBase):
+        fluxo = io.BufferedReader(fluxo)
+    texto = io.TextIOWrapper(fluxo, encoding="utf-8-sig", newline="")
+
+    if formato == "csv":
+        leitor = csv.DictReader(texto)
+        for dados in leitor:
+            yield leitor.line_num, dados, None
+        return
+
+    for numero, linha in enumerate(texto, start=1):
+        if not linha.strip():
+            continue
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            yield numero, None, "JSON inválido"
+            continue
+        if not isinstance(dados, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, dados, None
+
+
+def validar_linha(dados):
+    """Aplica as mesmas regras do POST /api/recurso/; lança ValueError com a mensagem"""
+    faltando = [campo for campo in ("nome", "tipo", "quantidade", "valor_unit") if dados.get(campo) in (None, "")]
+    if faltando:
+        raise ValueError(f"Campos obrigatórios: {', '.join(faltando)}")
+
+    nome = str(dados["nome"]).strip()
+    tipo = str(dados["tipo"]).strip()
+    if not nome:
+        raise ValueError("Nome do recurso não pode estar vazio")
+    if not tipo:
+        raise ValueError("Tipo do recurso não pode estar vazio")
+
+    try:
+        quantidade = int(dados["quantidade"])
+        valor_unit = float(dados["valor_unit"])
+    except (TypeError, ValueError):
+        raise ValueError("Quantidade e valor unitário devem ser numéricos")
+
+    if quantidade < 0:
+        raise ValueError("Quantidade não pode ser negativa")
+    if valor_unit <= 0:
+        raise ValueError("Valor unitário deve ser maior que zero")
+
+    return {"nome": nome, "tipo": tipo, "quantidade": quantidade, "valor_unit": valor_unit}
+
+
+def _registrar_erro(relatorio, linha, mensagem):
+    relatorio["rejeitados"] += 1
+    if len(relatorio["erros"]) < IMPORTACAO_MAX_ERROS:
+        relatorio["erros"].append({"linha": linha, "erro": mensagem})
+    else:
+        relatorio["erros_omitidos"] += 1
+
+
+def _gravar_lote(db, lote, relatorio):
+    """
+    Upsert pelo nome em uma transação: uma consulta IN para achar os existentes,
+    um INSERT e um UPDATE executados em lote (executemany).
+    """
+    existentes = {}
+    consulta = select(Recurso.id, Recurso.nome, Recurso.tipo, Recurso.quantidade, Recurso.valor_unit).where(
+        Recurso.nome.in_(list(lote))
+    ).order_by(Recurso.id)
+    for recurso in db.execute(consulta):
+        # Com nomes repetidos no banco, o mais antigo é o atualizado
+        existentes.setdefault(recurso.nome, recurso)
+
+    novos = []
+    alterados = []
+    deltas = defaultdict(float)
+    motivo = motivo_movimento(db, "importacao")
+    movimentos = []
+
+    for nome, (_, valores) in lote.items():
+        atual = existentes.get(nome)
+        if atual is None:
+            novos.append(valores)
+        else:
+            alterados.append({"id": atual.id, **valores})
+            somar_contribuicao(deltas, contribuicao_recurso(atual.tipo, atual.quantidade, atual.valor_unit), -1)
+            movimentos.append((atual.id, valores["quantidade"] - atual.quantidade, valores["quantidade"], motivo))
+        somar_contribuicao(deltas, contribuicao_recurso(valores["tipo"], valores["quantidade"], valores["valor_unit"]), 1)
+
+    try:
+        if novos:
+            db.execute(insert(Recurso), novos)
+            # O INSERT em lote não devolve os ids; os nomes dos novos não existiam antes do lote
+            com_estoque = {valores["nome"]: valores["quantidade"] for valores in novos if valores["quantidade"]}
+            if com_estoque:
+                criados = db.execute(select(Recurso.id, Recurso.nome).where(Recurso.nome.in_(list(com_estoque))))
+                movimentos += [(recurso_id, com_estoque[nome], com_estoque[nome], motivo) for recurso_id, nome in criados]
+        if alterados:
+            db.execute(update(Recurso), alterados)
+        # Instruções em lote não passam pelo flush; contadores e livro de estoque são ajustados aqui
+        incrementar(db, deltas)
+        marcar_modificacao(db.connection(), ["recursos"])
+        registrar_movimentos(db, movimentos)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # O detalhe (SQL, restrições, caminhos) fica no log; o relatório volta ao cliente
+        primeira = min(linha for linha, _ in lote.values())
+        logger.exception("Erro ao gravar o lote de importação iniciado na linha %s", primeira)
+        contar_erro("importacao_lote")
+        for linha, _ in lote.values():
+            _registrar_erro(relatorio, linha, "Erro ao gravar o lote desta linha; nenhuma linha do lote foi gravada")
+        return
+
+    # A cada lote gravado: se a importação parar depois, o cache não fica com o estoque anterior
+    invalidar_inventario()
+    relatorio["inseridos"] += len(novos)
+    relatorio["atualizados"] += len(alterados)
+
+
+def importar_recursos(db, fluxo, formato):
+    """
+    Importa recursos de um corpo CSV ou NDJSON, validando linha a linha e
+    gravando em lotes de IMPORTACAO_LOTE. Nomes já existentes são atualizados;
+    dentro do mesmo lote vale a última ocorrência do nome.
+    Retorna o relatório com totais e os erros por linha.
+    """
+    relatorio = {
+        "inseridos": 0,
+        "atualizados": 0,
+        "rejeitados": 0,
+        "erros": [],
+        "erros_omitidos": 0
+    }
+    lote = {}
+
+    for linha, dados, erro in ler_linhas(fluxo, formato):
+        if erro is None:
+            try:
+                valores = validar_linha(dados)
+            except ValueError as e:
+                erro = str(e)
+        if erro is not None:
+            _registrar_erro(relatorio, linha, erro)
+            continue
+
+        lote.pop(valores["nome"], None)
+        lote[valores["nome"]] = (linha, valores)
+        if len(lote) >= IMPORTACAO_LOTE:
+            _gravar_lote(db, lote, relatorio)
+            lote = {}
+
+    if lote:
+        _gravar_lote(db, lote, relatorio)
+
+    if relatorio["inseridos"] or relatorio["atualizados"]:
+        # Uma única varredura set-based cria ou resolve os alertas dos importados
+        sincronizar_alertas(db)
+        db.commit()
+
+    return relatorio
+
+
+def _formatar(valor):
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+def exportar_recursos(db, formato, tipo=None):
+    """
+    Gera o inventário em blocos de texto com memória constante: as linhas são
+    lidas do cursor em lotes de EXPORTACAO_LOTE (yield_per), sem montar objetos ORM.
+    """
+    query = db.query(*[getattr(Recurso, campo) for campo in CAMPOS_EXPORTACAO]).order_by(Recurso.id)
+    if tipo:
+        query = query.filter(Recurso.tipo == tipo)
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer) if formato == "csv" else None
+    if escritor:
+        escritor.writerow(CAMPOS_EXPORTACAO)
+
+    for numero, linha in enumerate(query.yield_per(EXPORTACAO_LOTE), start=1):
+        valores = [_formatar(valor) for valor in linha]
+        if escritor:
+            escritor.writerow(valores)
+        else:
+            buffer.write(json.dumps(dict(zip(CAMPOS_EXPORTACAO, valores)), ensure_ascii=False))
+            buffer.write("\n")
+
+        if numero % EXPORTACAO_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
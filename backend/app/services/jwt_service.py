@@ -1,5 +1,5 @@
 from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, get_jwt_identity
-from app import blacklisted_tokens
+from app.revogacao import tokens_revogados
 
 def create_tokens(user_id, user_data):
     additional_claims = {
@@ -8,12 +8,13 @@ def create_tokens(user_id, user_data):
         'cargo': user_data['cargo']
     }
 
+    # O "sub" do JWT precisa ser texto; get_current_user_from_token devolve o id como int
     access_token = create_access_token(
-        identity=user_id,
+        identity=str(user_id),
         additional_claims=additional_claims
     )
 
-    refresh_token = create_refresh_token(identity=user_id)
+    refresh_token = create_refresh_token(identity=str(user_id))
 
     return {
         'access_token': access_token,
@@ -21,13 +22,13 @@ def create_tokens(user_id, user_data):
     }
 
 def revoke_token():
-    jti = get_jwt()['jti']
-    blacklisted_tokens.add(jti)
+    claims = get_jwt()
+    tokens_revogados.revogar(claims['jti'], claims['exp'])
     return True
 
 def get_current_user_from_token():
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         claims = get_jwt()
 
         return {
@@ -0,0 +1,262 @@
+# backend/app/services/operacoes_service.py
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, select, update
+
+from app.cache import invalidar_inventario
+from app.config import LOTE_MAX_OPERACOES
+from app.models import Recurso
+from app.services.contadores_service import contribuicao_recurso, incrementar, marcar_modificacao, somar_contribuicao
+from app.services.estoque_service import motivo_movimento, registrar_movimentos
+from app.services.importacao_service import validar_linha
+from app.services.regras_alerta import avaliar_recursos, resolver_alertas_de_removidos
+
+OPERACOES = ("criar", "atualizar", "remover", "ajustar")
+
+_recursos = Recurso.__table__
+
+# Soma relativa feita pelo banco: não perde atualizações concorrentes
+AJUSTAR_QUANTIDADE = (
+    update(_recursos)
+    .where(_recursos.c.id == bindparam("b_id"))
+    .values(quantidade=_recursos.c.quantidade + bindparam("b_delta"), updated_at=func.now())
+)
+
+
+# Marca, na validação, nomes reservados por recursos criados no próprio lote
+_NOVO = object()
+
+
+class OperacoesRejeitadas(Exception):
+    """Alguma operação do lote é inválida; nenhuma foi aplicada"""
+
+    def __init__(self, mensagem, resultados, status=400):
+        super().__init__(mensagem)
+        self.resultados = resultados
+        self.status = status
+
+
+def _validar_atualizacao(dados):
+    valores = {}
+
+    if "nome" in dados:
+        valores["nome"] = str(dados["nome"] or "").strip()
+        if not valores["nome"]:
+            raise ValueError("Nome não pode estar vazio")
+    if "tipo" in dados:
+        valores["tipo"] = str(dados["tipo"] or "").strip()
+        if not valores["tipo"]:
+            raise ValueError("Tipo não pode estar vazio")
+    try:
+        if "quantidade" in dados:
+            valores["quantidade"] = int(dados["quantidade"])
+        if "valor_unit" in dados:
+            valores["valor_unit"] = float(dados["valor_unit"])
+    except (TypeError, ValueError):
+        raise ValueError("Quantidade e valor unitário devem ser numéricos")
+
+    if valores.get("quantidade", 0) < 0:
+        raise ValueError("Quantidade não pode ser negativa")
+    if valores.get("valor_unit", 1) <= 0:
+        raise ValueError("Valor unitário deve ser maior que zero")
+    if not valores:
+        raise ValueError("Nenhum campo para atualizar")
+    return valores
+
+
+def _normalizar(operacao, user_role):
+    """Valida a estrutura de uma operação e devolve (op, id, valores); lança ValueError"""
+    if not isinstance(operacao, dict):
+        raise ValueError("Operação deve ser um objeto")
+
+    op = operacao.get("op")
+    if op not in OPERACOES:
+        raise ValueError(f"Operação inválida. Use: {', '.join(OPERACOES)}")
+    if op == "remover" and user_role != "admin":
+        raise PermissionError("Permissão negada. Apenas admin pode deletar recursos.")
+
+    if op == "criar":
+        return op, None, validar_linha(operacao.get("dados") or {})
+
+    try:
+        recurso_id = int(operacao.get("id"))
+    except (TypeError, ValueError):
+        raise ValueError("Informe o id do recurso")
+
+    if op == "atualizar":
+        return op, recurso_id, _validar_atualizacao(operacao.get("dados") or {})
+    if op == "ajustar":
+        delta = operacao.get("delta")
+        if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+            raise ValueError("delta deve ser um inteiro diferente de zero")
+        return op, recurso_id, delta
+    return op, recurso_id, None
+
+
+def _validar_lote(db, operacoes, user_role):
+    """
+    Valida todas as operações antes de aplicar qualquer uma, com uma consulta
+    para os ids referenciados e outra para os nomes usados.
+    """
+    resultados = [{"indice": indice, "success": True} for indice in range(len(operacoes))]
+    normalizadas = []
+    status = 400
+
+    for indice, operacao in enumerate(operacoes):
+        try:
+            normalizadas.append(_normalizar(operacao, user_role))
+            resultados[indice]["op"] = normalizadas[-1][0]
+        except PermissionError as e:
+            normalizadas.append(None)
+            resultados[indice].update(success=False, erro=str(e))
+            status = 403
+        except ValueError as e:
+            normalizadas.append(None)
+            resultados[indice].update(success=False, erro=str(e))
+
+    ids = {item[1] for item in normalizadas if item and item[1] is not None}
+    recursos = {recurso.id: recurso for recurso in db.query(Recurso).filter(Recurso.id.in_(ids))} if ids else {}
+
+    nomes = {item[2]["nome"] for item in normalizadas if item and item[0] in ("criar", "atualizar") and "nome" in item[2]}
+    ocupados = dict(db.query(Recurso.nome, Recurso.id).filter(Recurso.nome.in_(nomes))) if nomes else {}
+    for recurso in recursos.values():
+        ocupados.setdefault(recurso.nome, recurso.id)
+
+    removidos = set()
+    for indice, item in enumerate(normalizadas):
+        if item is None:
+            continue
+        op, recurso_id, valores = item
+
+        erro = None
+        if recurso_id is not None and (recurso_id not in recursos or recurso_id in removidos):
+            erro = "Recurso não encontrado"
+        elif op in ("criar", "atualizar") and "nome" in valores:
+            dono = ocupados.get(valores["nome"])
+            if dono is not None and dono != recurso_id:
+                erro = f"Recurso com nome '{valores['nome']}' já existe"
+
+        if erro:
+            resultados[indice].update(success=False, erro=erro)
+            continue
+
+        # Simula o efeito nos nomes para validar as operações seguintes
+        if op == "criar":
+            ocupados[valores["nome"]] = _NOVO
+        elif op == "atualizar" and "nome" in valores:
+            ocupados.pop(recursos[recurso_id].nome, None)
+            ocupados[valores["nome"]] = recurso_id
+        elif op == "remover":
+            removidos.add(recurso_id)
+            ocupados.pop(recursos[recurso_id].nome, None)
+
+    if not all(resultado["success"] for resultado in resultados):
+        raise OperacoesRejeitadas("Operações inválidas. Nenhuma operação foi aplicada.", resultados, status)
+
+    return normalizadas, recursos, resultados
+
+
+def _aplicar_ajustes(db, ajustes, recursos, resultados):
+    """
+    Aplica uma sequência de ajustes relativos com um único UPDATE em lote
+    (executemany) e uma consulta para ler as quantidades resultantes.
+    """
+    db.flush()
+
+    deltas_por_id = defaultdict(int)
+    for _, recurso_id, delta in ajustes:
+        deltas_por_id[recurso_id] += delta
+
+    db.execute(AJUSTAR_QUANTIDADE, [
+        {"b_id": recurso_id, "b_delta": delta} for recurso_id, delta in deltas_por_id.items()
+    ])
+
+    atuais = db.execute(
+        select(Recurso.id, Recurso.tipo, Recurso.quantidade, Recurso.valor_unit).where(Recurso.id.in_(deltas_por_id))
+    ).all()
+
+    contadores = defaultdict(float)
+    negativos = set()
+    for recurso_id, tipo, quantidade, valor_unit in atuais:
+        if quantidade < 0:
+            negativos.add(recurso_id)
+        anterior = quantidade - deltas_por_id[recurso_id]
+        somar_contribuicao(contadores, contribuicao_recurso(tipo, anterior, valor_unit), -1)
+        somar_contribuicao(contadores, contribuicao_recurso(tipo, quantidade, valor_unit), 1)
+
+    if negativos:
+        for indice, recurso_id, _ in ajustes:
+            if recurso_id in negativos:
+                resultados[indice].update(success=False, erro="Quantidade resultante seria negativa")
+        raise OperacoesRejeitadas("Ajuste deixaria estoque negativo. Nenhuma operação foi aplicada.", resultados, 409)
+
+    # Instruções em lote não passam pelo flush; os contadores e o livro de estoque são ajustados aqui
+    incrementar(db, contadores)
+    marcar_modificacao(db.connection(), ["recursos"])
+
+    quantidades = {recurso_id: quantidade for recurso_id, _, quantidade, _ in atuais}
+    # Cada ajuste vira uma movimentação, com o saldo intermediário na ordem do lote
+    saldos = {recurso_id: quantidade - deltas_por_id[recurso_id] for recurso_id, quantidade in quantidades.items()}
+    movimentos = []
+    motivo = motivo_movimento(db, "ajuste")
+    for indice, recurso_id, delta in ajustes:
+        saldos[recurso_id] += delta
+        movimentos.append((recurso_id, delta, saldos[recurso_id], motivo))
+        resultados[indice].update(id=recurso_id, quantidade=quantidades[recurso_id])
+        db.expire(recursos[recurso_id], ["quantidade", "updated_at"])
+    registrar_movimentos(db, movimentos)
+
+
+def aplicar_operacoes(db, operacoes, user_role):
+    """
+    Aplica criar, atualizar, remover e ajustar (delta relativo de quantidade)
+    na ordem recebida, em uma única transação. Ajustes consecutivos viram um
+    só UPDATE em lote. Retorna o resultado de cada operação; lança
+    OperacoesRejeitadas (sem aplicar nada) se alguma for inválida.
+    """
+    if not isinstance(operacoes, list) or not operacoes:
+        raise OperacoesRejeitadas("Envie uma lista não vazia em 'operacoes'", [])
+    if len(operacoes) > LOTE_MAX_OPERACOES:
+        raise OperacoesRejeitadas(f"Máximo de {LOTE_MAX_OPERACOES} operações por lote", [])
+
+    normalizadas, recursos, resultados = _validar_lote(db, operacoes, user_role)
+
+    criados = {}
+    alterados = {}
+    ajustes = []
+
+    for indice, (op, recurso_id, valores) in enumerate(normalizadas):
+        if op == "ajustar":
+            ajustes.append((indice, recurso_id, valores))
+            alterados[recurso_id] = recursos[recurso_id]
+            continue
+        if ajustes:
+            _aplicar_ajustes(db, ajustes, recursos, resultados)
+            ajustes = []
+
+        if op == "criar":
+            criados[indice] = Recurso(**valores)
+            db.add(criados[indice])
+        elif op == "atualizar":
+            for campo, valor in valores.items():
+                setattr(recursos[recurso_id], campo, valor)
+            alterados[recurso_id] = recursos[recurso_id]
+            resultados[indice]["id"] = recurso_id
+        else:
+            resolver_alertas_de_removidos(db, [recurso_id])
+            db.delete(recursos[recurso_id])
+            alterados.pop(recurso_id, None)
+            resultados[indice]["id"] = recurso_id
+
+    if ajustes:
+        _aplicar_ajustes(db, ajustes, recursos, resultados)
+
+    db.flush()
+    for indice, recurso in criados.items():
+        resultados[indice]["id"] = recurso.id
+
+    avaliar_recursos(db, list(criados.values()) + list(alterados.values()))
+    db.commit()
+    invalidar_inventario()
+
+    return resultados
@@ -1,13 +1,251 @@
 # backend/app/services/recurso_service.py
 from app.models import Recurso
-from app.database import SessionLocal
+from app.config import PAGINACAO_LIMITE_PADRAO, PAGINACAO_LIMITE_MAXIMO, BUSCA_MIN_CARACTERES, BUSCA_LIMITE_RELEVANCIA
+from app.cache import invalidar_inventario
+from app.services.estoque_service import definir_motivo
+from app.utils import codificar_cursor, decodificar_cursor
+import re
+from contextlib import contextmanager
 from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from sqlalchemy import String, and_, case, column, func, literal_column, or_, select, table, tuple_, type_coerce
 
-def create_recurso(recurso_data):
+# Faixas de estoque usadas nas estatísticas e nos alertas
+LIMITE_CRITICO = 5
+LIMITE_ESTOQUE_BAIXO = 10
+
+# Colunas aceitas em ?ordenar_por= na listagem paginada. Datas são comparadas
+# como texto para que o valor guardado no cursor seja exatamente o do banco.
+COLUNAS_ORDENACAO = {
+    "created_at": type_coerce(Recurso.created_at, String),
+    "nome": Recurso.nome,
+    "tipo": Recurso.tipo,
+    "quantidade": Recurso.quantidade,
+    "valor_unit": Recurso.valor_unit,
+    "id": Recurso.id,
+}
+
+def serializar_recurso(recurso):
+    # Datas ficam como datetime: o provedor JSON da aplicação as escreve em ISO 8601
+    return {
+        "id": recurso.id,
+        "nome": recurso.nome,
+        "tipo": recurso.tipo,
+        "quantidade": recurso.quantidade,
+        "valor_unit": recurso.valor_unit,
+        "created_at": recurso.created_at,
+        "updated_at": recurso.updated_at
+    }
+
+def agregar_recursos(db):
+    """
+    Estatísticas do inventário calculadas no banco com um único GROUP BY por tipo.
+    Apenas uma linha por tipo é trazida para o Python.
+    """
+    def contar(condicao):
+        return func.coalesce(func.sum(case((condicao, 1), else_=0)), 0)
+
+    linhas = db.query(
+        Recurso.tipo,
+        func.count(Recurso.id),
+        contar(Recurso.quantidade < LIMITE_CRITICO),
+        contar(Recurso.quantidade == 0),
+        contar(and_(Recurso.quantidade >= LIMITE_CRITICO, Recurso.quantidade < LIMITE_ESTOQUE_BAIXO)),
+        contar(Recurso.quantidade < LIMITE_ESTOQUE_BAIXO),
+        func.coalesce(func.sum(Recurso.quantidade * Recurso.valor_unit), 0)
+    ).group_by(Recurso.tipo).all()
+
+    resumo = {
+        "total": 0,
+        "por_tipo": {},
+        "criticos": 0,
+        "esgotados": 0,
+        "baixo_estoque": 0,
+        "abaixo_do_minimo": 0,
+        "valor_total": 0.0
+    }
+
+    for tipo, total, criticos, esgotados, baixo_estoque, abaixo_do_minimo, valor_total in linhas:
+        resumo["por_tipo"][tipo] = total
+        resumo["total"] += total
+        resumo["criticos"] += criticos
+        resumo["esgotados"] += esgotados
+        resumo["baixo_estoque"] += baixo_estoque
+        resumo["abaixo_do_minimo"] += abaixo_do_minimo
+        resumo["valor_total"] += float(valor_total)
+
+    return resumo
+
+def _validar_limite(limite):
+    limite = PAGINACAO_LIMITE_PADRAO if limite is None else int(limite)
+    if limite < 1:
+        raise ValueError("Limite deve ser maior que zero")
+    return min(limite, PAGINACAO_LIMITE_MAXIMO)
+
+def _consulta_listagem(filtros, ordenar_por, ordem, cursor, limite):
+    """SELECT de uma página da listagem (com uma linha a mais para saber se há próxima) e o limite validado"""
+    filtros = filtros or {}
+
+    if ordenar_por not in COLUNAS_ORDENACAO:
+        raise ValueError(f"Ordenação inválida. Use: {', '.join(COLUNAS_ORDENACAO)}")
+    if ordem not in ("asc", "desc"):
+        raise ValueError("Ordem deve ser 'asc' ou 'desc'")
+
+    limite = _validar_limite(limite)
+
+    coluna = COLUNAS_ORDENACAO[ordenar_por]
+    consulta = select(Recurso, coluna.label("chave_cursor"))
+
+    if filtros.get("tipo"):
+        consulta = consulta.where(Recurso.tipo == filtros["tipo"])
+    if filtros.get("quantidade_min") is not None:
+        consulta = consulta.where(Recurso.quantidade >= int(filtros["quantidade_min"]))
+    if filtros.get("quantidade_max") is not None:
+        consulta = consulta.where(Recurso.quantidade <= int(filtros["quantidade_max"]))
+    if filtros.get("nome_prefixo"):
+        # Intervalo em vez de LIKE para que o índice de nome seja usado
+        prefixo = filtros["nome_prefixo"]
+        consulta = consulta.where(Recurso.nome >= prefixo, Recurso.nome < prefixo + "\uffff")
+
+    if cursor:
+        estado = decodificar_cursor(cursor)
+        if estado.get("o") != ordenar_por or estado.get("d") != ordem or "id" not in estado:
+            raise ValueError("Cursor não corresponde à ordenação solicitada")
+
+        posicao = tuple_(coluna, Recurso.id)
+        ultimo = tuple_(estado.get("v"), estado["id"])
+        consulta = consulta.where(posicao > ultimo if ordem == "asc" else posicao < ultimo)
+
+    if ordem == "asc":
+        consulta = consulta.order_by(coluna.asc(), Recurso.id.asc())
+    else:
+        consulta = consulta.order_by(coluna.desc(), Recurso.id.desc())
+
+    return consulta.limit(limite + 1), limite
+
+def _pagina_listagem(linhas, limite, ordenar_por, ordem):
+    next_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultimo_recurso, chave = linhas[-1]
+        next_cursor = codificar_cursor({"o": ordenar_por, "d": ordem, "v": chave, "id": ultimo_recurso.id})
+
+    return [serializar_recurso(recurso) for recurso, _ in linhas], next_cursor
+
+def listar_recursos(db, filtros=None, ordenar_por="created_at", ordem="asc", cursor=None, limite=None):
+    """
+    Lista recursos com paginação keyset sobre (ordenar_por, id).
+
+    filtros aceita: tipo, quantidade_min, quantidade_max e nome_prefixo.
+    Retorna (itens, next_cursor); next_cursor é None na última página.
+    Lança ValueError para parâmetros ou cursor inválidos.
+    """
+    consulta, limite = _consulta_listagem(filtros, ordenar_por, ordem, cursor, limite)
+    return _pagina_listagem(db.execute(consulta).all(), limite, ordenar_por, ordem)
+
+async def listar_recursos_async(db, filtros=None, ordenar_por="created_at", ordem="asc", cursor=None, limite=None):
+    """listar_recursos sobre uma AsyncSession (modo ASGI): a consulta é aguardada no driver assíncrono"""
+    consulta, limite = _consulta_listagem(filtros, ordenar_por, ordem, cursor, limite)
+    return _pagina_listagem((await db.execute(consulta)).all(), limite, ordenar_por, ordem)
+
+# Índice FTS5 criado pela migração v0004 (somente SQLite)
+RECURSOS_BUSCA = table("recursos_busca", column("rowid"), column("rank"))
+# Mesmos separadores do tokenizador unicode61: "_" também separa palavras. Uma
+# palavra que ele dividisse viraria frase, que o índice (detail=column) não aceita.
+PALAVRA_BUSCA = re.compile(r"[^\W_]+")
+
+def _consulta_fts(termo):
+    """Cada palavra vira um prefixo entre aspas ("bat"*), o que também neutraliza a sintaxe do FTS5"""
+    return " ".join(f'"{palavra}"*' for palavra in PALAVRA_BUSCA.findall(termo))
+
+@contextmanager
+def _erros_fts():
+    """Erros de sintaxe do FTS5 viram ValueError (400), sem repassar o SQL ao cliente"""
+    try:
+        yield
+    except OperationalError as e:
+        if "fts5" in str(e.orig).lower():
+            raise ValueError("Termo de busca inválido") from None
+        raise
+
+def buscar_recursos(db, termo, cursor=None, limite=None):
+    """
+    Busca por nome e tipo com prefixo em cada palavra (typeahead) e paginação keyset.
+
+    Com até BUSCA_LIMITE_RELEVANCIA resultados ordena por relevância (bm25, keyset
+    sobre (rank, id)); acima disso ordena por id, que o FTS5 percorre sem ordenar.
+    Retorna (itens, next_cursor, ordenacao). Lança ValueError para parâmetros ou cursor inválidos.
+    """
+    termo = (termo or "").strip()
+    consulta = _consulta_fts(termo)
+    if len(termo) < BUSCA_MIN_CARACTERES or not consulta:
+        raise ValueError(f"Informe ao menos {BUSCA_MIN_CARACTERES} caracteres para a busca")
+    limite = _validar_limite(limite)
+
+    if db.get_bind().dialect.name != "sqlite":
+        # Sem FTS5: prefixo do nome pelo índice ix_recursos_nome
+        itens, next_cursor = listar_recursos(
+            db, filtros={"nome_prefixo": termo}, ordenar_por="nome", cursor=cursor, limite=limite
+        )
+        return itens, next_cursor, "nome"
+
+    corresponde = literal_column("recursos_busca").op("MATCH")(consulta)
+
+    estado = decodificar_cursor(cursor) if cursor else None
+    if estado is None:
+        # Sonda barata: só verifica se existe um resultado além do limite
+        with _erros_fts():
+            excedente = db.execute(
+                select(RECURSOS_BUSCA.c.rowid).where(corresponde).offset(BUSCA_LIMITE_RELEVANCIA).limit(1)
+            ).first()
+        ordenacao = "id" if excedente else "relevancia"
+    elif (
+        estado.get("q") != consulta
+        or estado.get("o") not in ("relevancia", "id")
+        or not isinstance(estado.get("id"), int)
+        or (estado["o"] == "relevancia" and not isinstance(estado.get("r"), (int, float)))
+    ):
+        raise ValueError("Cursor inválido")
+    else:
+        ordenacao = estado["o"]
+
+    # O bm25 precisa de estatísticas de todos os resultados: só é calculado na ordenação por relevância
+    rank = RECURSOS_BUSCA.c.rank if ordenacao == "relevancia" else literal_column("NULL")
+    query = db.query(Recurso, rank).join(
+        RECURSOS_BUSCA, RECURSOS_BUSCA.c.rowid == Recurso.id
+    ).filter(corresponde)
+
+    if ordenacao == "relevancia":
+        if estado:
+            query = query.filter(or_(
+                RECURSOS_BUSCA.c.rank > estado["r"],
+                and_(RECURSOS_BUSCA.c.rank == estado["r"], RECURSOS_BUSCA.c.rowid > estado["id"])
+            ))
+        query = query.order_by(RECURSOS_BUSCA.c.rank, RECURSOS_BUSCA.c.rowid)
+    else:
+        if estado:
+            query = query.filter(RECURSOS_BUSCA.c.rowid > estado["id"])
+        query = query.order_by(RECURSOS_BUSCA.c.rowid)
+
+    with _erros_fts():
+        linhas = query.limit(limite + 1).all()
+
+    next_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultimo_recurso, rank = linhas[-1]
+        next_cursor = codificar_cursor({"q": consulta, "o": ordenacao, "r": rank, "id": ultimo_recurso.id})
+
+    return [serializar_recurso(recurso) for recurso, _ in linhas], next_cursor, ordenacao
+
+async def buscar_recursos_async(db, termo, **parametros):
+    # Adaptador: a busca roda inteira em db.run_sync (ver "Modo ASGI" no README)
+    return await db.run_sync(buscar_recursos, termo, **parametros)
+
+def create_recurso(db, recurso_data):
     """
     Cria um novo recurso
     """
-    db = SessionLocal()
     try:
         # Validações
         if recurso_data.get('quantidade', 0) < 0:
@@ -39,6 +277,7 @@ def create_recurso(recurso_data):
         
         db.add(new_recurso)
         db.commit()
+        invalidar_inventario()
         db.refresh(new_recurso)
         
         return {
@@ -59,46 +298,15 @@ def create_recurso(recurso_data):
             "message": f"Erro ao criar recurso: {str(e)}",
             "success": False
         }
-    
-    finally:
-        db.close()
 
-def get_all_recursos():
+def get_all_recursos(db):
     """
     Obtém todos os recursos
     """
-    db = SessionLocal()
-    try:
-        recursos = db.query(Recurso).all()
-        
-        return [
-            {
-                "id": recurso.id,
-                "nome": recurso.nome,
-                "tipo": recurso.tipo,
-                "quantidade": recurso.quantidade,
-                "status": "crítico" if recurso.quantidade < 10 else "normal",
-                "created_at": recurso.created_at.isoformat() if recurso.created_at else None,
-                "updated_at": recurso.updated_at.isoformat() if recurso.updated_at else None
-            }
-            for recurso in recursos
-        ]
+    recursos = db.query(Recurso).all()
     
-    finally:
-        db.close()
-
-def get_recurso_by_id(recurso_id):
-    """
-    Obtém um recurso específico por ID
-    """
-    db = SessionLocal()
-    try:
-        recurso = db.query(Recurso).filter_by(id=recurso_id).first()
-        
-        if not recurso:
-            return None
-        
-        return {
+    return [
+        {
             "id": recurso.id,
             "nome": recurso.nome,
             "tipo": recurso.tipo,
@@ -107,15 +315,32 @@ def get_recurso_by_id(recurso_id):
             "created_at": recurso.created_at.isoformat() if recurso.created_at else None,
             "updated_at": recurso.updated_at.isoformat() if recurso.updated_at else None
         }
+        for recurso in recursos
+    ]
+
+def get_recurso_by_id(db, recurso_id):
+    """
+    Obtém um recurso específico por ID
+    """
+    recurso = db.query(Recurso).filter_by(id=recurso_id).first()
+    
+    if not recurso:
+        return None
     
-    finally:
-        db.close()
+    return {
+        "id": recurso.id,
+        "nome": recurso.nome,
+        "tipo": recurso.tipo,
+        "quantidade": recurso.quantidade,
+        "status": "crítico" if recurso.quantidade < 10 else "normal",
+        "created_at": recurso.created_at.isoformat() if recurso.created_at else None,
+        "updated_at": recurso.updated_at.isoformat() if recurso.updated_at else None
+    }
 
-def update_recurso(recurso_id, update_data):
+def update_recurso(db, recurso_id, update_data):
     """
     Atualiza um recurso existente
     """
-    db = SessionLocal()
     try:
         recurso = db.query(Recurso).filter_by(id=recurso_id).first()
         
@@ -152,8 +377,14 @@ def update_recurso(recurso_id, update_data):
                 setattr(recurso, field, value)
         
         recurso.updated_at = datetime.utcnow()
+        definir_motivo(db, update_data.get('motivo'))
+
+        # Import tardio: regras_alerta depende das constantes deste módulo
+        from app.services.regras_alerta import avaliar_recursos
+        avaliar_recursos(db, [recurso])
         
         db.commit()
+        invalidar_inventario()
         db.refresh(recurso)
         
         return {
@@ -175,15 +406,11 @@ def update_recurso(recurso_id, update_data):
             "message": f"Erro ao atualizar recurso: {str(e)}",
             "success": False
         }
-    
-    finally:
-        db.close()
 
-def delete_recurso(recurso_id):
+def delete_recurso(db, recurso_id):
     """
     Remove um recurso (apenas admin)
     """
-    db = SessionLocal()
     try:
         recurso = db.query(Recurso).filter_by(id=recurso_id).first()
         
@@ -199,8 +426,11 @@ def delete_recurso(recurso_id):
             "tipo": recurso.tipo
         }
         
+        from app.services.regras_alerta import resolver_alertas_de_removidos
+        resolver_alertas_de_removidos(db, [recurso.id])
         db.delete(recurso)
         db.commit()
+        invalidar_inventario()
         
         return {
             "message": f"Recurso '{recurso_info['nome']}' removido com sucesso",
@@ -214,50 +444,37 @@ def delete_recurso(recurso_id):
             "message": f"Erro ao remover recurso: {str(e)}",
             "success": False
         }
-    
-    finally:
-        db.close()
 
-def get_recursos_by_tipo(tipo):
+def get_recursos_by_tipo(db, tipo):
     """
     Obtém recursos filtrados por tipo
     """
-    db = SessionLocal()
-    try:
-        recursos = db.query(Recurso).filter_by(tipo=tipo).all()
-        
-        return [
-            {
-                "id": recurso.id,
-                "nome": recurso.nome,
-                "tipo": recurso.tipo,
-                "quantidade": recurso.quantidade,
-                "status": "crítico" if recurso.quantidade < 10 else "normal"
-            }
-            for recurso in recursos
-        ]
+    recursos = db.query(Recurso).filter_by(tipo=tipo).all()
     
-    finally:
-        db.close()
+    return [
+        {
+            "id": recurso.id,
+            "nome": recurso.nome,
+            "tipo": recurso.tipo,
+            "quantidade": recurso.quantidade,
+            "status": "crítico" if recurso.quantidade < 10 else "normal"
+        }
+        for recurso in recursos
+    ]
 
-def get_recursos_criticos():
+def get_recursos_criticos(db):
     """
     Obtém recursos com estoque crítico (quantidade < 10)
     """
-    db = SessionLocal()
-    try:
-        recursos = db.query(Recurso).filter(Recurso.quantidade < 10).all()
-        
-        return [
-            {
-                "id": recurso.id,
-                "nome": recurso.nome,
-                "tipo": recurso.tipo,
-                "quantidade": recurso.quantidade,
-                "status": "crítico"
-            }
-            for recurso in recursos
-        ]
+    recursos = db.query(Recurso).filter(Recurso.quantidade < 10).all()
     
-    finally:
-        db.close()
\ No newline at end of file
+    return [
+        {
+            "id": recurso.id,
+            "nome": recurso.nome,
+            "tipo": recurso.tipo,
+            "quantidade": recurso.quantidade,
+            "status": "crítico"
+        }
+        for recurso in recursos
+    ]
\ No newline at end of file
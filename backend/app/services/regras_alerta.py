@@ -0,0 +1,285 @@
+# backend/app/services/regras_alerta.py
+import json
+import operator
+from collections import defaultdict
+from datetime import datetime
+from string import Formatter
+
+from sqlalchemy import String, and_, case, cast, exists, insert, literal, not_, select, update
+
+from app.config import ALERTA_REGRAS_ARQUIVO
+from app.eventos import registrar
+from app.models import Alerta, Recurso
+from app.services.contadores_service import contribuicao_alerta, incrementar, marcar_modificacao, somar_contribuicao
+from app.services.recurso_service import LIMITE_CRITICO, LIMITE_ESTOQUE_BAIXO
+
+OPERADORES = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+CAMPOS_RECURSO = ("id", "nome", "tipo", "quantidade", "valor_unit")
+
+# Regras declarativas padrão. Podem ser substituídas por um arquivo JSON
+# com a mesma estrutura apontado por ALERTA_REGRAS_ARQUIVO.
+REGRAS_PADRAO = [
+    {
+        "nome": "estoque_baixo",
+        "campo": "quantidade",
+        "operador": "<",
+        "valor": LIMITE_ESTOQUE_BAIXO,
+        "prioridades": [
+            {"operador": "<", "valor": LIMITE_CRITICO, "prioridade": "alta"}
+        ],
+        "prioridade_padrao": "media",
+        "titulo": "Estoque baixo: {nome}",
+        "descricao": "O recurso '{nome}' está com apenas {quantidade} unidades em estoque.",
+        "resolver_automaticamente": True
+    }
+]
+
+
+class RegraCompilada:
+    """Regra de alerta pronta para avaliar tanto objetos Recurso quanto consultas SQL"""
+
+    def __init__(self, definicao):
+        self.nome = definicao["nome"]
+        self.campo = _validar_campo(definicao["campo"])
+        self.comparar = _validar_operador(definicao["operador"])
+        self.valor = definicao["valor"]
+        self.prioridades = [
+            (_validar_operador(p["operador"]), p["valor"], p["prioridade"])
+            for p in definicao.get("prioridades", [])
+        ]
+        self.prioridade_padrao = definicao.get("prioridade_padrao", "media")
+        self.titulo = definicao["titulo"]
+        self.descricao = definicao.get("descricao")
+        self.resolver_automaticamente = definicao.get("resolver_automaticamente", False)
+
+        # Valida os templates já na compilação
+        _campos_template(self.titulo)
+        if self.descricao:
+            _campos_template(self.descricao)
+
+    def corresponde(self, recurso):
+        return self.comparar(getattr(recurso, self.campo), self.valor)
+
+    def prioridade(self, recurso):
+        atual = getattr(recurso, self.campo)
+        for comparar, valor, prioridade in self.prioridades:
+            if comparar(atual, valor):
+                return prioridade
+        return self.prioridade_padrao
+
+    def formatar(self, template, recurso):
+        if not template:
+            return None
+        return template.format(**{campo: getattr(recurso, campo) for campo in CAMPOS_RECURSO})
+
+    def condicao_sql(self):
+        return self.comparar(getattr(Recurso, self.campo), self.valor)
+
+    def prioridade_sql(self):
+        if not self.prioridades:
+            return literal(self.prioridade_padrao)
+        coluna = getattr(Recurso, self.campo)
+        return case(
+            *[(comparar(coluna, valor), prioridade) for comparar, valor, prioridade in self.prioridades],
+            else_=self.prioridade_padrao
+        )
+
+    def template_sql(self, template):
+        """Converte um template como 'Estoque baixo: {nome}' em concatenação SQL"""
+        if not template:
+            return literal(None, String)
+
+        partes = []
+        for texto, campo, _, _ in Formatter().parse(template):
+            if texto:
+                partes.append(literal(texto))
+            if campo:
+                partes.append(cast(getattr(Recurso, campo), String))
+
+        expressao = partes[0] if partes else literal("")
+        for parte in partes[1:]:
+            expressao = expressao + parte
+        return expressao
+
+
+def _validar_campo(campo):
+    if campo not in CAMPOS_RECURSO:
+        raise ValueError(f"Campo de regra inválido: {campo}")
+    return campo
+
+def _validar_operador(simbolo):
+    if simbolo not in OPERADORES:
+        raise ValueError(f"Operador de regra inválido: {simbolo}")
+    return OPERADORES[simbolo]
+
+def _campos_template(template):
+    campos = [campo for _, campo, _, _ in Formatter().parse(template) if campo]
+    for campo in campos:
+        _validar_campo(campo)
+    return campos
+
+
+_regras = None
+
+def carregar_regras(definicoes=None):
+    """Compila as regras uma única vez (chamado na inicialização da aplicação)"""
+    global _regras
+
+    if definicoes is None:
+        if ALERTA_REGRAS_ARQUIVO:
+            with open(ALERTA_REGRAS_ARQUIVO, encoding="utf-8") as arquivo:
+                definicoes = json.load(arquivo)
+        else:
+            definicoes = REGRAS_PADRAO
+
+    _regras = [RegraCompilada(definicao) for definicao in definicoes]
+    return _regras
+
+def regras_ativas():
+    if _regras is None:
+        carregar_regras()
+    return _regras
+
+
+def avaliar_recursos(db, recursos):
+    """
+    Avalia as regras apenas para os recursos alterados, na mesma transação.
+    Cria, atualiza a prioridade ou resolve alertas pendentes; o commit fica com quem chamou.
+    """
+    regras = regras_ativas()
+    if not recursos or not regras:
+        return
+
+    if any(recurso.id is None for recurso in recursos):
+        db.flush()
+
+    ids = [recurso.id for recurso in recursos]
+    pendentes = {
+        (alerta.recurso_id, alerta.regra): alerta
+        for alerta in db.query(Alerta).filter(
+            Alerta.recurso_id.in_(ids),
+            Alerta.regra.isnot(None),
+            Alerta.status == 'pendente'
+        )
+    }
+
+    agora = datetime.utcnow()
+    for recurso in recursos:
+        for regra in regras:
+            alerta = pendentes.get((recurso.id, regra.nome))
+
+            if regra.corresponde(recurso):
+                prioridade = regra.prioridade(recurso)
+                descricao = regra.formatar(regra.descricao, recurso)
+
+                if alerta is None:
+                    db.add(Alerta(
+                        titulo=regra.formatar(regra.titulo, recurso),
+                        descricao=descricao,
+                        prioridade=prioridade,
+                        status='pendente',
+                        recurso_id=recurso.id,
+                        regra=regra.nome,
+                        criado_em=agora,
+                        atualizado_em=agora
+                    ))
+                elif alerta.prioridade != prioridade or alerta.descricao != descricao:
+                    alerta.prioridade = prioridade
+                    alerta.descricao = descricao
+
+            elif alerta is not None and regra.resolver_automaticamente:
+                alerta.status = 'resolvido'
+
+
+def resolver_alertas_de_removidos(db, recurso_ids):
+    """
+    Resolve os alertas pendentes dos recursos que vão ser removidos, na mesma
+    transação (chamar antes do db.delete). Pelo ORM, para que contadores e eventos acompanhem.
+    """
+    if not recurso_ids:
+        return
+
+    agora = datetime.utcnow()
+    for alerta in db.query(Alerta).filter(Alerta.recurso_id.in_(list(recurso_ids)), Alerta.status == 'pendente'):
+        alerta.status = 'resolvido'
+        alerta.atualizado_em = agora
+
+
+def sincronizar_alertas(db):
+    """
+    Varredura completa e set-based: um INSERT ... SELECT com anti-join por regra
+    para os alertas que faltam e um UPDATE para os que devem ser resolvidos.
+    Corrige o que não passou pelo motor incremental. Retorna o número de alertas criados.
+    """
+    agora = datetime.utcnow()
+    criados = 0
+
+    for regra in regras_ativas():
+        sem_alerta_pendente = ~exists().where(
+            Alerta.recurso_id == Recurso.id,
+            Alerta.regra == regra.nome,
+            Alerta.status == 'pendente'
+        )
+
+        novos_alertas = select(
+            regra.template_sql(regra.titulo),
+            regra.template_sql(regra.descricao),
+            regra.prioridade_sql(),
+            literal('pendente'),
+            Recurso.id,
+            literal(regra.nome),
+            literal(agora),
+            literal(agora)
+        ).where(regra.condicao_sql(), sem_alerta_pendente)
+
+        resultado = db.execute(
+            insert(Alerta).from_select(
+                ['titulo', 'descricao', 'prioridade', 'status', 'recurso_id', 'regra', 'criado_em', 'atualizado_em'],
+                novos_alertas
+            )
+        )
+        criados += resultado.rowcount
+        alterados = resultado.rowcount
+        resolvidos_total = 0
+        deltas = defaultdict(float)
+        somar_contribuicao(deltas, contribuicao_alerta(None, 'pendente'), resultado.rowcount)
+
+        if regra.resolver_automaticamente:
+            recuperados = select(Recurso.id).where(not_(regra.condicao_sql()))
+            resolvidos = db.execute(
+                update(Alerta)
+                .where(
+                    and_(
+                        Alerta.regra == regra.nome,
+                        Alerta.status == 'pendente',
+                        Alerta.recurso_id.in_(recuperados)
+                    )
+                )
+                .values(status='resolvido', atualizado_em=agora)
+                .execution_options(synchronize_session=False)
+            )
+            somar_contribuicao(deltas, contribuicao_alerta(None, 'pendente'), -resolvidos.rowcount)
+            somar_contribuicao(deltas, contribuicao_alerta(None, 'resolvido'), resolvidos.rowcount)
+            alterados += resolvidos.rowcount
+            resolvidos_total = resolvidos.rowcount
+
+        # Instruções em lote não passam pelo flush; os contadores são ajustados aqui
+        incrementar(db, deltas)
+        if alterados:
+            marcar_modificacao(db.connection(), ["alertas"])
+            # Alertas de regra são gerais (sem usuário): o evento vai para todos
+            registrar(db, "alertas_sincronizados", {
+                "regra": regra.nome,
+                "criados": resultado.rowcount,
+                "resolvidos": resolvidos_total
+            })
+
+    return criados
@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from app.config import (
+    DATABASE_URL,
+    TAREFAS_ATIVAS,
+    TAREFAS_TRAVA,
+    TAREFAS_LIDER_ESPERA,
+    ALERTAS_AUTOMATICOS_INTERVALO,
+    CONTADORES_RECONCILIACAO_INTERVALO
+)
+from app.database import get_db
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class TravaLider:
+    """
+    Elege um único processo para as tarefas periódicas: flock exclusivo e não
+    bloqueante em um arquivo. O sistema libera a trava quando o processo
+    termina, e outro worker a assume na tentativa seguinte. Vale entre os
+    processos de um mesmo host; com vários hosts, deixe TAREFAS_ATIVAS=true
+    em só um deles.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def adquirir(self):
+        """True se este processo é (ou acabou de se tornar) o líder"""
+        if self._arquivo is not None:
+            return True
+        if fcntl is None:
+            # Sem flock (Windows) cada processo executa as próprias tarefas
+            return True
+
+        arquivo = open(self.caminho, "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+
+        self._arquivo = arquivo
+        logger.info("Processo %s assumiu as tarefas periódicas (%s)", os.getpid(), self.caminho)
+        return True
+
+    def liberar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def caminho_trava():
+    if TAREFAS_TRAVA:
+        return TAREFAS_TRAVA
+    # Um arquivo por banco: aplicações diferentes no mesmo host não disputam a mesma trava
+    banco = hashlib.sha1(DATABASE_URL.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"wayne-tarefas-{banco}.lock")
+
+
+class Agendador:
+    """
+    Executa tarefas periódicas em uma thread daemon dentro do processo da
+    aplicação. Com uma trava, só o processo líder executa; os demais tentam
+    assumi-la a cada TAREFAS_LIDER_ESPERA segundos. Nada é executado enquanto
+    houver migrações pendentes, e cada tarefa roda pela primeira vez um
+    intervalo após a partida.
+    """
+
+    def __init__(self, app, trava=None):
+        self.app = app
+        self.trava = trava
+        self._tarefas = []
+        self._parar = threading.Event()
+        self._thread = None
+        self._esquema_em_dia = False
+
+    def registrar(self, nome, intervalo, funcao):
+        """Registra uma tarefa; intervalo <= 0 desativa a tarefa"""
+        if intervalo <= 0:
+            return
+        self._tarefas.append({
+            "nome": nome,
+            "intervalo": intervalo,
+            "funcao": funcao,
+            "proxima": time.monotonic() + intervalo
+        })
+
+    def iniciar(self):
+        if self._thread or not self._tarefas:
+            return
+        self._thread = threading.Thread(target=self._executar, name="agendador-tarefas", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self.trava:
+            self.trava.liberar()
+
+    def _migracoes_aplicadas(self):
+        """As tarefas leem tabelas criadas pelas migrações, que podem rodar depois da partida"""
+        if not self._esquema_em_dia:
+            from app.database import engine
+            from app.migracoes import pendentes
+
+            try:
+                self._esquema_em_dia = not pendentes(engine)
+            except Exception:
+                logger.exception("Erro ao verificar as migrações pendentes")
+            if not self._esquema_em_dia:
+                logger.warning("Tarefas periódicas aguardando as migrações pendentes")
+        return self._esquema_em_dia
+
+    def _executar(self):
+        while not self._parar.is_set():
+            if self.trava and not self.trava.adquirir():
+                self._parar.wait(TAREFAS_LIDER_ESPERA)
+                continue
+            if not self._migracoes_aplicadas():
+                self._parar.wait(TAREFAS_LIDER_ESPERA)
+                continue
+
+            for tarefa in self._tarefas:
+                agora = time.monotonic()
+                if agora < tarefa["proxima"]:
+                    continue
+
+                tarefa["proxima"] = agora + tarefa["intervalo"]
+                try:
+                    with self.app.app_context():
+                        tarefa["funcao"]()
+                except Exception:
+                    logger.exception("Erro na tarefa periódica '%s'", tarefa["nome"])
+
+            espera = min(t["proxima"] for t in self._tarefas) - time.monotonic()
+            self._parar.wait(max(espera, 0.1))
+
+
+def tarefa_alertas_automaticos():
+    from app.services.dashboard_service import create_automatic_alerts
+
+    criados = create_automatic_alerts(get_db())
+    if criados:
+        logger.info("%s alertas automáticos criados", criados)
+
+
+def tarefa_reconciliar_contadores():
+    from app.services.contadores_service import reconciliar_contadores
+
+    # A sessão do contexto da aplicação é desfeita e fechada no teardown
+    reconciliar_contadores(get_db())
+
+
+def iniciar_tarefas(app):
+    """
+    Cria o agendador da aplicação e inicia as tarefas habilitadas na configuração.
+    Chamado pelos pontos de entrada do servidor (wsgi.py, asgi.py), não por create_app.
+    """
+    agendador = Agendador(app, TravaLider(caminho_trava()))
+    app.extensions["agendador"] = agendador
+
+    if not TAREFAS_ATIVAS:
+        return agendador
+
+    # A primeira execução vem um intervalo após a partida; a semeadura inicial fica na migração v0007
+    agendador.registrar("reconciliar_contadores", CONTADORES_RECONCILIACAO_INTERVALO, tarefa_reconciliar_contadores)
+    agendador.registrar("alertas_automaticos", ALERTAS_AUTOMATICOS_INTERVALO, tarefa_alertas_automaticos)
+    agendador.iniciar()
+    return agendador
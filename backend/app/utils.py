@@ -1,8 +1,111 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.config import SENHA_HASH_METODO, SENHA_HASH_WORKERS, SENHA_HASH_FILA_MAX
+from app.metricas import registro
+
+
+class HashSobrecarregado(Exception):
+    """Fila do pool de hash cheia; a requisição deve ser recusada (503)"""
+
+
+# Hash e verificação rodam em um pool limitado para não ocupar todas as
+# threads de requisição; o hashlib libera o GIL durante o cálculo
+_pool_hash = ThreadPoolExecutor(max_workers=SENHA_HASH_WORKERS, thread_name_prefix="hash-senha")
+_vagas_hash = threading.BoundedSemaphore(SENHA_HASH_WORKERS + SENHA_HASH_FILA_MAX)
+_lock_estatisticas = threading.Lock()
+_estatisticas_hash = {"concluidos": 0, "rejeitados": 0}
+_metodo_normalizado = None
+
+
+def _enviar_ao_pool(funcao, *args):
+    if not _vagas_hash.acquire(blocking=False):
+        with _lock_estatisticas:
+            _estatisticas_hash["rejeitados"] += 1
+        raise HashSobrecarregado("Muitas operações de senha em andamento. Tente novamente em instantes.")
+
+    enviado = time.perf_counter()
+
+    def tarefa():
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            fim = time.perf_counter()
+            with _lock_estatisticas:
+                _estatisticas_hash["concluidos"] += 1
+            # Por operação, em histogramas: a cauda da fila (p99) é o que importa numa rajada
+            registro.observar("wayne_hash_senha_espera_segundos", (), inicio - enviado)
+            registro.observar("wayne_hash_senha_execucao_segundos", (), fim - inicio)
+
+    try:
+        futuro = _pool_hash.submit(tarefa)
+    except Exception:
+        _vagas_hash.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas_hash.release())
+    return futuro
+
+def _executar_no_pool(funcao, *args):
+    return _enviar_ao_pool(funcao, *args).result()
+
+async def _aguardar_no_pool(funcao, *args):
+    # No modo ASGI o loop de eventos não fica parado esperando o hash
+    return await asyncio.wrap_future(_enviar_ao_pool(funcao, *args))
+
+def estatisticas_hash():
+    """
+    Uso do pool de hash neste processo; exportado em /metrics. Os tempos de
+    fila e de cálculo de cada operação vão para os histogramas wayne_hash_senha_*_segundos.
+    """
+    with _lock_estatisticas:
+        totais = dict(_estatisticas_hash)
+    return {
+        "workers": SENHA_HASH_WORKERS,
+        "fila_max": SENHA_HASH_FILA_MAX,
+        "concluidos": totais["concluidos"],
+        "rejeitados": totais["rejeitados"]
+    }
 
 
 def set_senha(senha):
-    return generate_password_hash(senha)
+    return _executar_no_pool(generate_password_hash, senha, SENHA_HASH_METODO)
 
 def verificar_senha(hash_senha, senha):
-    return check_password_hash(hash_senha, senha)
\ No newline at end of file
+    return _executar_no_pool(check_password_hash, hash_senha, senha)
+
+async def set_senha_async(senha):
+    return await _aguardar_no_pool(generate_password_hash, senha, SENHA_HASH_METODO)
+
+async def verificar_senha_async(hash_senha, senha):
+    return await _aguardar_no_pool(check_password_hash, hash_senha, senha)
+
+def precisa_rehash(hash_senha):
+    """True se o hash foi gerado com parâmetros diferentes dos configurados"""
+    global _metodo_normalizado
+    if _metodo_normalizado is None:
+        # O werkzeug completa o método com os parâmetros padrão (ex.: scrypt -> scrypt:32768:8:1)
+        _metodo_normalizado = generate_password_hash("", SENHA_HASH_METODO).split("$", 1)[0]
+    return hash_senha.split("$", 1)[0] != _metodo_normalizado
+
+def codificar_cursor(dados):
+    """Serializa o estado da paginação em um cursor opaco (base64 url-safe)"""
+    bruto = json.dumps(dados, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor):
+    """Decodifica um cursor gerado por codificar_cursor. Lança ValueError se inválido"""
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        bruto = base64.urlsafe_b64decode(cursor + preenchimento)
+        dados = json.loads(bruto.decode("utf-8"))
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+    if not isinstance(dados, dict):
+        raise ValueError("Cursor inválido")
+    return dados
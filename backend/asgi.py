@@ -0,0 +1,19 @@
+from app.asgi import create_asgi_app
+from app.database import engine
+from app.migracoes import aplicar_migracoes
+from app.tasks import iniciar_tarefas
+
+
+if __name__ == "__main__":
+    aplicar_migracoes(engine)
+
+# Servido por um servidor ASGI, ex.: uvicorn asgi:app
+app = create_asgi_app()
+
+# Tarefas periódicas só no servidor; a primeira execução espera as migrações pendentes
+iniciar_tarefas(app.flask)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app)
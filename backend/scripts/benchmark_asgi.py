@@ -0,0 +1,229 @@
+"""
+Compara concorrência e latência do modo WSGI (threads) com o modo ASGI.
+
+Popula um banco SQLite temporário, sobe cada servidor em um processo próprio
+e dispara clientes HTTP concorrentes contra as rotas de leitura do dashboard
+e da listagem. Repete a carga com conexões SSE abertas, que no modo WSGI
+prendem uma thread cada, e mostra quantas threads o servidor usou.
+
+  - wsgi: servidor do werkzeug com uma thread por requisição
+  - asgi: uvicorn com asgi:app; requer as dependências do modo ASGI, que não
+    fazem parte da instalação padrão: pip install uvicorn aiosqlite greenlet.
+    Sem elas só o modo WSGI é medido, e os números do ASGI não são reproduzidos
+
+Uso (a partir de backend/):
+    python scripts/benchmark_asgi.py
+    python scripts/benchmark_asgi.py --concorrencia 1 20 100 --requisicoes 20 --streams 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+ROTAS = ("/api/dashboard/alertas", "/api/dashboard/", "/api/recurso/?limite=50")
+
+
+def ambiente(diretorio):
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}",
+        READ_DATABASE_URL="",
+        TAREFAS_ATIVAS="false",
+        CACHE_URL="memoria://",
+        SSE_HEARTBEAT="5",
+    )
+    return env
+
+
+def popular(total_recursos):
+    from sqlalchemy import insert
+
+    from app.database import SessionLocal, engine
+    from app.migracoes import aplicar_migracoes
+    from app.models import Recurso, Usuario
+    from app.services.regras_alerta import sincronizar_alertas
+    from app.utils import set_senha
+
+    aplicar_migracoes(engine)
+    with SessionLocal() as db:
+        db.add(Usuario(name="Bruce", cpf="1", email="bruce@wayne.com", cargo="admin", senha_hash=set_senha("benchmark")))
+        db.execute(insert(Recurso), [
+            {"nome": f"Recurso {i:06d}", "tipo": f"tipo_{i % 8}", "quantidade": i % 60, "valor_unit": 10.0 + i % 100}
+            for i in range(total_recursos)
+        ])
+        db.commit()
+        sincronizar_alertas(db)
+        db.commit()
+
+
+def servir(modo, porta):
+    """Executado no processo filho: sobe o servidor pedido"""
+    if modo == "asgi":
+        import uvicorn
+
+        from app.asgi import create_asgi_app
+        from app import create_app
+
+        flask_app = create_app()
+        uvicorn.run(create_asgi_app(flask_app), host="127.0.0.1", port=porta, log_level="warning")
+    else:
+        from werkzeug.serving import run_simple
+
+        from app import create_app
+
+        flask_app = create_app()
+        run_simple("127.0.0.1", porta, flask_app, threaded=True)
+
+
+async def requisicao(porta, metodo, caminho, token=None, corpo=None):
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    cabecalhos = [f"{metodo} {caminho} HTTP/1.1", "Host: 127.0.0.1", "Connection: close"]
+    if token:
+        cabecalhos.append(f"Authorization: Bearer {token}")
+    dados = b""
+    if corpo is not None:
+        dados = json.dumps(corpo).encode()
+        cabecalhos += ["Content-Type: application/json", f"Content-Length: {len(dados)}"]
+    escritor.write(("\r\n".join(cabecalhos) + "\r\n\r\n").encode() + dados)
+    await escritor.drain()
+
+    resposta = await leitor.read()
+    escritor.close()
+    cabecalho, _, conteudo = resposta.partition(b"\r\n\r\n")
+    return int(cabecalho.split(b" ", 2)[1]), conteudo
+
+async def aguardar_servidor(porta, limite=30):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            await requisicao(porta, "GET", "/")
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Servidor na porta {porta} não respondeu")
+
+async def abrir_stream(porta, token):
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    escritor.write(f"GET /api/dashboard/stream HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+    await escritor.drain()
+    await leitor.readuntil(b"retry:")
+    return escritor
+
+
+async def carga(porta, token, concorrencia, requisicoes):
+    latencias = []
+    erros = 0
+
+    async def cliente(indice):
+        nonlocal erros
+        for numero in range(requisicoes):
+            caminho = ROTAS[(indice + numero) % len(ROTAS)]
+            inicio = time.perf_counter()
+            try:
+                status, _ = await requisicao(porta, "GET", caminho, token)
+            except OSError:
+                status = None
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[cliente(indice) for indice in range(concorrencia)])
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "req/s": len(latencias) / duracao,
+        "p50": statistics.median(latencias) * 1000,
+        "p95": latencias[int(len(latencias) * 0.95) - 1] * 1000,
+        "erros": erros,
+    }
+
+def threads_do_processo(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for linha in status:
+            if linha.startswith("Threads:"):
+                return int(linha.split()[1])
+    return None
+
+
+async def medir(modo, porta, args):
+    await aguardar_servidor(porta)
+    _, corpo = await requisicao(porta, "POST", "/api/auth/login", corpo={"email": "bruce@wayne.com", "senha": "benchmark"})
+    token = json.loads(corpo)["token"]
+
+    for concorrencia in args.concorrencia:
+        resultado = await carga(porta, token, concorrencia, args.requisicoes)
+        imprimir(modo, f"c={concorrencia}", resultado)
+
+    streams = []
+    try:
+        for _ in range(args.streams):
+            streams.append(await abrir_stream(porta, token))
+        resultado = await carga(porta, token, args.concorrencia[-1], args.requisicoes)
+        imprimir(modo, f"c={args.concorrencia[-1]} +{args.streams} SSE", resultado)
+        return threads_do_processo(args.pid)
+    finally:
+        for escritor in streams:
+            escritor.close()
+
+def imprimir(modo, cenario, resultado):
+    print(
+        f"  {modo:<5} {cenario:<18} {resultado['req/s']:8.1f} req/s"
+        f"  p50 {resultado['p50']:7.1f} ms  p95 {resultado['p95']:7.1f} ms  erros {resultado['erros']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recursos", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 20, 100])
+    parser.add_argument("--requisicoes", type=int, default=20, help="por cliente")
+    parser.add_argument("--streams", type=int, default=100, help="conexões SSE abertas no último cenário")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--servidor", choices=("wsgi", "asgi"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servidor:
+        servir(args.servidor, args.porta)
+        return
+
+    diretorio = tempfile.mkdtemp(prefix="benchmark_asgi_")
+    env = ambiente(diretorio)
+    os.environ.update(env)
+    popular(args.recursos)
+
+    modos = ["wsgi"]
+    try:
+        import aiosqlite  # noqa: F401
+        import greenlet  # noqa: F401
+        import uvicorn  # noqa: F401
+        modos.append("asgi")
+    except ImportError as e:
+        print(f"Modo ASGI não medido ({e.name} não instalado): pip install uvicorn aiosqlite greenlet")
+
+    print(f"{args.recursos} recursos, {args.requisicoes} requisições por cliente, rotas: {', '.join(ROTAS)}")
+    for modo in modos:
+        processo = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--servidor", modo, "--porta", str(args.porta)],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        args.pid = processo.pid
+        try:
+            threads = asyncio.run(medir(modo, args.porta, args))
+            print(f"  {modo:<5} threads no servidor com {args.streams} streams abertos: {threads}")
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    main()
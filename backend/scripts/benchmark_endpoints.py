@@ -0,0 +1,568 @@
+"""
+Benchmark reproduzível de todas as rotas de auth, dashboard e recurso.
+
+Para cada tamanho pedido gera (ou reaproveita) um banco SQLite sintético
+com scripts/gerar_dados.py (mesma semente, mesmos dados) e mede cada rota
+pelo test client do Flask, em um processo próprio por rota para que o pico
+de memória seja só dela. Rotas de escrita rodam sobre uma cópia do banco.
+
+Por rota: latência p50/p95/p99, vazão com um cliente, consultas SQL por
+requisição e pico de RSS do processo. O cache de
+leitura fica ligado, como em produção. O stream SSE fica de fora (ver
+scripts/benchmark_asgi.py).
+
+Com --rajada-login TAXA, mede também uma rajada concorrente de logins em
+taxa fixa (chegadas abertas: a latência conta desde o instante agendado,
+incluindo a fila), com p50/p95/p99 do login, respostas 503 do pool de hash,
+p99 de uma leitura feita durante a rajada e os percentis dos histogramas
+de fila e de cálculo do pool de hash.
+
+Os resultados podem ser gravados como baseline e comparados em execuções
+seguintes: p95 acima da tolerância ou mais consultas por requisição contam
+como regressão e o script termina com código 1.
+
+Uso (a partir de backend/):
+    python scripts/benchmark_endpoints.py --tamanhos 1000 --salvar-baseline baseline.json
+    python scripts/benchmark_endpoints.py --tamanhos 1000 --baseline baseline.json
+    python scripts/benchmark_endpoints.py --tamanhos 1000 100000 1000000 --endpoints recurso --requisicoes 100
+    python scripts/benchmark_endpoints.py --tamanhos 1000 --endpoints nenhuma --rajada-login 200 --rajada-duracao 10
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from gerar_dados import RECURSOS_MOVIMENTADOS  # noqa: E402
+
+Endpoint = namedtuple("Endpoint", "nome montar escrita fator")
+
+BUSCAS = ("bat", "gancho", "traje tat", "drone furtivo", "mk12", "sensor térmico", "capa")
+
+
+def _rota(nome, escrita=False, fator=1.0):
+    """Registra a função que monta a k-ésima requisição: (caminho, token, argumentos do test client)"""
+    def registrar(montar):
+        ENDPOINTS.append(Endpoint(nome, montar, escrita, fator))
+        return montar
+    return registrar
+
+ENDPOINTS = []
+
+# --- auth ---
+
+@_rota("POST /api/auth/login", fator=0.1)
+def _login(ctx, k):
+    return "/api/auth/login", None, {"json": {"email": "admin@wayne.com", "senha": "benchmark"}}
+
+@_rota("POST /api/auth/register", escrita=True, fator=0.1)
+def _register(ctx, k):
+    return "/api/auth/register", None, {"json": {
+        "name": f"Benchmark {k}", "cpf": f"9{k:010d}", "email": f"benchmark{k}@wayne.com", "senha": "benchmark", "cargo": "usuario"
+    }}
+
+@_rota("POST /api/auth/refresh")
+def _refresh(ctx, k):
+    return "/api/auth/refresh", ctx["refresh"], {}
+
+@_rota("POST /api/auth/logout")
+def _logout(ctx, k):
+    # Cada logout revoga o token usado: um token novo por requisição
+    return "/api/auth/logout", ctx["descartaveis"][k], {}
+
+@_rota("GET /api/auth/me")
+def _me(ctx, k):
+    return "/api/auth/me", ctx["admin"], {}
+
+@_rota("GET /api/auth/validate")
+def _validate(ctx, k):
+    return "/api/auth/validate", ctx["admin"], {}
+
+# --- dashboard ---
+
+@_rota("GET /api/dashboard/")
+def _dashboard(ctx, k):
+    return "/api/dashboard/", ctx["admin"], {}
+
+@_rota("GET /api/dashboard/stats")
+def _dashboard_stats(ctx, k):
+    return "/api/dashboard/stats", ctx["admin"], {}
+
+@_rota("GET /api/dashboard/recursos")
+def _dashboard_recursos(ctx, k):
+    return "/api/dashboard/recursos", ctx["admin"], {}
+
+@_rota("GET /api/dashboard/alertas")
+def _dashboard_alertas(ctx, k):
+    return "/api/dashboard/alertas", ctx["admin"], {}
+
+@_rota("GET /api/dashboard/alertas (usuario)")
+def _dashboard_alertas_usuario(ctx, k):
+    return "/api/dashboard/alertas", ctx["usuario"], {}
+
+@_rota("POST /api/dashboard/alertas/<id>/marcar-lido", escrita=True)
+def _marcar_lido(ctx, k):
+    return f"/api/dashboard/alertas/{ctx['rng'].randint(1, ctx['alertas'])}/marcar-lido", ctx["admin"], {}
+
+# --- recurso ---
+
+@_rota("GET /api/recurso/")
+def _listar(ctx, k):
+    return "/api/recurso/?limite=50", ctx["admin"], {}
+
+@_rota("GET /api/recurso/?cursor")
+def _listar_pagina(ctx, k):
+    from app.utils import codificar_cursor
+    ultimo = ctx["rng"].randint(1, ctx["recursos"])
+    cursor = codificar_cursor({"o": "id", "d": "asc", "v": ultimo, "id": ultimo})
+    return f"/api/recurso/?limite=50&ordenar_por=id&cursor={cursor}", ctx["admin"], {}
+
+@_rota("GET /api/recurso/?tipo&ordenar_por=quantidade")
+def _listar_filtrado(ctx, k):
+    return "/api/recurso/?tipo=arma&ordenar_por=quantidade&ordem=desc&limite=50", ctx["admin"], {}
+
+@_rota("GET /api/recurso/search")
+def _buscar(ctx, k):
+    return "/api/recurso/search", ctx["admin"], {"query_string": {"q": BUSCAS[k % len(BUSCAS)], "limite": 20}}
+
+@_rota("GET /api/recurso/<id>")
+def _obter(ctx, k):
+    return f"/api/recurso/{ctx['rng'].randint(1, ctx['recursos'])}", ctx["admin"], {}
+
+@_rota("GET /api/recurso/<id>/historico")
+def _historico(ctx, k):
+    recurso_id = ctx["rng"].randint(1, min(ctx["recursos"], RECURSOS_MOVIMENTADOS))
+    return f"/api/recurso/{recurso_id}/historico", ctx["admin"], {
+        "query_string": {"inicio": "2026-01-01T06:00:00", "fim": "2026-04-01T18:00:00", "granularidade": "dia"}
+    }
+
+@_rota("GET /api/recurso/estatisticas")
+def _estatisticas(ctx, k):
+    return "/api/recurso/estatisticas", ctx["admin"], {}
+
+@_rota("GET /api/recurso/tipos")
+def _tipos(ctx, k):
+    return "/api/recurso/tipos", ctx["admin"], {}
+
+@_rota("GET /api/recurso/criticos")
+def _criticos(ctx, k):
+    return "/api/recurso/criticos?limite=5", ctx["admin"], {}
+
+@_rota("GET /api/recurso/cache/estatisticas")
+def _cache_estatisticas(ctx, k):
+    return "/api/recurso/cache/estatisticas", ctx["admin"], {}
+
+@_rota("GET /api/recurso/export", fator=0.05)
+def _exportar(ctx, k):
+    return "/api/recurso/export?formato=ndjson&tipo=medico", ctx["admin"], {}
+
+@_rota("POST /api/recurso/", escrita=True)
+def _criar(ctx, k):
+    return "/api/recurso/", ctx["admin"], {"json": {
+        "nome": f"Benchmark {k}", "tipo": "gadget", "quantidade": k % 50, "valor_unit": 19.9
+    }}
+
+@_rota("PUT /api/recurso/<id>", escrita=True)
+def _atualizar(ctx, k):
+    return f"/api/recurso/{ctx['rng'].randint(1, ctx['recursos'])}", ctx["admin"], {
+        "json": {"quantidade": ctx["rng"].randint(0, 500), "motivo": "benchmark"}
+    }
+
+@_rota("DELETE /api/recurso/<id>", escrita=True)
+def _remover(ctx, k):
+    # Ids distintos a partir do fim: cada requisição remove um recurso existente
+    return f"/api/recurso/{ctx['recursos'] - k}", ctx["admin"], {}
+
+@_rota("POST /api/recurso/batch", escrita=True)
+def _lote(ctx, k):
+    operacoes = [{"op": "ajustar", "id": ctx["rng"].randint(1, ctx["recursos"]), "delta": 1} for _ in range(10)]
+    return "/api/recurso/batch", ctx["admin"], {"json": {"operacoes": operacoes}}
+
+@_rota("POST /api/recurso/import", escrita=True, fator=0.25)
+def _importar(ctx, k):
+    linhas = "".join(f"Importado {k}-{j},gadget,{j},9.5\n" for j in range(100))
+    return "/api/recurso/import?formato=csv", ctx["admin"], {"data": "nome,tipo,quantidade,valor_unit\n" + linhas}
+
+
+def percentil(ordenados, p):
+    """Percentil pelo posto mais próximo"""
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+def rss_pico_mb():
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_endpoint(endpoint, requisicoes, aquecimento, semente):
+    """Executado no processo filho, com DATABASE_URL já apontando para o banco"""
+    from sqlalchemy import event
+
+    from app import create_app
+    from app.database import engine
+    from app.services.jwt_service import create_tokens
+
+    app = create_app()
+    cliente = app.test_client()
+
+    banco = sqlite3.connect(os.environ["DATABASE_URL"][len("sqlite:///"):])
+    recursos = banco.execute("SELECT max(id) FROM recursos").fetchone()[0] or 0
+    alertas = banco.execute("SELECT max(id) FROM alerta").fetchone()[0] or 0
+    banco.close()
+
+    total = aquecimento + requisicoes
+    with app.app_context():
+        admin = create_tokens(1, {"name": "Bruce Wayne", "email": "admin@wayne.com", "cargo": "admin"})
+        usuario = create_tokens(3, {"name": "Lucius Fox", "email": "usuario@wayne.com", "cargo": "usuario"})
+        descartaveis = []
+        if endpoint.nome == "POST /api/auth/logout":
+            descartaveis = [create_tokens(1, {"name": "Bruce Wayne", "email": "admin@wayne.com", "cargo": "admin"})["access_token"] for _ in range(total)]
+
+    contexto = {
+        "rng": random.Random(semente),
+        "recursos": recursos,
+        "alertas": alertas,
+        "admin": admin["access_token"],
+        "refresh": admin["refresh_token"],
+        "usuario": usuario["access_token"],
+        "descartaveis": descartaveis,
+    }
+    metodo = endpoint.nome.split(" ", 1)[0]
+
+    # Contadas no engine e não pelo X-Consultas, que não inclui as consultas feitas durante um stream
+    consultas_feitas = [0]
+
+    def contar(*_):
+        consultas_feitas[0] += 1
+    event.listen(engine, "before_cursor_execute", contar)
+
+    def executar(k):
+        caminho, token, argumentos = endpoint.montar(contexto, k)
+        cabecalhos = {"Authorization": f"Bearer {token}"} if token else {}
+        consultas_feitas[0] = 0
+        inicio = time.perf_counter()
+        resposta = cliente.open(caminho, method=metodo, headers=cabecalhos, **argumentos)
+        resposta.get_data()
+        duracao = time.perf_counter() - inicio
+        return duracao, resposta.status_code, consultas_feitas[0]
+
+    for k in range(aquecimento):
+        executar(k)
+    rss_base = rss_pico_mb()
+
+    latencias, consultas, erros = [], [], 0
+    for k in range(aquecimento, total):
+        duracao, status, total_consultas = executar(k)
+        latencias.append(duracao)
+        consultas.append(total_consultas)
+        if status >= 400:
+            erros += 1
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "req_s": len(latencias) / sum(latencias),
+        "consultas_media": sum(consultas) / len(consultas),
+        "consultas_max": max(consultas),
+        "rss_pico_mb": rss_pico_mb(),
+        "rss_base_mb": rss_base,
+        "erros": erros,
+    }
+
+
+def percentil_histograma(buckets, amostras, p):
+    """Limite superior da faixa que contém o percentil (amostras por faixa, não acumuladas)"""
+    total = amostras[-1]
+    if not total:
+        return 0.0
+    alvo = math.ceil(p / 100 * total)
+    acumulado = 0
+    for limite, contagem in zip(buckets + (float("inf"),), amostras):
+        acumulado += contagem
+        if acumulado >= alvo:
+            return limite
+    return float("inf")
+
+def medir_rajada_login(taxa, duracao, clientes):
+    """
+    Executado no processo filho: logins chegando a 'taxa' por segundo durante
+    'duracao' segundos, atendidos por 'clientes' threads, e uma leitura de
+    recursos a cada 50 ms, por threads próprias, para ver se o restante da
+    API segue respondendo.
+    """
+    from app import create_app
+    from app.metricas import BUCKETS_HASH, registro
+    from app.services.jwt_service import create_tokens
+
+    app = create_app()
+    with app.app_context():
+        admin = create_tokens(1, {"name": "Bruce Wayne", "email": "admin@wayne.com", "cargo": "admin"})["access_token"]
+    local = threading.local()
+
+    def cliente():
+        if not hasattr(local, "cliente"):
+            local.cliente = app.test_client()
+        return local.cliente
+
+    def enviar(agendado, caminho, argumentos):
+        resposta = cliente().open(caminho, **argumentos)
+        resposta.get_data()
+        # Desde o instante agendado: um atraso no envio (clientes ocupados) também conta
+        return time.perf_counter() - agendado, resposta.status_code
+
+    login = {"method": "POST", "json": {"email": "admin@wayne.com", "senha": "benchmark"}}
+    leitura = {"method": "GET", "headers": {"Authorization": f"Bearer {admin}"}}
+    enviar(time.perf_counter(), "/api/auth/login", login)
+    enviar(time.perf_counter(), "/api/recurso/?limite=50", leitura)
+
+    chegadas = [(i / taxa, "/api/auth/login", login) for i in range(int(taxa * duracao))]
+    chegadas += [(i * 0.05, "/api/recurso/?limite=50", leitura) for i in range(int(duracao / 0.05))]
+    chegadas.sort(key=lambda chegada: chegada[0])
+
+    futuros = []
+    with ThreadPoolExecutor(max_workers=clientes) as logins, ThreadPoolExecutor(max_workers=4) as leituras:
+        inicio = time.perf_counter()
+        for deslocamento, caminho, argumentos in chegadas:
+            agendado = inicio + deslocamento
+            espera = agendado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            executor = logins if caminho == "/api/auth/login" else leituras
+            futuros.append((caminho, executor.submit(enviar, agendado, caminho, argumentos)))
+        envio = time.perf_counter() - inicio
+    decorrido = time.perf_counter() - inicio
+
+    latencias = {"login": [], "leitura": []}
+    status = Counter()
+    for caminho, futuro in futuros:
+        duracao_requisicao, codigo = futuro.result()
+        if caminho == "/api/auth/login":
+            latencias["login"].append(duracao_requisicao)
+            status[str(codigo)] += 1
+        else:
+            latencias["leitura"].append(duracao_requisicao)
+    for valores in latencias.values():
+        valores.sort()
+
+    histogramas = {nome: amostras for nome, _, amostras in registro.instantaneo()["histogramas"]}
+    resultado = {
+        "taxa_alvo": taxa,
+        "taxa_enviada": len(latencias["login"]) / envio,
+        "vazao": len(latencias["login"]) / decorrido,
+        "logins": len(latencias["login"]),
+        "status": dict(status),
+        "login_p50_ms": percentil(latencias["login"], 50) * 1000,
+        "login_p95_ms": percentil(latencias["login"], 95) * 1000,
+        "login_p99_ms": percentil(latencias["login"], 99) * 1000,
+        "leitura_p99_ms": percentil(latencias["leitura"], 99) * 1000,
+    }
+    for nome in ("espera", "execucao"):
+        amostras = histogramas.get(f"wayne_hash_senha_{nome}_segundos")
+        for p in (50, 99):
+            resultado[f"hash_{nome}_p{p}_ms"] = percentil_histograma(BUCKETS_HASH, amostras, p) * 1000 if amostras else 0.0
+    return resultado
+
+def ambiente(banco):
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite:///{banco}",
+        READ_DATABASE_URL="",
+        TAREFAS_ATIVAS="false",
+        CACHE_URL="memoria://",
+        # O limitador de login barraria as repetições do benchmark
+        LOGIN_IP_CAPACIDADE="1000000",
+        LOGIN_CONTA_CAPACIDADE="1000000",
+    )
+    return env
+
+def preparar_banco(diretorio, tamanho, semente):
+    """Banco sintético do tamanho pedido, gerado uma vez e reaproveitado nas execuções seguintes"""
+    # A versão do esquema entra no nome: uma migração nova gera outro banco
+    versao = max(nome.split("_", 1)[0][1:] for nome in os.listdir(os.path.join(BACKEND, "app", "migracoes")) if nome.startswith("v0"))
+    caminho = os.path.join(diretorio, f"dados_{tamanho}_s{semente}_v{versao}.db")
+    if not os.path.exists(caminho):
+        parcial = caminho + ".gerando"
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        print(f"Gerando {caminho}...")
+        subprocess.run(
+            [sys.executable, os.path.join(BACKEND, "scripts", "gerar_dados.py"),
+             "--saida", parcial, "--recursos", str(tamanho), "--semente", str(semente)],
+            cwd=BACKEND, check=True
+        )
+        os.replace(parcial, caminho)
+    return caminho
+
+def executar_endpoint(endpoint, banco, args):
+    with tempfile.TemporaryDirectory(prefix="benchmark_endpoints_") as temporario:
+        if endpoint.escrita:
+            copia = os.path.join(temporario, "dados.db")
+            shutil.copyfile(banco, copia)
+            banco = copia
+
+        requisicoes = max(5, int(args.requisicoes * endpoint.fator))
+        processo = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--medir", endpoint.nome,
+             "--requisicoes", str(requisicoes), "--aquecimento", str(args.aquecimento), "--semente", str(args.semente)],
+            cwd=BACKEND, env=ambiente(banco), capture_output=True, text=True
+        )
+    if processo.returncode != 0:
+        raise RuntimeError(f"{endpoint.nome} falhou:\n{processo.stderr[-2000:]}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def executar_rajada(banco, args):
+    processo = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--medir-rajada",
+         "--rajada-login", str(args.rajada_login), "--rajada-duracao", str(args.rajada_duracao),
+         "--rajada-clientes", str(args.rajada_clientes)],
+        cwd=BACKEND, env=ambiente(banco), capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"rajada de login falhou:\n{processo.stderr[-2000:]}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+def imprimir_rajada(resultado):
+    status = ", ".join(f"{codigo}: {total}" for codigo, total in sorted(resultado["status"].items()))
+    print(
+        f"  rajada de login: {resultado['logins']} logins enviados a {resultado['taxa_enviada']:.0f}/s "
+        f"(alvo {resultado['taxa_alvo']:.0f}/s), atendidos a {resultado['vazao']:.0f}/s  status {status}\n"
+        f"    login p50 {resultado['login_p50_ms']:.1f}  p95 {resultado['login_p95_ms']:.1f}  p99 {resultado['login_p99_ms']:.1f} ms"
+        f"   leitura durante a rajada p99 {resultado['leitura_p99_ms']:.1f} ms\n"
+        f"    pool de hash (limite da faixa): fila p50 <= {resultado['hash_espera_p50_ms']:g}  p99 <= {resultado['hash_espera_p99_ms']:g} ms"
+        f"   cálculo p50 <= {resultado['hash_execucao_p50_ms']:g}  p99 <= {resultado['hash_execucao_p99_ms']:g} ms"
+    )
+
+
+def descrever_ambiente():
+    import sqlalchemy
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "sqlalchemy": sqlalchemy.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def comparar(resultado, anterior, tolerancia):
+    """Variação do p95 e regressões encontradas em relação ao baseline"""
+    if not anterior:
+        return "", []
+    regressoes = []
+    variacao = resultado["p95_ms"] / anterior["p95_ms"] - 1 if anterior["p95_ms"] else 0.0
+    if variacao > tolerancia:
+        regressoes.append(f"p95 {anterior['p95_ms']:.2f} -> {resultado['p95_ms']:.2f} ms")
+    if resultado["consultas_media"] > anterior["consultas_media"] + 1e-9:
+        regressoes.append(f"consultas {anterior['consultas_media']:.1f} -> {resultado['consultas_media']:.1f}")
+    return f"{variacao:+.0%}", regressoes
+
+def imprimir_cabecalho():
+    print(
+        f"  {'rota':<50} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'consultas':>9} {'rss MB':>7} {'Δp95':>6}"
+    )
+
+def imprimir(nome, resultado, variacao):
+    print(
+        f"  {nome:<50} {resultado['p50_ms']:8.2f} {resultado['p95_ms']:8.2f} {resultado['p99_ms']:8.2f}"
+        f" {resultado['req_s']:8.1f} {resultado['consultas_media']:9.1f} {resultado['rss_pico_mb']:7.0f} {variacao:>6}"
+        + (f"  erros {resultado['erros']}" if resultado["erros"] else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 100000, 1000000], help="recursos e alertas por banco")
+    parser.add_argument("--endpoints", nargs="+", help="mede só as rotas que contêm algum destes trechos")
+    parser.add_argument("--requisicoes", type=int, default=200, help="por rota (rotas caras usam uma fração)")
+    parser.add_argument("--aquecimento", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--dados", default=os.path.join(tempfile.gettempdir(), "wayne_benchmark"), help="onde guardar os bancos gerados")
+    parser.add_argument("--baseline", help="arquivo JSON de uma execução anterior para comparação")
+    parser.add_argument("--salvar-baseline", help="grava os resultados desta execução neste arquivo")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento de p95 aceito antes de apontar regressão")
+    parser.add_argument("--rajada-login", type=float, help="mede também uma rajada concorrente de logins nesta taxa (req/s)")
+    parser.add_argument("--rajada-duracao", type=float, default=10, help="segundos de rajada")
+    parser.add_argument("--rajada-clientes", type=int, default=128, help="threads clientes da rajada (acima de workers + fila do pool de hash, para exercitar o 503)")
+    parser.add_argument("--medir", help=argparse.SUPPRESS)
+    parser.add_argument("--medir-rajada", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir_rajada:
+        print(json.dumps(medir_rajada_login(args.rajada_login, args.rajada_duracao, args.rajada_clientes)))
+        return
+
+    if args.medir:
+        endpoint = next(endpoint for endpoint in ENDPOINTS if endpoint.nome == args.medir)
+        print(json.dumps(medir_endpoint(endpoint, args.requisicoes, args.aquecimento, args.semente)))
+        return
+
+    endpoints = [
+        endpoint for endpoint in ENDPOINTS
+        if not args.endpoints or any(trecho in endpoint.nome for trecho in args.endpoints)
+    ]
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            baseline = json.load(arquivo)
+        if baseline.get("ambiente") != descrever_ambiente():
+            print(f"Aviso: baseline medido em outro ambiente: {baseline.get('ambiente')}")
+
+    os.makedirs(args.dados, exist_ok=True)
+    resultados = {}
+    regressoes = []
+
+    for tamanho in args.tamanhos:
+        banco = preparar_banco(args.dados, tamanho, args.semente)
+        anteriores = baseline.get("resultados", {}).get(str(tamanho), {})
+        resultados[str(tamanho)] = {}
+
+        print(f"\n{tamanho} recursos / {tamanho} alertas (latências em ms)")
+        imprimir_cabecalho()
+        for endpoint in endpoints:
+            resultado = executar_endpoint(endpoint, banco, args)
+            resultados[str(tamanho)][endpoint.nome] = resultado
+            variacao, encontradas = comparar(resultado, anteriores.get(endpoint.nome), args.tolerancia)
+            regressoes += [f"{tamanho} {endpoint.nome}: {regressao}" for regressao in encontradas]
+            imprimir(endpoint.nome, resultado, variacao)
+
+        if args.rajada_login:
+            rajada = executar_rajada(banco, args)
+            resultados[str(tamanho)]["rajada POST /api/auth/login"] = rajada
+            imprimir_rajada(rajada)
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w") as arquivo:
+            json.dump({
+                "ambiente": descrever_ambiente(),
+                "parametros": {"requisicoes": args.requisicoes, "aquecimento": args.aquecimento, "semente": args.semente},
+                "resultados": resultados,
+            }, arquivo, indent=2, sort_keys=True)
+        print(f"\nBaseline gravado em {args.salvar_baseline}")
+
+    if args.baseline:
+        if regressoes:
+            print(f"\n{len(regressoes)} regressões (tolerância de p95: {args.tolerancia:.0%}):")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            sys.exit(1)
+        print("\nSem regressões em relação ao baseline")
+
+
+if __name__ == "__main__":
+    main()
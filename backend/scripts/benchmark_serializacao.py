@@ -0,0 +1,129 @@
+"""
+Compara a serialização das respostas JSON grandes.
+
+Popula um banco SQLite temporário com recursos e mede, para uma página da
+listagem e para o inventário inteiro, o tempo de montar o corpo da resposta:
+  - padrao: json da biblioteca padrão com as datas convertidas por isoformat()
+  - orjson: provedor rápido com datetime serializado nativamente
+Também mostra o tamanho do corpo sem compressão, com gzip e com brotli
+(se o pacote estiver instalado).
+
+Uso (a partir de backend/):
+    python scripts/benchmark_serializacao.py
+    python scripts/benchmark_serializacao.py --recursos 20000 --repeticoes 50
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_diretorio = tempfile.mkdtemp(prefix="benchmark_serializacao_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_diretorio, 'benchmark.db')}"
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["TAREFAS_ATIVAS"] = "false"
+os.environ["CACHE_URL"] = "memoria://"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.compressao import brotli  # noqa: E402
+from app.config import COMPRESSAO_NIVEL_GZIP, COMPRESSAO_QUALIDADE_BROTLI  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.migracoes import aplicar_migracoes  # noqa: E402
+from app.models import Recurso  # noqa: E402
+from app.serializacao import ProvedorJSONPadrao, ProvedorJSONRapido, orjson  # noqa: E402
+from app.services.recurso_service import serializar_recurso  # noqa: E402
+
+TIPOS = ("arma", "veiculo", "equipamento", "gadget", "traje")
+
+
+def popular(total):
+    agora = datetime.utcnow()
+    linhas = [
+        {
+            "nome": f"Recurso {i:06d}",
+            "tipo": TIPOS[i % len(TIPOS)],
+            "quantidade": i % 120,
+            "valor_unit": round(10 + (i % 997) * 1.37, 2),
+            "created_at": agora - timedelta(minutes=i),
+            "updated_at": agora - timedelta(seconds=i) if i % 3 else None,
+        }
+        for i in range(total)
+    ]
+    with SessionLocal() as db:
+        db.execute(insert(Recurso), linhas)
+        db.commit()
+
+
+def serializar_legado(recurso):
+    """Forma anterior: datas convertidas em str antes do encoder"""
+    dados = serializar_recurso(recurso)
+    for campo in ("created_at", "updated_at"):
+        if dados[campo] is not None:
+            dados[campo] = dados[campo].isoformat()
+    return dados
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def comparar(app, nome, recursos, repeticoes):
+    provedores = {"padrao": ProvedorJSONPadrao(app)}
+    if orjson is not None:
+        provedores["orjson"] = ProvedorJSONRapido(app)
+    serializadores = {"padrao": serializar_legado, "orjson": serializar_recurso}
+
+    print(f"\n{nome} ({len(recursos)} recursos)")
+    corpos = {}
+    for chave, provedor in provedores.items():
+        serializar = serializadores[chave]
+
+        def montar():
+            return provedor.response({"data": [serializar(r) for r in recursos], "next_cursor": None}).get_data()
+
+        corpos[chave] = montar()
+        print(f"  {chave:<7} {medir(montar, repeticoes):9.2f} ms")
+
+    corpo = corpos.get("orjson", corpos["padrao"])
+    tamanhos = [f"bruto {len(corpo)} B", f"gzip {len(gzip.compress(corpo, COMPRESSAO_NIVEL_GZIP))} B"]
+    if brotli is not None:
+        tamanhos.append(f"br {len(brotli.compress(corpo, quality=COMPRESSAO_QUALIDADE_BROTLI))} B")
+    print(f"  tamanho: {', '.join(tamanhos)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recursos", type=int, default=5000)
+    parser.add_argument("--pagina", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    aplicar_migracoes(engine)
+    popular(args.recursos)
+    app = create_app()
+
+    with app.app_context(), SessionLocal() as db:
+        recursos = db.query(Recurso).order_by(Recurso.id).all()
+        comparar(app, "Página da listagem", recursos[:args.pagina], args.repeticoes)
+        comparar(app, "Inventário completo", recursos, args.repeticoes)
+
+    if orjson is None:
+        print("\norjson não instalado: apenas o provedor padrão foi medido")
+    if brotli is None:
+        print("brotli não instalado: as respostas usam gzip")
+
+
+if __name__ == "__main__":
+    main()
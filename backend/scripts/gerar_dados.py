@@ -0,0 +1,229 @@
+"""
+Gera um banco SQLite sintético e determinístico para benchmarks.
+
+A mesma semente produz sempre os mesmos usuários, recursos, alertas e
+movimentações de estoque (datas fixas a partir de 2026-01-01, sem depender
+do relógio). O esquema vem das migrações; as linhas são gravadas com
+INSERT em lote e os contadores do dashboard são reconciliados no final.
+
+Usuários criados (senha "benchmark"): admin@wayne.com, gerente@wayne.com,
+usuario@wayne.com e usuario<N>@wayne.com.
+
+Uso (a partir de backend/):
+    python scripts/gerar_dados.py --saida /tmp/dados.db --recursos 100000
+    python scripts/gerar_dados.py --saida /tmp/dados.db --recursos 1000000 --alertas 1000000 --semente 7
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+INICIO = datetime(2026, 1, 1)
+SENHA = "benchmark"
+LOTE = 10000
+
+TIPOS = ("arma", "veiculo", "equipamento", "gadget", "traje", "sensor", "comunicacao", "medico")
+OBJETOS = (
+    "Batarang", "Gancho", "Traje", "Drone", "Capa", "Sensor", "Lançador", "Escudo",
+    "Bota", "Luva", "Radar", "Cinto", "Granada", "Máscara", "Rádio", "Kit",
+)
+QUALIFICADORES = (
+    "tático", "blindado", "explosivo", "magnético", "furtivo", "reforçado",
+    "térmico", "sônico", "leve", "noturno", "compacto", "avançado",
+)
+TITULOS_ALERTA = ("Estoque baixo", "Estoque esgotado", "Manutenção pendente", "Acesso suspeito", "Inventário divergente")
+STATUS_ALERTA = (("pendente", 40), ("nao_lido", 25), ("lido", 20), ("resolvido", 15))
+PRIORIDADES = (("baixa", 40), ("media", 30), ("alta", 20), ("critica", 10))
+
+# Recursos com histórico além do saldo de abertura, e movimentações de cada um
+RECURSOS_MOVIMENTADOS = 10000
+MOVIMENTOS_POR_RECURSO = 20
+DIAS_DE_HISTORICO = 90
+
+
+def _em_lotes(linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def _escolher(rng, opcoes):
+    valores, pesos = zip(*opcoes)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def gerar_usuarios(rng, total, senha_hash):
+    cargos = (("admin", "Bruce Wayne"), ("gerente", "Alfred Pennyworth"), ("usuario", "Lucius Fox"))
+    usuarios = [
+        {"name": nome, "email": f"{cargo}@wayne.com", "cpf": f"{indice:011d}", "cargo": cargo}
+        for indice, (cargo, nome) in enumerate(cargos, start=1)
+    ]
+    for indice in range(len(cargos) + 1, total + 1):
+        cargo = "gerente" if rng.random() < 0.1 else "usuario"
+        usuarios.append({"name": f"Usuário {indice}", "email": f"usuario{indice}@wayne.com", "cpf": f"{indice:011d}", "cargo": cargo})
+
+    for indice, usuario in enumerate(usuarios):
+        usuario.update(senha_hash=senha_hash, created_at=INICIO + timedelta(minutes=indice))
+    return usuarios
+
+
+def gerar_estoque(rng, total):
+    """
+    Recursos e suas movimentações, em blocos de LOTE recursos para não montar
+    tudo em memória. A quantidade final de cada recurso é o saldo após a última
+    movimentação, como se o histórico tivesse sido gravado pela aplicação.
+    Gera (recursos, movimentos, agregados_hora, agregados_dia) por bloco.
+    """
+    recursos = []
+    movimentos = []
+    por_hora = {}
+    por_dia = {}
+
+    def movimentar(recurso_id, quando, delta, saldo, motivo):
+        movimentos.append({
+            "recurso_id": recurso_id, "delta": delta, "quantidade": saldo,
+            "usuario_id": 1, "motivo": motivo, "criado_em": quando
+        })
+        for agregados, periodo in (
+            (por_hora, quando.replace(minute=0, second=0, microsecond=0)),
+            (por_dia, quando.replace(hour=0, minute=0, second=0, microsecond=0)),
+        ):
+            linha = agregados.setdefault((recurso_id, periodo), {
+                "recurso_id": recurso_id, "periodo": periodo, "entradas": 0, "saidas": 0, "movimentos": 0
+            })
+            linha["entradas"] += max(delta, 0)
+            linha["saidas"] += max(-delta, 0)
+            linha["movimentos"] += 1
+            linha["saldo_final"] = saldo
+
+    for recurso_id in range(1, total + 1):
+        # Cerca de 10% dos recursos abaixo do estoque mínimo, como em um inventário real
+        saldo = rng.randint(0, 9) if rng.random() < 0.1 else rng.randint(10, 500)
+        criado_em = INICIO + timedelta(seconds=recurso_id)
+        if saldo:
+            movimentar(recurso_id, criado_em, saldo, saldo, "criacao")
+
+        if recurso_id <= RECURSOS_MOVIMENTADOS:
+            instantes = sorted(rng.randrange(DIAS_DE_HISTORICO * 86400) for _ in range(MOVIMENTOS_POR_RECURSO))
+            for segundos in instantes:
+                delta = rng.randint(-min(saldo, 30), 40) or 1
+                saldo += delta
+                movimentar(recurso_id, criado_em + timedelta(seconds=segundos), delta, saldo, rng.choice(("ajuste", "edicao", "importacao")))
+
+        recursos.append({
+            "id": recurso_id,
+            "nome": f"{rng.choice(OBJETOS)} {rng.choice(QUALIFICADORES)} MK{recurso_id}",
+            "tipo": rng.choice(TIPOS),
+            "quantidade": saldo,
+            "valor_unit": round(rng.uniform(5, 5000), 2),
+            "created_at": criado_em,
+        })
+
+        # Os agregados são por recurso: um bloco fechado não recebe mais movimentações
+        if len(recursos) >= LOTE or recurso_id == total:
+            yield recursos, movimentos, list(por_hora.values()), list(por_dia.values())
+            recursos, movimentos, por_hora, por_dia = [], [], {}, {}
+
+
+def gerar_alertas(rng, total, total_recursos, total_usuarios):
+    for indice in range(1, total + 1):
+        # Um terço dos alertas é geral (sem usuário); os demais se concentram nos primeiros usuários
+        usuario_id = None if rng.random() < 0.3 else min(int(rng.expovariate(0.2)) + 1, total_usuarios)
+        criado_em = INICIO + timedelta(seconds=indice * 7)
+        yield {
+            "titulo": rng.choice(TITULOS_ALERTA),
+            "descricao": f"Verificação automática #{indice}",
+            "status": _escolher(rng, STATUS_ALERTA),
+            "prioridade": _escolher(rng, PRIORIDADES),
+            "usuario_id": usuario_id,
+            "recurso_id": rng.randint(1, total_recursos) if total_recursos and rng.random() < 0.8 else None,
+            "criado_em": criado_em,
+            "atualizado_em": criado_em,
+        }
+
+
+def gerar_banco(recursos, alertas, usuarios, semente):
+    """Popula o banco de DATABASE_URL; deve ser chamado com o esquema vazio"""
+    from sqlalchemy import insert
+
+    from app.database import SessionLocal, engine
+    from app.migracoes import aplicar_migracoes
+    from app.models import Alerta, MovimentoEstoque, MovimentoPorDia, MovimentoPorHora, Recurso, Usuario
+    from app.services.contadores_service import reconciliar_contadores
+    from app.utils import set_senha
+
+    aplicar_migracoes(engine)
+    rng = random.Random(semente)
+    tempos = {}
+
+    inicio = time.perf_counter()
+    linhas_usuarios = gerar_usuarios(rng, usuarios, set_senha(SENHA))
+    total_movimentos = 0
+
+    # Conexão direta: os INSERTs em lote não passam pelos listeners da sessão
+    with engine.begin() as conexao:
+        conexao.execute(insert(Usuario.__table__), linhas_usuarios)
+        for bloco in gerar_estoque(rng, recursos):
+            for modelo, linhas in zip((Recurso, MovimentoEstoque, MovimentoPorHora, MovimentoPorDia), bloco):
+                for lote in _em_lotes(linhas):
+                    conexao.execute(insert(modelo.__table__), lote)
+            total_movimentos += len(bloco[1])
+        for lote in _em_lotes(gerar_alertas(rng, alertas, recursos, usuarios)):
+            conexao.execute(insert(Alerta.__table__), lote)
+    tempos["insercao"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        reconciliar_contadores(db)
+    with engine.connect() as conexao:
+        conexao.exec_driver_sql("ANALYZE")
+    tempos["contadores"] = time.perf_counter() - inicio
+
+    engine.dispose()
+    return {
+        "usuarios": len(linhas_usuarios),
+        "recursos": recursos,
+        "alertas": alertas,
+        "movimentos": total_movimentos,
+        "tempos": tempos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saida", required=True, help="arquivo SQLite a criar (não pode existir)")
+    parser.add_argument("--recursos", type=int, default=1000)
+    parser.add_argument("--alertas", type=int, help="padrão: o mesmo número de recursos")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.saida):
+        raise SystemExit(f"{args.saida} já existe")
+
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.abspath(args.saida)}",
+        READ_DATABASE_URL="",
+        TAREFAS_ATIVAS="false",
+        CACHE_URL="memoria://",
+    )
+    resumo = gerar_banco(args.recursos, args.recursos if args.alertas is None else args.alertas, max(args.usuarios, 3), args.semente)
+
+    print(
+        f"{resumo['usuarios']} usuários, {resumo['recursos']} recursos, {resumo['alertas']} alertas, "
+        f"{resumo['movimentos']} movimentações em {args.saida}"
+    )
+    print("  " + ", ".join(f"{etapa} {segundos:.1f}s" for etapa, segundos in resumo["tempos"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Aplica as migrações versionadas do esquema (app/migracoes).
+
+Uso (a partir de backend/):
+    python scripts/migrar.py              # aplica as pendentes
+    python scripts/migrar.py --status     # lista aplicadas e pendentes
+    python scripts/migrar.py --ate 2      # aplica somente até a versão 2
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine  # noqa: E402
+from app.migracoes import aplicar_migracoes, listar_migracoes, pendentes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="mostra o estado sem aplicar nada")
+    parser.add_argument("--ate", type=int, help="versão máxima a aplicar")
+    args = parser.parse_args()
+
+    if args.status:
+        faltando = {versao for versao, _, _ in pendentes(engine)}
+        for versao, nome, _ in listar_migracoes():
+            print(f"{'pendente ' if versao in faltando else 'aplicada '} {nome}")
+        return
+
+    aplicadas = aplicar_migracoes(engine, ate=args.ate)
+    for nome in aplicadas:
+        print(f"Aplicada: {nome}")
+    if not aplicadas:
+        print("Esquema já está atualizado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Mantém uma réplica SQLite local em sincronia com o banco primário.
+
+Uso (a partir de backend/):
+    python scripts/sincronizar_replica.py --intervalo 2
+    DATABASE_URL=sqlite:///app.db READ_DATABASE_URL=sqlite:///replica.db python scripts/sincronizar_replica.py --uma-vez
+
+Usa a API de backup online do SQLite, que copia um snapshot consistente
+mesmo com o primário recebendo escritas.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import DATABASE_URL, READ_DATABASE_URL  # noqa: E402
+
+
+def caminho_sqlite(url):
+    if not url or not url.startswith("sqlite:///"):
+        raise SystemExit(f"Somente URLs sqlite:/// de arquivo são suportadas: {url}")
+    return url[len("sqlite:///"):]
+
+
+def sincronizar(origem, destino):
+    inicio = time.perf_counter()
+    conexao_origem = sqlite3.connect(origem, timeout=30)
+    conexao_destino = sqlite3.connect(destino, timeout=30)
+    try:
+        conexao_origem.backup(conexao_destino)
+    finally:
+        conexao_destino.close()
+        conexao_origem.close()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origem", default=DATABASE_URL, help="URL do banco primário")
+    parser.add_argument("--destino", default=READ_DATABASE_URL, help="URL da réplica de leitura")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="segundos entre cópias")
+    parser.add_argument("--uma-vez", action="store_true", help="copia uma vez e sai")
+    args = parser.parse_args()
+
+    origem = caminho_sqlite(args.origem)
+    destino = caminho_sqlite(args.destino)
+
+    while True:
+        duracao = sincronizar(origem, destino)
+        print(f"Réplica {destino} sincronizada a partir de {origem} em {duracao * 1000:.1f} ms")
+        if args.uma_vez:
+            break
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()
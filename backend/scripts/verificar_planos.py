@@ -0,0 +1,207 @@
+"""
+Verifica os planos de execução das consultas da aplicação.
+
+Cria um banco SQLite temporário com as migrações, exercita as rotas e as
+tarefas periódicas, captura cada instrução emitida e roda EXPLAIN QUERY PLAN
+sobre ela. Termina com código 1 se alguma fizer varredura completa de tabela
+(SCAN <tabela> sem índice).
+
+Uso (a partir de backend/):
+    python scripts/verificar_planos.py
+    python scripts/verificar_planos.py --verbose   # imprime todos os planos
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_diretorio = tempfile.mkdtemp(prefix="verificar_planos_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_diretorio, 'planos.db')}"
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["TAREFAS_ATIVAS"] = "false"
+os.environ["CACHE_URL"] = "memoria://"
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.database import engine, get_db  # noqa: E402
+from app.migracoes import aplicar_migracoes  # noqa: E402
+from app.models import Alerta  # noqa: E402
+
+# Tabelas pequenas e limitadas por construção, em que a varredura é aceitável
+VARREDURA_PERMITIDA = {
+    "versao_esquema": "uma linha por migração",
+}
+
+VARREDURA_COMPLETA = re.compile(r"^SCAN (\w+)$")
+# Subconsultas (ex.: ramos já limitados de um UNION ALL) percorridas pela consulta externa
+SUBCONSULTA = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)$")
+INSTRUCOES_VERIFICADAS = ("SELECT", "UPDATE", "DELETE", "INSERT INTO alerta (titulo")
+
+
+def capturar_instrucoes():
+    instrucoes = {}
+
+    def _capturar(conexao, cursor, instrucao, parametros, contexto, executemany):
+        if not executemany and instrucao.lstrip().upper().startswith(tuple(p.upper() for p in INSTRUCOES_VERIFICADAS)):
+            instrucoes.setdefault(instrucao, parametros)
+
+    event.listen(engine, "before_cursor_execute", _capturar)
+    return instrucoes
+
+
+def exercitar_aplicacao(app):
+    """Percorre as rotas e tarefas cujas consultas devem usar índices"""
+    cliente = app.test_client()
+
+    resposta = cliente.post("/api/auth/register", json={
+        "name": "Admin", "cpf": "1", "email": "admin@wayne.com", "senha": "123456", "cargo": "admin"
+    })
+    cabecalhos = {"Authorization": f"Bearer {resposta.json['token']}"}
+    cliente.post("/api/auth/register", json={
+        "name": "Usuario", "cpf": "2", "email": "usuario@wayne.com", "senha": "123456", "cargo": "usuario"
+    })
+    resposta = cliente.post("/api/auth/register", json={
+        "name": "Gerente", "cpf": "3", "email": "gerente@wayne.com", "senha": "123456", "cargo": "gerente"
+    })
+    cabecalhos_gerente = {"Authorization": f"Bearer {resposta.json['token']}"}
+    cliente.post("/api/auth/login", json={"email": "admin@wayne.com", "senha": "123456"})
+
+    for i in range(30):
+        cliente.post("/api/recurso/", headers=cabecalhos, json={
+            "nome": f"Recurso {i}", "tipo": ["veiculo", "arma", "equipamento"][i % 3],
+            "quantidade": i, "valor_unit": 10.0
+        })
+
+    cliente.post("/api/recurso/import", headers=cabecalhos, content_type="text/csv", data=(
+        "nome,tipo,quantidade,valor_unit\nRecurso 1,arma,40,12.5\nImportado,drone,2,99\n"
+    ))
+    cliente.get("/api/recurso/export?formato=ndjson&tipo=arma", headers=cabecalhos)
+
+    cliente.put("/api/recurso/2", headers=cabecalhos, json={"nome": "Recurso renomeado", "quantidade": 20})
+    cliente.delete("/api/recurso/3", headers=cabecalhos)
+    cliente.post("/api/recurso/batch", headers=cabecalhos, json={"motivo": "inventario", "operacoes": [
+        {"op": "ajustar", "id": 4, "delta": 5}, {"op": "ajustar", "id": 4, "delta": -2}
+    ]})
+
+    # Histórico de estoque: por hora, por dia e por dia com bordas lidas do agregado por hora
+    for consulta in ("", "?granularidade=hora", "?inicio=2020-01-01T10:00:00&granularidade=dia"):
+        cliente.get(f"/api/recurso/4/historico{consulta}", headers=cabecalhos)
+
+    proxima = "/api/recurso/?limite=5"
+    while proxima:
+        resposta = cliente.get(proxima, headers=cabecalhos)
+        cursor = resposta.json.get("next_cursor")
+        proxima = f"/api/recurso/?limite=5&cursor={cursor}" if cursor else None
+
+    for consulta in (
+        "?ordenar_por=quantidade&ordem=desc&limite=5",
+        "?ordenar_por=nome&limite=5",
+        "?tipo=arma&limite=5",
+        "?nome=Recurso%201&limite=5",
+        "?quantidade_min=5&quantidade_max=9",
+    ):
+        cliente.get(f"/api/recurso/{consulta}", headers=cabecalhos)
+
+    # Busca textual: por relevância, paginada, e ordenada por id acima do limite de relevância
+    from app.services import recurso_service
+    resposta = cliente.get("/api/recurso/search?q=recurso&limite=5", headers=cabecalhos)
+    cliente.get(f"/api/recurso/search?q=recurso&limite=5&cursor={resposta.json['next_cursor']}", headers=cabecalhos)
+    limite_relevancia = recurso_service.BUSCA_LIMITE_RELEVANCIA
+    recurso_service.BUSCA_LIMITE_RELEVANCIA = 3
+    resposta = cliente.get("/api/recurso/search?q=recurso&limite=5", headers=cabecalhos)
+    cliente.get(f"/api/recurso/search?q=recurso&limite=5&cursor={resposta.json['next_cursor']}", headers=cabecalhos)
+    recurso_service.BUSCA_LIMITE_RELEVANCIA = limite_relevancia
+
+    for rota in (
+        "/api/recurso/1",
+        "/api/recurso/estatisticas",
+        "/api/recurso/tipos",
+        "/api/recurso/criticos?limite=5",
+        "/api/dashboard/",
+        "/api/dashboard/stats",
+        "/api/dashboard/recursos",
+        "/api/dashboard/alertas",
+        "/api/auth/me",
+    ):
+        cliente.get(rota, headers=cabecalhos)
+
+    cliente.post("/api/dashboard/alertas/1/marcar-lido", headers=cabecalhos)
+    # Dashboard do gerente: contadores por tipo lidos por intervalo da chave
+    cliente.get("/api/dashboard/", headers=cabecalhos_gerente)
+
+    from app.services.contadores_service import reconciliar_contadores
+    from app.services.dashboard_service import create_automatic_alerts
+
+    with app.app_context():
+        create_automatic_alerts(get_db())
+    with app.app_context():
+        reconciliar_contadores(get_db())
+
+    # Feed de alertas: páginas por cursor e filtros, como admin e como usuário
+    with app.app_context():
+        db = get_db()
+        db.add_all([
+            Alerta(titulo=f"Alerta {i}", usuario_id=2 if i % 2 else None, recurso_id=i % 5 + 1,
+                   status=["pendente", "lido"][i % 2], prioridade=["baixa", "critica"][i % 2])
+            for i in range(12)
+        ])
+        db.commit()
+
+    resposta = cliente.post("/api/auth/login", json={"email": "usuario@wayne.com", "senha": "123456"})
+    for token in (cabecalhos, {"Authorization": f"Bearer {resposta.json['token']}"}):
+        for consulta in ("?limite=5", "?status=pendente&limite=5", "?prioridade=critica", "?recurso_id=2"):
+            proxima = f"/api/dashboard/alertas{consulta}"
+            while proxima:
+                cursor = cliente.get(proxima, headers=token).json.get("next_cursor")
+                proxima = f"/api/dashboard/alertas{consulta}&cursor={cursor}" if cursor else None
+
+
+def verificar_planos(instrucoes, verbose=False):
+    problemas = []
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        for instrucao, parametros in instrucoes.items():
+            plano = [linha[3] for linha in cursor.execute(f"EXPLAIN QUERY PLAN {instrucao}", parametros or ())]
+            subconsultas = {encontrada.group(1) for linha in plano if (encontrada := SUBCONSULTA.match(linha))}
+            varreduras = [
+                linha for linha in plano
+                if (encontrada := VARREDURA_COMPLETA.match(linha))
+                and encontrada.group(1) not in VARREDURA_PERMITIDA
+                and encontrada.group(1) not in subconsultas
+            ]
+
+            if verbose or varreduras:
+                print(" ".join(instrucao.split()))
+                for linha in plano:
+                    print(f"    {linha}")
+            if varreduras:
+                problemas.append((instrucao, varreduras))
+    finally:
+        conexao.close()
+
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="imprime o plano de todas as instruções")
+    args = parser.parse_args()
+
+    aplicar_migracoes(engine)
+    app = create_app()
+
+    instrucoes = capturar_instrucoes()
+    exercitar_aplicacao(app)
+
+    problemas = verificar_planos(instrucoes, verbose=args.verbose)
+    print(f"\n{len(instrucoes)} instruções verificadas, {len(problemas)} com varredura completa de tabela")
+    sys.exit(1 if problemas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# O engine é criado na importação de app.database: o banco de teste vem antes de qualquer import da aplicação
+_diretorio = tempfile.mkdtemp(prefix="wayne_testes_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_diretorio, 'testes.db')}"
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["TAREFAS_ATIVAS"] = "false"
+os.environ["CACHE_URL"] = "memoria://"
+os.environ["REVOGACAO_URL"] = "memoria://"
+os.environ["METRICAS_DIR"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    from app.database import engine
+    from app.migracoes import aplicar_migracoes
+
+    aplicar_migracoes(engine)
+    return create_app()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def contar_consultas():
+    """Conta as instruções SQL emitidas dentro do bloco: with contar_consultas() as contagem"""
+    from contextlib import contextmanager
+
+    from sqlalchemy import event
+
+    from app.database import engine
+
+    @contextmanager
+    def contar():
+        contagem = [0]
+
+        def _contar(*args):
+            contagem[0] += 1
+
+        event.listen(engine, "before_cursor_execute", _contar)
+        try:
+            yield contagem
+        finally:
+            event.remove(engine, "before_cursor_execute", _contar)
+
+    return contar
+
+
+def cabecalho_token(app, usuario_id, cargo):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity=str(usuario_id), additional_claims={"cargo": cargo})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import cabecalho_token
+
+ADMIN, USUARIO, OUTRO = 1, 2, 3
+
+
+@pytest.fixture(scope="module", autouse=True)
+def alertas(app):
+    from app.database import SessionLocal
+    from app.models import Alerta, Recurso, Usuario
+
+    inicio = datetime(2026, 1, 1)
+    with SessionLocal() as db:
+        db.add_all([
+            Usuario(id=ADMIN, name="Admin", cpf="1", email="admin@wayne.com", senha_hash="x", cargo="admin"),
+            Usuario(id=USUARIO, name="Usuário", cpf="2", email="usuario@wayne.com", senha_hash="x", cargo="usuario"),
+            Usuario(id=OUTRO, name="Outro", cpf="3", email="outro@wayne.com", senha_hash="x", cargo="usuario"),
+            Recurso(id=1, nome="Batarang", tipo="arma", quantidade=3, valor_unit=10.0),
+            Recurso(id=2, nome="Batmóvel", tipo="veiculo", quantidade=1, valor_unit=1000.0),
+        ])
+        db.flush()
+        # Instantes repetidos de propósito: o desempate do keyset é o id
+        db.add_all([
+            Alerta(
+                titulo=f"Alerta {i}",
+                usuario_id=(USUARIO, OUTRO, None)[i % 3],
+                recurso_id=(1, 2, None)[i % 3 // 2 + i % 2],
+                status=("pendente", "lido")[i % 2],
+                prioridade=("baixa", "critica")[i % 2],
+                criado_em=inicio + timedelta(minutes=i // 2)
+            )
+            for i in range(30)
+        ])
+        db.commit()
+
+
+def _referencia(usuario_id, cargo, filtros):
+    """Ids esperados, do jeito mais simples: tudo em memória e ordenado no Python"""
+    from app.database import SessionLocal
+    from app.models import Alerta
+
+    with SessionLocal() as db:
+        alertas = db.query(Alerta).all()
+    visiveis = [
+        alerta for alerta in alertas
+        if (cargo == "admin" or alerta.usuario_id in (usuario_id, None))
+        and all(getattr(alerta, campo) == valor for campo, valor in filtros.items())
+    ]
+    return [alerta.id for alerta in sorted(visiveis, key=lambda a: (a.criado_em, a.id), reverse=True)]
+
+
+@pytest.mark.parametrize("usuario_id,cargo", [(ADMIN, "admin"), (USUARIO, "usuario")])
+@pytest.mark.parametrize("filtros", [{}, {"status": "pendente"}, {"prioridade": "critica", "recurso_id": 2}])
+def test_uma_consulta_por_pagina(app, contar_consultas, usuario_id, cargo, filtros):
+    from app.database import SessionLocal
+    from app.services.dashboard_service import get_alertas_by_user
+
+    obtidos, cursor, paginas = [], None, 0
+    with SessionLocal() as db:
+        while True:
+            with contar_consultas() as contagem:
+                itens, cursor = get_alertas_by_user(db, usuario_id, cargo, filtros, cursor, limite=4)
+            assert contagem[0] == 1
+            obtidos += [item["id"] for item in itens]
+            paginas += 1
+            if not cursor:
+                break
+
+    esperados = _referencia(usuario_id, cargo, filtros)
+    assert obtidos == esperados
+    assert paginas == max(1, -(-len(esperados) // 4))
+
+
+def test_paginas_pela_rota(app, cliente):
+    cabecalhos = cabecalho_token(app, USUARIO, "usuario")
+    obtidos, proxima = [], "/api/dashboard/alertas?limite=5"
+    while proxima:
+        resposta = cliente.get(proxima, headers=cabecalhos)
+        assert resposta.status_code == 200
+        obtidos += [alerta["id"] for alerta in resposta.json["data"]]
+        cursor = resposta.json["next_cursor"]
+        proxima = f"/api/dashboard/alertas?limite=5&cursor={cursor}" if cursor else None
+
+    assert obtidos == _referencia(USUARIO, "usuario", {})
+
+
+@pytest.mark.parametrize("consulta", ["recurso_id=abc", "status=qualquer", "prioridade=urgente", "cursor=@@", "limite=0"])
+def test_parametros_invalidos(app, cliente, consulta):
+    resposta = cliente.get(f"/api/dashboard/alertas?{consulta}", headers=cabecalho_token(app, ADMIN, "admin"))
+    assert resposta.status_code == 400
+    assert resposta.json["success"] is False
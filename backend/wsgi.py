@@ -1,11 +1,16 @@
 from app import create_app
-from app.database import Base, engine
+from app.database import engine
+from app.migracoes import aplicar_migracoes
+from app.tasks import iniciar_tarefas
 
 
+if __name__ == "__main__":
+    aplicar_migracoes(engine)
+
 app = create_app()
 
+# Tarefas periódicas só no servidor; a primeira execução espera as migrações pendentes
+iniciar_tarefas(app)
+
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
     app.run(debug=True)
-
-